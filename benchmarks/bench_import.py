@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""Time starting a fresh interpreter that imports pipsqueak, and one that
+runs `pipsqueak --help`, failing when the best of the runs is over budget.
+
+    python benchmarks/bench_import.py [--runs N] [--budget MS]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ('python', 'pass'),
+    ('import', 'import pipsqueak'),
+    ('cli --help', 'import sys; sys.argv = ["pipsqueak", "--help"]; '
+                   'from pipsqueak.main import main; main()'),
+]
+
+
+def best_of(code, runs):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(runs):
+            start = time.time()
+            subprocess.check_call([sys.executable, '-c', code], env=env,
+                                  stdout=devnull)
+            times.append(time.time() - start)
+    return min(times) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--runs', type=int, default=20)
+    ap.add_argument('--budget', type=float, default=100,
+                    help='milliseconds the CLI may take to start')
+    args = ap.parse_args()
+
+    results = [(name, best_of(code, args.runs)) for name, code in CASES]
+    for name, elapsed in results:
+        print "%-12s %.1fms" % (name + ':', elapsed)
+    cli = results[-1][1]
+    if cli > args.budget:
+        print "over the %.0fms budget" % args.budget
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
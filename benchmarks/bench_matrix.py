@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""Time finding the requirements that apply in a matrix of target
+environments, parsing once per target against parsing once for all.
+
+    python benchmarks/bench_matrix.py [--lines N] [--targets N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from packaging.utils import canonicalize_name
+
+from pipsqueak.main import iter_requirements, requirements_matrix
+from pipsqueak.markers import parse_targets
+from pipsqueak.memo import parse_marker
+
+PLATFORMS = ['linux', 'win32', 'darwin']
+
+
+def write_requirements(path, lines):
+    with open(path, 'w') as fp:
+        for i in range(lines):
+            fp.write("package%d>=1.%d; python_version >= '3.%d' and "
+                     "sys_platform != '%s'\n" %
+                     (i, i % 50, i % 8, PLATFORMS[i % 3]))
+
+
+def per_target(path, targets):
+    matrix = {}
+    for target, environment in targets:
+        reqs = matrix[target] = {}
+        for pipreq in iter_requirements(path):
+            if parse_marker(pipreq.markers).evaluate(environment):
+                reqs[canonicalize_name(pipreq.project_name)] = pipreq
+    return matrix
+
+
+def timed(func, *args, **kwargs):
+    start = time.time()
+    result = func(*args, **kwargs)
+    return time.time() - start, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--lines', type=int, default=5000)
+    ap.add_argument('--targets', type=int, default=12)
+    args = ap.parse_args()
+
+    targets = parse_targets([
+        'python_version=3.%d,sys_platform=%s' % (i // 3, PLATFORMS[i % 3])
+        for i in range(args.targets)
+    ])
+    fd, path = tempfile.mkstemp(suffix='.txt')
+    os.close(fd)
+    try:
+        write_requirements(path, args.lines)
+        naive_time, naive = timed(per_target, path, targets)
+        matrix_time, matrix = timed(requirements_matrix, path, targets)
+    finally:
+        os.unlink(path)
+
+    assert naive == matrix
+    print "lines:       %d" % args.lines
+    print "targets:     %d" % args.targets
+    print "per target:  %.2fs" % naive_time
+    print "one pass:    %.2fs (%.1fx)" % (matrix_time,
+                                          naive_time / matrix_time)
+
+
+if __name__ == '__main__':
+    main()
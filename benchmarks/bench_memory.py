@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""Compare the memory taken by slotted requirement records with the
+__dict__ based layout they replaced.
+
+    python benchmarks/bench_memory.py [--count N]
+"""
+import argparse
+import sys
+
+from pipsqueak.main import PipReq
+from pipsqueak.pip.freeze import FrozenRequirement
+from pipsqueak.pip.link import Link
+from pipsqueak.pip.req_install import InstallRequirement
+
+
+# Attributes the classes carried before they gained __slots__.
+LEGACY_ATTRIBUTES = {
+    InstallRequirement: (
+        'req', 'comes_from', 'constraint', 'source_dir', 'editable',
+        '_wheel_cache', 'link', 'original_link', 'extras', 'markers',
+        '_egg_info_path', 'satisfied_by', 'update', 'install_succeeded',
+        'uninstalled_pathset', 'use_user_site', 'target_dir', 'options',
+        'pycompile', 'prepared', 'isolated',
+    ),
+    PipReq: (
+        'editable', 'project_name', 'type', 'source', 'line_number',
+        'specifiers', 'version_control', 'link', 'ireq',
+    ),
+    FrozenRequirement: ('name', 'req', 'editable', 'comments', 'location'),
+    Link: ('url', 'comes_from', 'requires_python'),
+}
+
+
+class Legacy(object):
+    pass
+
+
+def legacy_size(cls):
+    obj = Legacy()
+    for name in LEGACY_ATTRIBUTES[cls]:
+        setattr(obj, name, None)
+    return sys.getsizeof(obj) + sys.getsizeof(obj.__dict__)
+
+
+def build(count):
+    for i in range(count):
+        url = "git+https://github.com/example/pkg%d@v1#egg=pkg%d" % (i, i)
+        ireq = InstallRequirement.from_line(
+            url, comes_from="requirements.txt:%d" % i)
+        yield InstallRequirement, ireq
+        yield Link, ireq.link
+        yield PipReq, PipReq.from_ireq(ireq)
+        yield FrozenRequirement, FrozenRequirement(
+            'pkg%d' % i, url, True, '/src/pkg%d' % i)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--count', type=int, default=1000)
+    args = ap.parse_args()
+
+    sizes = {}
+    for cls, obj in build(args.count):
+        assert not hasattr(obj, '__dict__')
+        sizes[cls] = sys.getsizeof(obj)
+
+    print "%-20s %8s %8s %8s" % ('class', 'dict', 'slots', 'saved')
+    total_legacy = total_slots = 0
+    for cls in LEGACY_ATTRIBUTES:
+        legacy = legacy_size(cls)
+        total_legacy += legacy
+        total_slots += sizes[cls]
+        print "%-20s %8d %8d %7d%%" % (
+            cls.__name__, legacy, sizes[cls],
+            100 - 100 * sizes[cls] // legacy)
+    print "bytes per requirement (all four records): %d -> %d" % (
+        total_legacy, total_slots)
+    print "for %d requirements: %.1f MiB -> %.1f MiB" % (
+        args.count, total_legacy * args.count / 2.0 ** 20,
+        total_slots * args.count / 2.0 ** 20)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""Time parsing of a large generated requirements file, serially and in
+chunks across processes.
+
+    python benchmarks/bench_parse.py [--lines N] [--jobs N]
+
+Chunked parsing needs at least two CPUs to gain anything, and at most as
+many processes as there are CPUs are started. On a single CPU, where a
+pool costs more than it saves, or for a file smaller than two chunks,
+parse_requirements_file parses serially whatever jobs asks for, so both
+times match.
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from pipsqueak.main import parse_requirements_file
+
+
+def write_requirements(path, lines):
+    with open(path, 'w') as fp:
+        for i in range(lines):
+            fp.write("package%d>=1.%d,<2.0; python_version >= '2.7'\n" %
+                     (i, i % 50))
+
+
+def timed(func, *args, **kwargs):
+    start = time.time()
+    result = func(*args, **kwargs)
+    return time.time() - start, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--lines', type=int, default=100000)
+    ap.add_argument('--jobs', type=int, default=multiprocessing.cpu_count())
+    args = ap.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.txt')
+    os.close(fd)
+    try:
+        write_requirements(path, args.lines)
+        serial_time, serial = timed(parse_requirements_file, path)
+        chunked_time, chunked = timed(parse_requirements_file, path,
+                                      jobs=args.jobs)
+    finally:
+        os.unlink(path)
+
+    assert serial == chunked
+    print "cpus:    %d" % multiprocessing.cpu_count()
+    print "lines:   %d" % args.lines
+    print "serial:  %.2fs" % serial_time
+    print "jobs=%d:  %.2fs (%.1fx)" % (args.jobs, chunked_time,
+                                       serial_time / chunked_time)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""Time finding the installed distributions in a large site-packages,
+pkg_resources.WorkingSet against the scanner.
+
+    python benchmarks/bench_scan.py [--dists N]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from packaging.utils import canonicalize_name
+
+from pipsqueak.fscache import run_scope
+from pipsqueak.scanner import installed_distributions
+
+METADATA = """Metadata-Version: 2.1
+Name: %(name)s
+Version: %(version)s
+Summary: Package %(name)s
+Classifier: Programming Language :: Python
+
+%(description)s
+"""
+
+
+def write_site(directory, dists):
+    for i in range(dists):
+        name = 'package%d' % i
+        version = '1.%d.0' % (i % 50)
+        info = os.path.join(directory, '%s-%s.dist-info' % (name, version))
+        os.makedirs(info)
+        with open(os.path.join(info, 'METADATA'), 'w') as fp:
+            fp.write(METADATA % dict(name=name, version=version,
+                                     description='x' * 2000))
+        with open(os.path.join(info, 'RECORD'), 'w') as fp:
+            fp.write('%s/__init__.py,,\n' % name)
+
+
+def working_set(directory):
+    start = time.time()
+    import pkg_resources
+    imported = time.time()
+    versions = {
+        canonicalize_name(dist.project_name): dist.version
+        for dist in pkg_resources.WorkingSet([directory])
+    }
+    return imported - start, versions
+
+
+def scan(directory):
+    with run_scope():
+        return {name: dist.version for name, dist in
+                installed_distributions([directory]).items()}
+
+
+def timed(func, *args, **kwargs):
+    start = time.time()
+    result = func(*args, **kwargs)
+    return time.time() - start, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--dists', type=int, default=3000)
+    args = ap.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        write_site(directory, args.dists)
+        scan_time, scanned = timed(scan, directory)
+        ws_time, (import_time, found) = timed(working_set, directory)
+    finally:
+        shutil.rmtree(directory)
+
+    assert scanned == found
+    print "distributions: %d" % args.dists
+    print "working_set:   %.2fs (import %.2fs)" % (ws_time, import_time)
+    print "scanner:       %.2fs (%.1fx)" % (scan_time, ws_time / scan_time)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,9 @@
 from pipsqueak.main import (    # noqa
     PipReq,
+    iter_requirements,
     parse_requirements_file,
     parse_installed,
+    requirements_matrix,
     report,
+    verify_hashes,
 )
@@ -0,0 +1,157 @@
+"""On-disk cache of parsed requirements files"""
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+from six.moves import cPickle as pickle
+
+from pipsqueak.exceptions import RemoteFetchError
+from pipsqueak.markers import current_environment
+from pipsqueak.pip.compat import expanduser
+
+logger = logging.getLogger(__name__)
+
+
+# Bump whenever the pickled PipReq layout changes.
+CACHE_VERSION = 4
+
+
+def default_cache_dir():
+    """ Return the cache directory, $XDG_CACHE_HOME/pipsqueak by default. """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or expanduser('~/.cache')
+    return os.path.join(cache_home, 'pipsqueak')
+
+
+def file_digest(path):
+    """ Return the sha256 hex digest of the contents of path. """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_digest(path):
+    """ Return the sha256 hex digest of the file at path, or of the body of
+    path when it's an http(s) URL.
+    """
+    if path.lower().startswith(('http://', 'https://')):
+        # imported here since remote keeps its responses in our directory
+        from pipsqueak.remote import fetch
+        return hashlib.sha256(fetch(path)).hexdigest()
+    return file_digest(path)
+
+
+def _ensure_dir(path):
+    try:
+        os.makedirs(path)
+    except OSError as exc:
+        if exc.errno != errno.EEXIST:
+            raise
+
+
+def atomic_write(path, data):
+    """ Write data to path so that readers never see a partial file. """
+    directory = os.path.dirname(path)
+    _ensure_dir(directory)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+        os.rename(tmp, path)
+    except Exception:
+        os.unlink(tmp)
+        raise
+
+
+class RequirementsCache(object):
+    """
+    Parsed requirements files keyed by the content hash of the file and of
+    every file it transitively includes with -r, and by the working
+    directory relative includes and local paths are resolved against.
+    """
+
+    subdir = 'requirements'
+
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = default_cache_dir()
+        self.directory = os.path.join(directory, self.subdir)
+
+    def _entry_path(self, path, digest):
+        # which of several requirements for a package is kept depends on
+        # the markers that hold, so entries are per environment, and -r
+        # includes and local paths are relative to the working directory
+        environment = sorted(current_environment().items())
+        key = '%s\0%s\0%s\0%s\0%r' % (CACHE_VERSION, path, digest,
+                                      os.getcwd(), environment)
+        key = hashlib.sha256(key)
+        return os.path.join(self.directory, key.hexdigest())
+
+    def get(self, path):
+        """
+        Return the dictionary of PipReqs cached for the requirements file at
+        the absolute path or URL path, or None if it's missing or stale.
+        """
+        entry_path = None
+        try:
+            entry_path = self._entry_path(path, content_digest(path))
+            with open(entry_path, 'rb') as fp:
+                entry = pickle.load(fp)
+        except (IOError, OSError, RemoteFetchError):
+            return None
+        except Exception as exc:
+            logger.debug("Ignoring unreadable cache entry %s: %s",
+                         entry_path or path, exc)
+            return None
+
+        for include, digest in entry['files'].items():
+            try:
+                if content_digest(include) != digest:
+                    return None
+            except (IOError, OSError, RemoteFetchError):
+                return None
+
+        os.utime(entry_path, None)
+        logger.debug("Using cached requirements for %s", path)
+        return entry['reqs']
+
+    def set(self, path, reqs, files):
+        """
+        Cache reqs, the dictionary of PipReqs parsed from the file at the
+        absolute path or URL path. files are all the files path includes.
+        """
+        try:
+            digests = {include: content_digest(include) for include in files
+                       if include != path}
+            entry = dict(files=digests, reqs=reqs)
+            atomic_write(self._entry_path(path, content_digest(path)),
+                         pickle.dumps(entry, 2))
+        except (IOError, OSError, RemoteFetchError) as exc:
+            logger.warning("Could not write requirements cache: %s", exc)
+
+    def prune(self, max_age=None):
+        """
+        Remove entries unused for max_age seconds, or every entry when
+        max_age is None. Return the number of entries removed.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+
+        now = time.time()
+        removed = 0
+        for name in names:
+            entry_path = os.path.join(self.directory, name)
+            try:
+                if (max_age is None or
+                        now - os.path.getmtime(entry_path) > max_age):
+                    os.unlink(entry_path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
@@ -0,0 +1,263 @@
+"""On-disk snapshot of the installed environment
+
+The snapshot keeps what scanning each sys.path directory found, entry by
+entry, with the modification time and size of every file and directory the
+entry was read from, and the FrozenRequirement of each distribution. On the
+next run a directory whose own mtime is unchanged isn't listed again, and
+only entries one of whose files changed are scanned again. An editable git
+checkout is only frozen again, which runs git, when its HEAD, the ref HEAD
+points to, packed-refs or config changed.
+"""
+import hashlib
+import logging
+import os
+import sys
+
+from six.moves import cPickle as pickle
+
+from pipsqueak.cache import atomic_write, default_cache_dir
+from pipsqueak.fscache import probe
+from pipsqueak.pip.util import canonicalize_name
+from pipsqueak.scanner import (
+    entry_inputs,
+    is_egg,
+    is_scanned_entry,
+    read_lines,
+    remember_editables,
+    scan_editable_entry,
+    scan_entry,
+    scan_path_entry,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Bump whenever the layout of the snapshot changes.
+SNAPSHOT_VERSION = 1
+
+
+def _stamp(path):
+    """ Return what changes when the file or directory at path does. """
+    st = probe.stat(path)
+    if st is None:
+        return None
+    return st.st_mtime, st.st_size
+
+
+def _unchanged(inputs):
+    return all(_stamp(path) == stamp for path, stamp in inputs.items())
+
+
+def git_inputs(location):
+    """
+    Return the files of the git checkout holding location that change when
+    it moves to another commit or remote, or None if location isn't in a
+    git checkout. HEAD is read from the checkout's own git directory, and
+    refs, packed-refs and config from the one a linked worktree shares with
+    the main checkout.
+    """
+    root = probe.find_upward(location, '.git')
+    if root is None:
+        return None
+    git_dir = os.path.join(root, '.git')
+    if probe.isfile(git_dir):
+        # a worktree or submodule, whose .git names its real directory
+        try:
+            with open(git_dir) as fp:
+                line = fp.readline().strip()
+        except IOError:
+            return None
+        if not line.startswith('gitdir:'):
+            return None
+        git_dir = os.path.join(root, line[len('gitdir:'):].strip())
+    # a linked worktree's git directory names the main one in commondir
+    common_dir = git_dir
+    commondir = read_lines(os.path.join(git_dir, 'commondir'))
+    if commondir:
+        common_dir = os.path.normpath(os.path.join(git_dir, commondir[0]))
+    head = os.path.join(git_dir, 'HEAD')
+    inputs = [head, os.path.join(common_dir, 'config'),
+              os.path.join(common_dir, 'packed-refs')]
+    try:
+        with open(head) as fp:
+            ref = fp.readline().strip()
+    except IOError:
+        return None
+    if ref.startswith('ref:'):
+        ref = ref[len('ref:'):].strip()
+        # branches are shared; a few refs, such as refs/bisect, aren't
+        inputs.append(os.path.join(common_dir, ref))
+        if common_dir != git_dir:
+            inputs.append(os.path.join(git_dir, ref))
+    return inputs
+
+
+class EnvironmentCache(object):
+    """
+    The distributions installed on paths, sys.path by default, and their
+    FrozenRequirements, kept in directory/environments between runs.
+    """
+
+    subdir = 'environments'
+
+    def __init__(self, directory=None, paths=None):
+        if directory is None:
+            directory = default_cache_dir()
+        if paths is None:
+            paths = sys.path
+        self._paths = list(paths)
+        self.paths = [os.path.normcase(os.path.abspath(path_item or '.'))
+                      for path_item in paths]
+        key = '%s\0%s\0%r' % (SNAPSHOT_VERSION, sys.executable, self.paths)
+        self.path = os.path.join(directory, self.subdir,
+                                 hashlib.sha256(key).hexdigest())
+        # (path item, entry) pairs scanned by this instance
+        self.rescanned = []
+        self._snapshot = self._load()
+        self._dirty = False
+        self._installed = None
+        self._editables = None
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as fp:
+                snapshot = pickle.load(fp)
+        except IOError:
+            snapshot = None
+        except Exception as exc:
+            logger.debug("Ignoring unreadable environment snapshot %s: %s",
+                         self.path, exc)
+            snapshot = None
+        if snapshot is None or snapshot.get('version') != SNAPSHOT_VERSION:
+            snapshot = dict(version=SNAPSHOT_VERSION, paths={}, frozen={})
+        return snapshot
+
+    def _scan(self, path_item, entry):
+        # inputs are stamped first, so a change made while scanning is
+        # seen next time
+        inputs = {path: _stamp(path)
+                  for path in entry_inputs(path_item, entry)}
+        if entry is None:
+            dists = scan_path_entry(path_item)
+            editables = []
+        else:
+            dists = scan_entry(path_item, entry)
+            editables = scan_editable_entry(path_item, entry)
+        self.rescanned.append((path_item, entry))
+        return dict(inputs=inputs, dists=dists, editables=editables)
+
+    def _refresh_path(self, path_item, previous):
+        stamp = _stamp(path_item)
+        old_entries = previous['entries'] if previous else {}
+        if is_egg(path_item):
+            names = [None]
+        elif (previous is not None and stamp is not None and
+                previous['stamp'] == stamp):
+            # nothing was added to, removed from or renamed in path_item
+            names = sorted(old_entries)
+        else:
+            names = sorted(entry for entry in probe.listdir(path_item)
+                           if is_scanned_entry(entry))
+
+        entries = {}
+        for name in names:
+            cached = old_entries.get(name)
+            if cached is not None and _unchanged(cached['inputs']):
+                entries[name] = cached
+            else:
+                entries[name] = self._scan(path_item, name)
+        if previous is None or previous['stamp'] != stamp or \
+                set(entries) != set(old_entries):
+            self._dirty = True
+        return dict(stamp=stamp, entries=entries)
+
+    def refresh(self):
+        """ Bring the snapshot up to date with what's installed, scanning
+        only what changed since it was taken. """
+        old_paths = self._snapshot['paths']
+        paths = {}
+        installed = {}
+        editables = {}
+        for path_item in self.paths:
+            if path_item not in paths:
+                paths[path_item] = self._refresh_path(
+                    path_item, old_paths.get(path_item))
+            record = paths[path_item]
+            for name in sorted(record['entries']):
+                entry = record['entries'][name]
+                for dist in entry['dists']:
+                    installed.setdefault(
+                        canonicalize_name(dist.project_name), dist)
+                for project, location in entry['editables']:
+                    editables.setdefault(project, location)
+        if self.rescanned or set(paths) != set(old_paths):
+            self._dirty = True
+        self._snapshot['paths'] = paths
+        self._installed = installed
+        self._editables = editables
+        remember_editables(editables, self._paths)
+        logger.debug("Rescanned %d environment entries",
+                     len(self.rescanned))
+
+    def distributions(self):
+        """ Return a dictionary from canonical project name to the
+        Distribution first found for it on the paths. """
+        if self._installed is None:
+            self.refresh()
+        return self._installed
+
+    def editable_locations(self):
+        """ Return a dictionary from canonical project name to the location
+        of the editable install first found for it on the paths. """
+        if self._editables is None:
+            self.refresh()
+        return self._editables
+
+    def _fingerprint(self, name, dist):
+        """ Return what freezing dist depends on, or None if that can't be
+        told without running its VCS. """
+        editables = self.editable_locations()
+        if name not in editables:
+            return dist.project_name, dist.version, dist.location
+        location = editables[name] or dist.location
+        inputs = git_inputs(location)
+        if inputs is None:
+            return None
+        return (dist.project_name, dist.version, dist.location, location,
+                tuple((path, _stamp(path)) for path in inputs))
+
+    def frozen(self, name, dist):
+        """ Return the FrozenRequirement remembered for dist, installed as
+        name, or None if there's none or it may be stale. """
+        cached = self._snapshot['frozen'].get(name)
+        if cached is None:
+            return None
+        fingerprint = self._fingerprint(name, dist)
+        if fingerprint is None or cached[0] != fingerprint:
+            return None
+        return cached[1]
+
+    def remember(self, name, dist, frozen):
+        """ Keep frozen, the FrozenRequirement of dist installed as name,
+        for later runs. """
+        fingerprint = self._fingerprint(name, dist)
+        if fingerprint is not None:
+            self._snapshot['frozen'][name] = (fingerprint, frozen)
+            self._dirty = True
+
+    def save(self):
+        """ Write the snapshot back to disk if it changed. """
+        installed = self.distributions()
+        frozen = self._snapshot['frozen']
+        for name in list(frozen):
+            if name not in installed:
+                del frozen[name]
+                self._dirty = True
+        if not self._dirty:
+            return
+        try:
+            atomic_write(self.path, pickle.dumps(self._snapshot, 2))
+        except (IOError, OSError) as exc:
+            logger.warning("Could not write environment snapshot: %s", exc)
+            return
+        self._dirty = False
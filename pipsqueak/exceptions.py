@@ -18,6 +18,29 @@ class RequirementsFileParseError(ConfigurationError):
     """Raised when a general error occurs parsing a requirements file line."""
 
 
+class IncludeCycleError(RequirementsFileParseError):
+    """Raised when requirements files include each other with -r."""
+
+
+class ConflictingRequirementsError(RequirementsFileParseError):
+    """Raised when no version satisfies every requirement for a package."""
+
+    def __init__(self, name, sides):
+        self.name = name
+        self.sides = sides
+        super(ConflictingRequirementsError, self).__init__(
+            "No version of %s satisfies all of: %s" % (
+                name,
+                ', '.join('%s (%s)' % (specifiers, comes_from or '<unknown>')
+                          for specifiers, comes_from in sides),
+            )
+        )
+
+
+class RemoteFetchError(ConfigurationError):
+    """Raised when a requirements file can't be fetched over HTTP."""
+
+
 class RequirementParseError(ConfigurationError):
     """Raised when a general error occurs parsing a requirement. """
 
@@ -0,0 +1,143 @@
+"""Run-scoped cache of filesystem probes
+
+Parsing requirements and freezing the installed set stat the same paths
+over and over: every line is checked for being a directory or archive,
+editables look for setup.py, VCS backends walk up from a checkout looking
+for it, and each distribution is checked for an egg-link on every sys.path
+entry. Within a run, those answers are taken from one cache.
+
+Outside of run_scope() every probe goes to the filesystem. Other modules
+can keep their own run-scoped answers in dictionaries from probe.memo().
+"""
+from contextlib import contextmanager
+from functools import wraps
+import os
+import stat
+import threading
+
+
+class FileSystemCache(object):
+    def __init__(self):
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._listdirs = {}
+        self._upward = {}
+        self._memos = []
+
+    @property
+    def active(self):
+        return self._depth > 0
+
+    def enter(self):
+        with self._lock:
+            self._depth += 1
+
+    def exit(self):
+        with self._lock:
+            self._depth -= 1
+            if not self._depth:
+                self.clear()
+
+    def clear(self):
+        self._stats.clear()
+        self._listdirs.clear()
+        self._upward.clear()
+        for memo in self._memos:
+            memo.clear()
+
+    def memo(self):
+        """ Return a dictionary that's emptied whenever the outermost run
+        scope exits. Entries should only be added while active.
+        """
+        memo = {}
+        self._memos.append(memo)
+        return memo
+
+    def _stat(self, path):
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+    def stat(self, path):
+        """ Return os.stat(path), or None if it can't be stat'ed. """
+        if not self.active:
+            return self._stat(path)
+        try:
+            return self._stats[path]
+        except KeyError:
+            result = self._stats[path] = self._stat(path)
+            return result
+
+    def exists(self, path):
+        return self.stat(path) is not None
+
+    def isdir(self, path):
+        st = self.stat(path)
+        return st is not None and stat.S_ISDIR(st.st_mode)
+
+    def isfile(self, path):
+        st = self.stat(path)
+        return st is not None and stat.S_ISREG(st.st_mode)
+
+    def _listdir(self, path):
+        try:
+            return frozenset(os.listdir(path))
+        except OSError:
+            return frozenset()
+
+    def listdir(self, path):
+        """ Return the set of names in the directory path, empty if it can't
+        be listed.
+        """
+        if not self.active:
+            return self._listdir(path)
+        try:
+            return self._listdirs[path]
+        except KeyError:
+            result = self._listdirs[path] = self._listdir(path)
+            return result
+
+    def _find_upward(self, location, name):
+        while not self.exists(os.path.join(location, name)):
+            last_location = location
+            location = os.path.dirname(location)
+            if location == last_location:
+                return None
+        return location
+
+    def find_upward(self, location, name):
+        """ Return location or its closest parent directory containing name,
+        or None if there is none up to the root of the filesystem.
+        """
+        if not self.active:
+            return self._find_upward(location, name)
+        key = (location, name)
+        try:
+            return self._upward[key]
+        except KeyError:
+            result = self._upward[key] = self._find_upward(location, name)
+            return result
+
+
+probe = FileSystemCache()
+
+
+@contextmanager
+def run_scope():
+    """ Cache filesystem probes until the outermost run_scope exits. """
+    probe.enter()
+    try:
+        yield probe
+    finally:
+        probe.exit()
+
+
+def run_scoped(func):
+    """ Decorator running func inside run_scope(). """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with run_scope():
+            return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,173 @@
+"""Verification of local archives against their --hash pins"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+
+from pipsqueak.cache import atomic_write, default_cache_dir
+from pipsqueak.pip.compat import buffer_slice
+from pipsqueak.pip.util import is_archive_file, requirement_key
+
+logger = logging.getLogger(__name__)
+
+
+# Hash algorithms accepted by --hash, as in pip
+STRONG_HASHES = ['sha256', 'sha384', 'sha512']
+
+# Bytes of a mapped archive fed to the hashes at a time
+CHUNK_SIZE = 1 << 20
+
+
+def hash_file(path, algorithms):
+    """ Return a dictionary from each of algorithms to the hex digest of the
+    file at path, reading it once through a memory map.
+    """
+    hashes = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+    with open(path, 'rb') as fp:
+        size = os.fstat(fp.fileno()).st_size
+        if size:
+            mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for offset in range(0, size, CHUNK_SIZE):
+                    chunk = buffer_slice(mm, offset, CHUNK_SIZE)
+                    for digest in hashes.values():
+                        digest.update(chunk)
+            finally:
+                mm.close()
+    return {name: digest.hexdigest() for name, digest in hashes.items()}
+
+
+class DigestCache(object):
+    """
+    Digests of files keyed by their device, inode, size and modification
+    time, so an unchanged file is never hashed twice.
+    """
+
+    filename = 'digests.json'
+
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = default_cache_dir()
+        self.path = os.path.join(directory, self.filename)
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(self.path) as fp:
+                self._digests = json.load(fp)
+        except (IOError, ValueError):
+            self._digests = {}
+
+    @staticmethod
+    def _key(st, algorithm):
+        return '%d:%d:%d:%r:%s' % (st.st_dev, st.st_ino, st.st_size,
+                                   st.st_mtime, algorithm)
+
+    def hash_file(self, path, algorithms):
+        """ Like hash_file, but only hashes path for digests not cached. """
+        st = os.stat(path)
+        digests = {}
+        with self._lock:
+            for algorithm in algorithms:
+                digest = self._digests.get(self._key(st, algorithm))
+                if digest is not None:
+                    digests[algorithm] = digest
+        missing = [a for a in algorithms if a not in digests]
+        if missing:
+            computed = hash_file(path, missing)
+            with self._lock:
+                for algorithm, digest in computed.items():
+                    self._digests[self._key(st, algorithm)] = digest
+                self._dirty = True
+            digests.update(computed)
+        return digests
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                atomic_write(self.path, json.dumps(self._digests))
+            except (IOError, OSError) as exc:
+                logger.warning("Could not write digest cache: %s", exc)
+            self._dirty = False
+
+
+def expected_hashes(ireq):
+    """ Return a dictionary from algorithm to the allowed digests of ireq,
+    from its --hash options and its link's hash fragment.
+    """
+    expected = {}
+    for algorithm, digests in ireq.options.get('hashes', {}).items():
+        expected.setdefault(algorithm, set()).update(digests)
+    if ireq.link and ireq.link.hash:
+        expected.setdefault(ireq.link.hash_name, set()).add(ireq.link.hash)
+    return expected
+
+
+def local_archive(ireq):
+    """ Return the path of the local archive ireq refers to, if any. """
+    link = ireq.link
+    if link and link.scheme == 'file' and is_archive_file(link.path):
+        return link.path
+    return None
+
+
+def verify(ireqs, cache=None, workers=None):
+    """
+    Hash every local archive that ireqs pin with --hash or a hash fragment,
+    spreading the files over a pool of worker threads. cache, a
+    DigestCache, avoids rehashing unchanged files.
+
+    Return a dictionary from requirement_key to a description of each
+    archive that's missing or matches none of its pins.
+    """
+    checks = []
+    algorithms = {}
+    for ireq in ireqs:
+        path = local_archive(ireq)
+        expected = expected_hashes(ireq)
+        if path is None or not expected:
+            continue
+        checks.append((ireq, path, expected))
+        algorithms.setdefault(path, set()).update(expected)
+
+    hasher = cache.hash_file if cache is not None else hash_file
+
+    def digest(path):
+        try:
+            return path, hasher(path, sorted(algorithms[path]))
+        except (IOError, OSError) as exc:
+            return path, exc
+
+    paths = sorted(algorithms)
+    if len(paths) > 1 and (workers is None or workers > 1):
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(workers)
+        try:
+            digests = dict(pool.map(digest, paths))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        digests = dict(digest(path) for path in paths)
+    if cache is not None:
+        cache.save()
+
+    failures = {}
+    for ireq, path, expected in checks:
+        actual = digests[path]
+        if isinstance(actual, Exception):
+            failures[requirement_key(ireq)] = dict(
+                path=path, error=str(actual))
+            continue
+        if any(actual[algorithm] in allowed
+               for algorithm, allowed in expected.items()):
+            continue
+        failures[requirement_key(ireq)] = dict(
+            path=path,
+            expected={a: sorted(d) for a, d in expected.items()},
+            actual=actual,
+        )
+    return failures
@@ -0,0 +1,97 @@
+"""Resolution of the graph of requirements files joined by -r includes"""
+from collections import namedtuple
+import logging
+
+from pipsqueak.exceptions import IncludeCycleError
+
+logger = logging.getLogger(__name__)
+
+
+# Entry returned by a file parser for a `-r path` line
+Include = namedtuple('Include', 'path')
+
+
+class IncludeResolver(object):
+    """
+    Expands -r includes into the InstallRequirements they contribute.
+
+    parse_file is called with the absolute path of a requirements file and
+    returns its entries in order: InstallRequirements and Include tuples.
+    Each distinct file is parsed once per resolver, independent includes are
+    parsed concurrently on a pool of worker threads, and include cycles
+    raise IncludeCycleError.
+    """
+
+    def __init__(self, parse_file, workers=None):
+        self.parse_file = parse_file
+        self.workers = workers
+        self._entries = {}
+        self._expanded = {}
+        self._reachable = {}
+
+    def _parse(self, roots):
+        """ Parse roots and everything they include, a level at a time. """
+        pending = [p for p in roots if p not in self._entries]
+        while pending:
+            pending = sorted(set(pending))
+            if len(pending) == 1 or self.workers == 1:
+                results = [self.parse_file(path) for path in pending]
+            else:
+                from multiprocessing.pool import ThreadPool
+                pool = ThreadPool(self.workers)
+                try:
+                    results = pool.map(self.parse_file, pending)
+                finally:
+                    pool.close()
+                    pool.join()
+
+            discovered = []
+            for path, entries in zip(pending, results):
+                self._entries[path] = entries
+                for entry in entries:
+                    if (isinstance(entry, Include) and
+                            entry.path not in self._entries):
+                        discovered.append(entry.path)
+            pending = discovered
+
+    def _expand(self, path, stack):
+        if path in self._expanded and self._reachable[path].isdisjoint(stack):
+            return self._expanded[path]
+        if path in stack:
+            chain = list(stack[stack.index(path):]) + [path]
+            raise IncludeCycleError(
+                "Requirements files include each other: %s" %
+                ' -> '.join(chain)
+            )
+
+        stack = stack + (path,)
+        ireqs = []
+        reachable = {path}
+        for entry in self._entries[path]:
+            if isinstance(entry, Include):
+                ireqs.extend(self._expand(entry.path, stack))
+                reachable.update(self._reachable[entry.path])
+            else:
+                ireqs.append(entry)
+        self._expanded[path] = ireqs
+        self._reachable[path] = frozenset(reachable)
+        logger.debug("Resolved %s to %d requirements", path, len(ireqs))
+        return ireqs
+
+    def resolve(self, path, parents=()):
+        """
+        Return the InstallRequirements of the file at path, with includes
+        expanded in place. parents are the files, outermost first, whose
+        includes led to path; they are only used to detect cycles.
+        """
+        self._parse([path])
+        return self._expand(path, tuple(parents))
+
+    def files(self, path=None):
+        """
+        Return the paths of path and of every file it includes, or of every
+        file parsed so far when path is None.
+        """
+        if path is None:
+            return frozenset(self._entries)
+        return self._reachable[path]
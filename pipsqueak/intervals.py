@@ -0,0 +1,200 @@
+"""Version specifiers as sorted lists of disjoint version intervals
+
+A SpecifierSet is the intersection of its specifiers, and each specifier
+allows one or two intervals of versions, so two sets of requirements for a
+package conflict exactly when the intersection of their intervals is empty.
+That's decided by merging sorted lists rather than by testing candidate
+versions.
+
+A version without a local label matches its local versions too, so ==1.0
+allows 1.0+ubuntu1, as do <=1.0 and >=1.0, and !=1.0 excludes it. The
+pre- and post-release exclusions PEP 440 adds to < and > are not modeled,
+and legacy versions and === are not understood at all, so a conflict is
+only reported when no version can satisfy both sides.
+"""
+from collections import namedtuple
+
+from packaging.version import Version
+
+from pipsqueak.exceptions import ConflictingRequirementsError
+from pipsqueak.memo import LRUCache, parse_specifier
+
+
+# A bound of None is unbounded on that side.
+Interval = namedtuple('Interval',
+                      'lower lower_inclusive upper upper_inclusive')
+
+ALL_VERSIONS = (Interval(None, False, None, False),)
+
+_intervals = LRUCache()
+
+
+def _is_empty(interval):
+    lower, lower_inclusive, upper, upper_inclusive = interval
+    if lower is None or upper is None:
+        return False
+    if lower == upper:
+        return not (lower_inclusive and upper_inclusive)
+    return lower > upper
+
+
+def _tighter_lower(a, b):
+    """ The greater of the lower bounds of intervals a and b. """
+    if a.lower is None:
+        return b.lower, b.lower_inclusive
+    if b.lower is None or a.lower > b.lower:
+        return a.lower, a.lower_inclusive
+    if b.lower > a.lower:
+        return b.lower, b.lower_inclusive
+    return a.lower, a.lower_inclusive and b.lower_inclusive
+
+
+def _ends_first(a, b):
+    """ Does interval a end no later than interval b? """
+    if a.upper is None:
+        return b.upper is None
+    if b.upper is None or a.upper < b.upper:
+        return True
+    return a.upper == b.upper and (b.upper_inclusive or
+                                   not a.upper_inclusive)
+
+
+def intersect(a, b):
+    """ Return the intervals in both a and b, sorted lists of disjoint
+    intervals.
+    """
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        first = _ends_first(a[i], b[j])
+        end = a[i] if first else b[j]
+        interval = Interval(*(_tighter_lower(a[i], b[j]) +
+                              (end.upper, end.upper_inclusive)))
+        if not _is_empty(interval):
+            result.append(interval)
+        if first:
+            i += 1
+        else:
+            j += 1
+    return tuple(result)
+
+
+def _prefix_bounds(version, release):
+    """ Return the first version starting with release, and the first after
+    the versions that do.
+    """
+    epoch = '%d!' % version.epoch if version.epoch else ''
+    bumped = release[:-1] + (release[-1] + 1,)
+    return (Version('%s%s.dev0' % (epoch, '.'.join(map(str, release)))),
+            Version('%s%s.dev0' % (epoch, '.'.join(map(str, bumped)))))
+
+
+def _after_local_versions(version):
+    """ Return the first version after version and its local versions, as
+    1.0.post0.dev0 follows 1.0 and 1.0+ubuntu1. """
+    public = version.public
+    if version.dev is not None:
+        return Version('%s.dev%d' % (public.rsplit('.dev', 1)[0],
+                                     version.dev + 1))
+    if version.post is not None:
+        return Version('%s.post%d.dev0' % (public.rsplit('.post', 1)[0],
+                                           version.post + 1))
+    return Version(public + '.post0.dev0')
+
+
+def _specifier_intervals(operator, version):
+    if version.endswith('.*'):
+        prefix = Version(version[:-2])
+        lower, upper = _prefix_bounds(prefix, prefix.release)
+        if operator == '==':
+            return (Interval(lower, True, upper, False),)
+        return (Interval(None, False, lower, False),
+                Interval(upper, True, None, False))
+
+    version = Version(version)
+    if version.local is None and operator in ('==', '!=', '<='):
+        # the local versions of version match it
+        after = _after_local_versions(version)
+        if operator == '==':
+            return (Interval(version, True, after, False),)
+        if operator == '!=':
+            return (Interval(None, False, version, False),
+                    Interval(after, True, None, False))
+        return (Interval(None, False, after, False),)
+    if operator == '==':
+        return (Interval(version, True, version, True),)
+    if operator == '!=':
+        return (Interval(None, False, version, False),
+                Interval(version, False, None, False))
+    if operator == '<':
+        return (Interval(None, False, version, False),)
+    if operator == '<=':
+        return (Interval(None, False, version, True),)
+    if operator == '>':
+        return (Interval(version, False, None, False),)
+    if operator == '>=':
+        return (Interval(version, True, None, False),)
+    if operator == '~=':
+        _, upper = _prefix_bounds(version, version.release[:-1])
+        return (Interval(version, True, upper, False),)
+    raise ValueError("Unknown operator %r" % operator)
+
+
+def _make_intervals(specifiers):
+    intervals = ALL_VERSIONS
+    for spec in specifiers.split(','):
+        spec = spec.strip()
+        if not spec:
+            continue
+        try:
+            spec = parse_specifier(spec)
+            spec = _specifier_intervals(spec.operator, spec.version)
+        except ValueError:
+            # InvalidSpecifier and InvalidVersion among them
+            return None
+        intervals = intersect(intervals, spec)
+    return intervals
+
+
+def version_intervals(specifiers):
+    """ Return the versions the specifier set string specifiers allows, as a
+    sorted tuple of disjoint Intervals, or None when it can't be expressed
+    as intervals.
+    """
+    return _intervals.get(specifiers or '', _make_intervals)
+
+
+class ConflictDetector(object):
+    """
+    Intersects the version ranges of every requirement added for a package,
+    and raises ConflictingRequirementsError as soon as one leaves no version
+    that satisfies them all.
+    """
+
+    def __init__(self):
+        self._allowed = {}
+        self._sides = {}
+
+    def add(self, name, specifiers, comes_from=None):
+        """ Add the specifier set string specifiers required of the package
+        with canonical name name by comes_from, a 'source:line' string.
+        """
+        if not specifiers:
+            return
+        intervals = version_intervals(specifiers)
+        if intervals is None:
+            return
+        allowed = intersect(self._allowed.get(name, ALL_VERSIONS), intervals)
+        sides = self._sides.setdefault(name, [])
+        if not allowed:
+            # blame the earlier requirements that conflict on their own,
+            # or all of them when only their combination does
+            conflicting = [side for side in sides
+                           if not intersect(side[2], intervals)] or sides
+            raise ConflictingRequirementsError(
+                name,
+                [side[:2] for side in conflicting] +
+                [(specifiers, comes_from)],
+            )
+        self._allowed[name] = allowed
+        sides.append((specifiers, comes_from, intervals))
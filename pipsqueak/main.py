@@ -1,36 +1,61 @@
 import argparse
 from collections import defaultdict
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
 import logging
 import json
+import mmap
 import os.path
-import shlex
-from multiprocessing import Pool
+import sys
 
-from packaging.specifiers import (
-    Specifier,
-    InvalidSpecifier,
-    LegacySpecifier,
-)
-from packaging.utils import canonicalize_name
-import pkg_resources
+import six
+from six.moves.urllib import parse as urllib_parse
 
+from pipsqueak.cache import RequirementsCache
+from pipsqueak.envcache import EnvironmentCache
 from pipsqueak.exceptions import ConfigurationError, InvalidFieldError
-from pipsqueak.options import break_args_options, build_parser
+from pipsqueak.fscache import run_scope, run_scoped
+from pipsqueak.hashes import DigestCache, verify
+from pipsqueak.includes import Include, IncludeResolver
+from pipsqueak.intervals import ConflictDetector
+from pipsqueak.markers import (
+    compile_marker,
+    current_environment,
+    evaluate as evaluate_markers,
+    parse_inline_target,
+    parse_targets,
+)
+from pipsqueak.memo import cache_info, parse_specifier
 from pipsqueak.pip.freeze import FrozenRequirement
+from pipsqueak.pip.link import Link
+from pipsqueak.pip.pep425tags import get_supported
 from pipsqueak.pip.vcs import vcs
-from pipsqueak.pip.util import get_used_vcs_backend, is_file_url
-from pipsqueak.pip.req_install import InstallRequirement
-
+from pipsqueak.pip.util import (
+    canonicalize_name,
+    dist_is_editable,
+    get_used_vcs_backend,
+    is_file_url,
+    is_installable_dir,
+    requirement_key,
+    url_to_path,
+)
+from pipsqueak.pip.wheel import Wheel
+from pipsqueak import remote
+from pipsqueak.remote import is_remote
+from pipsqueak.scanner import installed_distributions
+from pipsqueak.slots import SlottedObject, intern_string
+from pipsqueak import static_deps
 
-stream_handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
-stream_handler.setFormatter(formatter)
-root_logger = logging.getLogger('')
-root_logger.addHandler(stream_handler)
 logger = logging.getLogger(__file__)
 
 
-class PipReq(object):
+class PipReq(SlottedObject):
+    __slots__ = (
+        'editable', 'project_name', 'type', 'source', 'line_number',
+        'specifiers', 'version_control', 'link', 'ireq', 'markers',
+        'dependencies', 'location',
+    )
+
     def __init__(self, **kwargs):
         self.editable = False
         self.project_name = None
@@ -41,27 +66,29 @@ class PipReq(object):
         self.version_control = None
         self.link = None
         self.ireq = None
+        self.markers = None
+        self.dependencies = None
+        self.location = None
         self.update(**kwargs)
 
     def update(self, **kwargs):
         for k, v in kwargs.iteritems():
-            if k not in self.__dict__:
+            if k not in self.__slots__:
                 raise InvalidFieldError("{} is not a valid field".format(k))
-            setattr(self, k, v)
+            setattr(self, k, intern_string(v))
 
     def to_dict(self):
-        return {k: v for k, v in self.__dict__.iteritems()
-                if k not in ['link']}
+        return {k: v for k, v in self._slot_items() if k not in ['link']}
 
     def __eq__(self, other):
         if isinstance(self, other.__class__):
-            return self.__dict__ == other.__dict__
+            return self.__getstate__() == other.__getstate__()
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __repr__(self):
-        return repr(self.__dict__)
+        return repr(self.__getstate__())
 
     @classmethod
     def from_ireq(cls, req):
@@ -69,37 +96,26 @@ class PipReq(object):
         InstallRequirement.
         """
         if req.comes_from:
-            source = req.comes_from.split(':')[0]
-            line_number = int(req.comes_from.split(':')[1])
+            source, line_number = req.comes_from.rsplit(':', 1)
+            line_number = int(line_number)
         else:
             source = None
             line_number = None
 
         if req.link:
-            vcs_backend = get_used_vcs_backend(req.link)
-            if vcs_backend:
-                location, version = vcs_backend.get_url_rev()
-                if '+' in req.link.scheme:
-                    protocol = req.link.scheme.split('+')[1]
-                else:
-                    protocol = req.link.scheme
-
-                link = req.link.url
-                type = 'version_control'
-                version_control = dict(
-                    type=vcs_backend.name,
-                    protocol=protocol,
-                    location=location,
-                    version=version,
-                )
-            elif is_file_url(req.link.url):
-                type = 'file'
+            link = req.link.url
+            type, version_control = _link_details(req.link)
         else:
             link = None
             version_control = None
             type = 'pypi'
 
         specifiers = str(req.specifier) if req.specifier else None
+        markers = str(req.markers) if req.markers else None
+        if req.source_dir and is_installable_dir(req.setup_py_dir):
+            dependencies = static_deps.dependencies(req.setup_py_dir)
+        else:
+            dependencies = None
         return cls(
             project_name=req.name,
             type=type,
@@ -109,17 +125,88 @@ class PipReq(object):
             line_number=line_number,
             version_control=version_control,
             link=link,
+            markers=markers,
+            dependencies=dependencies,
         )
 
+    @classmethod
+    def from_frozen(cls, frozen):
+        """ Factory method for PipReq construction given a
+        FrozenRequirement, without writing it out and parsing it back.
+        """
+        req = frozen.req
+        if isinstance(req, six.string_types):
+            # a repository URL, as pip freeze writes it after -e
+            url = req
+            for name in vcs.names:
+                if url.lower().startswith('%s:' % name):
+                    url = '%s+%s' % (name, url)
+                    break
+            link = Link(url)
+            type, version_control = _link_details(link)
+            link = link.url
+            specifiers = None
+        else:
+            link = None
+            type = 'pypi'
+            version_control = None
+            specifiers = str(req.specifier) if req.specifier else None
+        return cls(
+            project_name=frozen.name,
+            type=type,
+            editable=frozen.editable,
+            specifiers=specifiers,
+            version_control=version_control,
+            link=link,
+            location=frozen.location,
+        )
+
+    @classmethod
+    def from_dist(cls, dist, dependency_links=()):
+        """ Factory method for PipReq construction given an installed
+        distribution.
+        """
+        return cls.from_frozen(
+            FrozenRequirement.from_dist(dist, list(dependency_links)))
+
+
+def _link_details(link):
+    """ Return the PipReq type of link, and its version control details
+    when it's a repository URL. """
+    vcs_backend = get_used_vcs_backend(link)
+    if vcs_backend:
+        location, version = vcs_backend.get_url_rev()
+        if '+' in link.scheme:
+            protocol = link.scheme.split('+')[1]
+        else:
+            protocol = link.scheme
+        return 'version_control', dict(
+            type=vcs_backend.name,
+            protocol=protocol,
+            location=location,
+            version=version,
+        )
+    elif is_file_url(link):
+        return 'file', None
+    return 'url', None
+
 
 class IReqSet(object):
     """ A collection of InstallRequirements """
     def __init__(self):
         self.reqset = dict()
+        self.conflicts = ConflictDetector()
 
     def add(self, ireq):
-        # TODO: Don't allow dupes unless they are the same
-        name = canonicalize_name(ireq.name)
+        """ Add ireq, replacing an earlier requirement for the same package
+        unless only the earlier one's markers hold here. Raise
+        ConflictingRequirementsError if no version satisfies both.
+        """
+        name = requirement_key(ireq)
+        if ireq.match_markers():
+            self.conflicts.add(name, str(ireq.specifier), ireq.comes_from)
+        elif name in self.reqset and self.reqset[name].match_markers():
+            return
         self.reqset[name] = ireq
 
     def itervalues(self):
@@ -138,11 +225,27 @@ class IReqSet(object):
         return {k: PipReq.from_ireq(v) for k, v in self.reqset.iteritems()}
 
 
-def _process_line(line, reqset, source=None, lineno=None):
-    parser = build_parser(line)
-    defaults = parser.get_default_values()
-    args_str, options_str = break_args_options(line)
-    opts, _ = parser.parse_args(shlex.split(options_str), defaults)
+# these bring in optparse and packaging's pyparsing grammars, so they're
+# bound by _load_line_parsers once there's a line to parse
+_options = None
+_req_install = None
+
+
+def _load_line_parsers():
+    global _options, _req_install
+    if _req_install is None:
+        from pipsqueak import options
+        from pipsqueak.pip import req_install
+        _options = options
+        _req_install = req_install
+
+
+def _parse_line_entry(line, source=None, lineno=None):
+    """ Return the InstallRequirement or Include described by a line. """
+    _load_line_parsers()
+    InstallRequirement = _req_install.InstallRequirement
+
+    args_str, opts = _options.parse_line(line)
 
     if source:
         comes_from = "%s:%s" % (source, lineno)
@@ -150,80 +253,438 @@ def _process_line(line, reqset, source=None, lineno=None):
         comes_from = None
 
     if args_str:
-        ireq = InstallRequirement.from_line(args_str, comes_from=comes_from)
-        reqset.add(ireq)
+        req_options = {}
+        for dest in _options.SUPPORTED_OPTIONS_REQ_DEST:
+            if getattr(opts, dest, None):
+                req_options[dest] = getattr(opts, dest)
+        return InstallRequirement.from_line(
+            args_str,
+            comes_from=comes_from,
+            options=req_options,
+        )
     elif opts.editables:
-        ireq = InstallRequirement.from_editable(
+        return InstallRequirement.from_editable(
             opts.editables[0],
             comes_from=comes_from
         )
-        reqset.add(ireq)
     elif opts.requirements:
-        ireqs = _parse_requirements_file(opts.requirements[0])
-        for ireq in ireqs.itervalues():
-            reqset.add(ireq)
+        return Include(_include_path(opts.requirements[0], source))
     else:
         raise Exception("Failed to process requirement", line)
 
 
-def _yield_lines(strs):
-    """ Yield non-empty/non-comment lines with their line numbers. """
-    for lineno, line in enumerate(strs):
+def _requirements_path(path):
+    """ Return path made absolute, unless it's an http(s) URL. """
+    return path if is_remote(path) else os.path.abspath(path)
+
+
+def _include_path(path, source=None):
+    """ Return the absolute path or URL of the file an -r path line in
+    source includes. Relative includes in a fetched file are relative to its
+    URL.
+    """
+    if not is_remote(path) and source and is_remote(source):
+        return urllib_parse.urljoin(source, path)
+    return _requirements_path(path)
+
+
+@contextmanager
+def _open_requirements(requirements):
+    """ Open the requirements file at the absolute path or URL requirements
+    for reading its lines.
+    """
+    if is_remote(requirements):
+        yield remote.fetch(requirements).splitlines()
+        return
+    if not os.path.exists(requirements):
+        raise ConfigurationError("Could not locate requirements file %s",
+                                 requirements)
+    with open(requirements) as reqs:
+        yield reqs
+
+
+def _yield_lines(strs, first_lineno=1):
+    """ Yield non-empty/non-comment lines with their line numbers. Lines
+    ending in a backslash are joined with the next, and numbered by the first.
+    """
+    continued = []
+    for lineno, line in enumerate(strs, first_lineno):
         line = line.strip()
+        if line.endswith('\\') and not line.startswith('#'):
+            if not continued:
+                start = lineno
+            continued.append(line[:-1].strip())
+            continue
+        if continued:
+            continued.append(line)
+            line = ' '.join(part for part in continued if part)
+            lineno = start
+            continued = []
         if line and not line.startswith('#'):
-            yield lineno+1, line
+            yield lineno, line
+    if continued:
+        yield start, ' '.join(part for part in continued if part)
 
 
-def _parse_requirements_iterable(reqs, source=None):
-    reqset = IReqSet()
+def _read_requirements_entries(requirements):
+    """ Parse the requirements file at the absolute path or URL requirements
+    into its entries, leaving -r includes unexpanded.
+    """
+    with _open_requirements(requirements) as reqs:
+        return [_parse_line_entry(line, source=requirements, lineno=lineno)
+                for lineno, line in _yield_lines(reqs)]
+
+
+def _include_resolver():
+    return IncludeResolver(_read_requirements_entries)
+
+
+def _expand_entry(entry, resolver, source=None):
+    if isinstance(entry, Include):
+        parents = (source,) if source else ()
+        return resolver.resolve(entry.path, parents=parents)
+    return [entry]
 
+
+def _process_line(line, reqset, source=None, lineno=None):
+    entry = _parse_line_entry(line, source=source, lineno=lineno)
+    for ireq in _expand_entry(entry, _include_resolver(), source=source):
+        reqset.add(ireq)
+
+
+def _iter_requirements_iterable(reqs, source=None):
+    resolver = _include_resolver()
     for lineno, line in _yield_lines(reqs):
-        _process_line(line, reqset, source=source, lineno=lineno)
+        entry = _parse_line_entry(line, source=source, lineno=lineno)
+        for ireq in _expand_entry(entry, resolver, source=source):
+            yield ireq
+
+
+def _iter_requirements_file(requirements):
+    requirements = _requirements_path(requirements)
+    with _open_requirements(requirements) as reqs:
+        for ireq in _iter_requirements_iterable(reqs, source=requirements):
+            yield ireq
+
+
+def _iter_requirements(requirements):
+    if requirements == '-':
+        requirements = sys.stdin
+    if isinstance(requirements, six.string_types):
+        return _iter_requirements_file(requirements)
+    source = getattr(requirements, 'name', None)
+    return _iter_requirements_iterable(requirements, source=source)
+
+
+def _parse_requirements_file(requirements, resolver=None):
+    requirements = _requirements_path(requirements)
+    if resolver is None:
+        resolver = _include_resolver()
+    reqset = IReqSet()
+
+    for ireq in resolver.resolve(requirements):
+        reqset.add(ireq)
 
     return reqset
 
 
-def _parse_requirements_file(requirements):
-    requirements = os.path.abspath(requirements)
-    if not os.path.exists(requirements):
-        raise ConfigurationError("Could not locate requirements file %s",
-                                 requirements)
+# Files are not split into chunks smaller than this many bytes.
+_MIN_CHUNK_SIZE = 1 << 16
 
-    with open(requirements) as reqs:
-        return _parse_requirements_iterable(reqs, source=requirements)
 
+def _is_continued(mm, newline):
+    """ Is the line ending at offset newline continued by a backslash? """
+    line_start = mm.rfind('\n', 0, newline) + 1
+    line = mm[line_start:newline].strip()
+    return line.endswith('\\') and not line.startswith('#')
 
-def parse_requirements_file(requirements):
-    """ Parse the pip requirements file specified by requirements.
 
-    Return a dictionary from package name to PipReq.
+def _line_chunks(mm, count):
+    """ Split the memory-mapped file mm into at most count chunks that end on
+    line boundaries. Return a (start, end, first_lineno) index of them.
     """
-    reqset = _parse_requirements_file(requirements)
-    return reqset.to_pipreq_dict()
+    size = len(mm)
+    chunks = []
+    start = 0
+    lineno = 1
+    for i in range(1, count + 1):
+        end = size
+        if i < count:
+            newline = mm.find('\n', max(start, size * i // count))
+            # never split a line continued with a backslash
+            while newline != -1 and _is_continued(mm, newline):
+                newline = mm.find('\n', newline + 1)
+            if newline != -1:
+                end = newline + 1
+        if end > start:
+            chunks.append((start, end, lineno))
+            lineno += mm[start:end].count('\n')
+            start = end
+        if start >= size:
+            break
+    return chunks
+
+
+class _RequiredSpecifiers(list):
+    """ Stands in for the ConflictDetector of a chunk's IReqSet, keeping the
+    (name, specifiers, comes_from) of every requirement that applies, so the
+    parent can check them in file order. """
+
+    def add(self, name, specifiers, comes_from=None):
+        self.append((name, specifiers, comes_from))
+
+
+@run_scoped
+@run_scoped
+def _parse_requirements_chunk(chunk):
+    """ Parse the lines between two byte offsets of a requirements file.
+
+    Runs in a worker process; returns a dictionary from package name to PipReq,
+    the paths of the files the chunk includes and the specifiers its
+    applicable requirements add, in order.
+    """
+    requirements, start, end, first_lineno = chunk
+    with open(requirements, 'rb') as fp:
+        mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            lines = mm[start:end].split('\n')
+        finally:
+            mm.close()
+
+    resolver = _include_resolver()
+    reqset = IReqSet()
+    reqset.conflicts = _RequiredSpecifiers()
+    for lineno, line in _yield_lines(lines, first_lineno):
+        entry = _parse_line_entry(line, source=requirements, lineno=lineno)
+        for ireq in _expand_entry(entry, resolver, source=requirements):
+            reqset.add(ireq)
+    return reqset.to_pipreq_dict(), resolver.files(), list(reqset.conflicts)
 
 
-def _get_installed_as_dist():
-    installed = {}
-    # pylint: disable=E1133
-    for p in pkg_resources.working_set:
-        installed[canonicalize_name(p.project_name)] = p
-    return installed
+def _chunk_jobs(requirements, jobs):
+    """ Return how many of jobs processes are worth parsing requirements, an
+    absolute path or URL, in: one for a URL, and otherwise no more than
+    there are CPUs, nor than chunks of _MIN_CHUNK_SIZE bytes. Starting a
+    pool costs more than it saves otherwise. """
+    if not jobs > 1 or is_remote(requirements):
+        return 1
+    from multiprocessing import cpu_count
+    try:
+        cpus = cpu_count()
+    except NotImplementedError:
+        cpus = 1
+    try:
+        size = os.path.getsize(requirements)
+    except OSError:
+        # the serial parse reports the missing file
+        return 1
+    return min(jobs, cpus, size // _MIN_CHUNK_SIZE + 1)
 
 
-def _get_installed_as_frozen_reqs():
-    installations = {}
+def _parse_requirements_file_chunked(requirements, jobs):
+    """ Parse the requirements file at the absolute path requirements in up to
+    jobs processes. Return the dictionary from package name to PipReq and the
+    paths of all files read.
+    """
+    if not os.path.exists(requirements):
+        raise ConfigurationError("Could not locate requirements file %s",
+                                 requirements)
 
-    for name, dist in _get_installed_as_dist().iteritems():
+    chunks = []
+    with open(requirements, 'rb') as fp:
+        size = os.fstat(fp.fileno()).st_size
+        if size:
+            count = min(jobs, size // _MIN_CHUNK_SIZE + 1)
+            mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                chunks = _line_chunks(mm, count)
+            finally:
+                mm.close()
+
+    chunks = [(requirements,) + chunk for chunk in chunks]
+    if len(chunks) > 1:
+        from multiprocessing import Pool
+        pool = Pool(jobs)
         try:
-            req = FrozenRequirement.from_dist(dist, [])
-        except Exception:
-            logger.warning(
-                "Could not parse requirement: %s",
-                dist.project_name
-            )
-            continue
-        installations[name] = req
+            results = pool.map(_parse_requirements_chunk, chunks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_parse_requirements_chunk(chunk) for chunk in chunks]
+
+    # every chunk's specifiers are checked in file order, and later chunks
+    # win, as later lines do when parsing serially
+    reqs = {}
+    files = {requirements}
+    conflicts = ConflictDetector()
+    for partial, included, required in results:
+        for name, specifiers, comes_from in required:
+            conflicts.add(name, specifiers, comes_from)
+        for name, pipreq in partial.iteritems():
+            if not evaluate_markers(pipreq.markers) and name in reqs and \
+                    evaluate_markers(reqs[name].markers):
+                continue
+            reqs[name] = pipreq
+        files.update(included)
+    return reqs, files
+
+
+def _metadata_files(reqs):
+    """ Return the set of files the dependencies of the local projects in
+    reqs, a dictionary of PipReqs, were read from.
+    """
+    files = set()
+    for pipreq in reqs.itervalues():
+        if pipreq.dependencies is not None:
+            link = Link(pipreq.link)
+            directory = os.path.join(url_to_path(link.url_without_fragment),
+                                     link.subdirectory_fragment or '')
+            files.update(static_deps.metadata_files(directory))
+    return files
+
+
+def iter_requirements(requirements):
+    """ Parse the pip requirements in requirements, a path, an open file or
+    '-' for stdin.
+
+    Yield a PipReq for each requirement as soon as its line is parsed,
+    including those pulled in with -r. Unlike parse_requirements_file, a
+    package listed more than once is yielded each time. Both raise
+    ConflictingRequirementsError when no version of a package satisfies
+    every line that lists it and whose markers hold.
+    """
+    conflicts = ConflictDetector()
+    with run_scope():
+        for ireq in _iter_requirements(requirements):
+            if ireq.match_markers():
+                conflicts.add(requirement_key(ireq), str(ireq.specifier),
+                              ireq.comes_from)
+            yield PipReq.from_ireq(ireq)
+
+
+def requirements_matrix(requirements, targets):
+    """ Parse the pip requirements in requirements, a path, an open file or
+    '-' for stdin, once against all of targets, (name, environment) pairs
+    as parse_targets returns.
+
+    Return a dictionary from target name to the dictionary from package
+    name to the PipReq that applies in that target.
+    """
+    matrix = {name: {} for name, _ in targets}
+    with run_scope():
+        for ireq in _iter_requirements(requirements):
+            pipreq = PipReq.from_ireq(ireq)
+            name = canonicalize_name(pipreq.project_name)
+            holds = pipreq.markers and compile_marker(pipreq.markers)
+            for target, environment in targets:
+                if not holds or holds(environment):
+                    matrix[target][name] = pipreq
+    return matrix
+
+
+@run_scoped
+def parse_requirements_file(requirements, cache=None, jobs=None):
+    """ Parse the pip requirements file specified by requirements, a path or
+    an http(s) URL.
+
+    Return a dictionary from package name to PipReq. When cache, a
+    RequirementsCache, is given the result is looked up in it first and
+    stored in it after parsing. When jobs is greater than one, a large local
+    file is split into chunks that are parsed by up to that many processes,
+    as many as there are CPUs.
+    """
+    requirements = _requirements_path(requirements)
+    if cache is not None:
+        reqs = cache.get(requirements)
+        if reqs is not None:
+            return reqs
+
+    jobs = _chunk_jobs(requirements, jobs)
+    if jobs > 1:
+        reqs, files = _parse_requirements_file_chunked(requirements, jobs)
+    else:
+        resolver = _include_resolver()
+        reqset = _parse_requirements_file(requirements, resolver)
+        reqs = reqset.to_pipreq_dict()
+        files = resolver.files(requirements)
+    if cache is not None:
+        cache.set(requirements, reqs, set(files) | _metadata_files(reqs))
+    return reqs
+
+
+def _get_installed_as_dist(paths=None):
+    return installed_distributions(paths)
+
+
+def _freeze(dist, paths=None):
+    """ Return the FrozenRequirement of dist, installed on paths, or None if
+    it can't be made.
+    """
+    try:
+        return FrozenRequirement.from_dist(dist, [], paths)
+    except Exception:
+        logger.warning(
+            "Could not parse requirement: %s",
+            dist.project_name
+        )
+        return None
+
+
+def _get_installed_as_frozen_reqs(workers=None, names=None,
+                                  environment=None, paths=None):
+    """ Return a dictionary from package name to the FrozenRequirement of
+    each distribution installed on paths, sys.path by default, or of those
+    among names, canonical package names, when given, freezing editables in
+    up to workers threads. When environment, an EnvironmentCache of the same
+    paths, is given the installed distributions and their
+    FrozenRequirements are taken from it where still current. """
+    if environment is not None:
+        installed = environment.distributions()
+    else:
+        installed = _get_installed_as_dist(paths)
+    if names is None:
+        names = sorted(installed)
+    else:
+        names = sorted(set(names) & set(installed))
+
+    frozen = {}
+    if environment is not None:
+        for name in names:
+            req = environment.frozen(name, installed[name])
+            if req is not None:
+                frozen[name] = req
+    pending = [name for name in names if name not in frozen]
+
+    # only editables run their VCS to be frozen, so only they get threads
+    editables = [name for name in pending
+                 if dist_is_editable(installed[name], paths)]
+    if len(editables) > 1 and (workers is None or workers > 1):
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(workers)
+        try:
+            results = pool.map(lambda dist: _freeze(dist, paths),
+                               [installed[name] for name in editables])
+        finally:
+            pool.close()
+            pool.join()
+        frozen.update(zip(editables, results))
 
+    installations = {}
+    for name in names:
+        if name in frozen:
+            req = frozen[name]
+        else:
+            req = _freeze(installed[name], paths)
+        if req is not None:
+            installations[name] = req
+
+    if environment is not None:
+        for name in pending:
+            if name in installations:
+                environment.remember(name, installed[name],
+                                     installations[name])
+        environment.save()
     return installations
 
 
@@ -231,15 +692,23 @@ def _versions_match(required, installed):
     if required is None:
         return True
 
-    try:
-        req = Specifier(required)
-    except InvalidSpecifier:
-        req = LegacySpecifier(required)
-
+    req = parse_specifier(required)
     contains = req.contains(installed[2:])
     return contains
 
 
+def _job_count(value):
+    """ The argparse type of a number of processes or threads. """
+    try:
+        jobs = int(value)
+    except ValueError:
+        jobs = None
+    if jobs is None or jobs < 1:
+        raise argparse.ArgumentTypeError(
+            "expected a number of at least 1, not %r" % value)
+    return jobs
+
+
 def _command_line_report(args):
     ap = argparse.ArgumentParser(
         description='Parse and manipulate pip dependencies'
@@ -248,7 +717,7 @@ def _command_line_report(args):
         '--file', '-f',
         type=str,
         default='requirements.txt',
-        help='pip-requirements file',
+        help="pip-requirements file or URL, or '-' to read from stdin",
     )
     ap.add_argument(
         '-q',
@@ -256,27 +725,123 @@ def _command_line_report(args):
         action='store_true',
         help='No output, only return value'
     )
+    ap.add_argument(
+        '--jobs', '-j',
+        type=_job_count,
+        default=None,
+        help='Parse large requirements files in this many processes',
+    )
+    ap.add_argument(
+        '--freeze-jobs',
+        type=_job_count,
+        default=None,
+        help='Freeze editable checkouts in this many threads '
+             '(default one per CPU)',
+    )
+    ap.add_argument(
+        '--only',
+        action='append',
+        metavar='GLOB',
+        help='Only compare packages whose names match GLOB; may be repeated',
+    )
+    ap.add_argument(
+        '--exclude',
+        action='append',
+        metavar='GLOB',
+        help="Don't compare packages whose names match GLOB; may be repeated",
+    )
+    ap.add_argument(
+        '--env',
+        action='append',
+        metavar='ROOT',
+        help='Compare against the virtualenv at ROOT instead of the running '
+             'interpreter; may be repeated, giving a report per virtualenv',
+    )
+    ap.add_argument(
+        '--installed-from',
+        metavar='SNAPSHOT',
+        help='Compare against the packages recorded in SNAPSHOT, written by '
+             'the snapshot command, instead of the running interpreter',
+    )
+    ap.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Parse requirements files and scan installed packages '
+             'without the on-disk caches',
+    )
+    ap.add_argument(
+        '--cache-dir',
+        type=str,
+        default=None,
+        help='Cache directory (default $XDG_CACHE_HOME/pipsqueak)',
+    )
     args = ap.parse_args(args)
-    filename = os.path.abspath(args.file)
-    if not os.path.exists(filename):
-        print "Could not locate %s" % filename
-        return 1
-    diff = report(filename)
+    if args.file == '-' or is_remote(args.file):
+        filename = args.file
+    else:
+        filename = os.path.abspath(args.file)
+        if not os.path.exists(filename):
+            print "Could not locate %s" % filename
+            return 1
+    if args.cache_dir:
+        remote.configure(args.cache_dir)
+    cache = None if args.no_cache else RequirementsCache(args.cache_dir)
+    if args.installed_from:
+        from pipsqueak.snapshot import Snapshot
+        try:
+            snapshot = Snapshot(args.installed_from)
+        except (ConfigurationError, IOError) as exc:
+            print exc
+            return 1
+        with snapshot:
+            diff = report(filename, cache=cache, jobs=args.jobs,
+                          only=args.only, exclude=args.exclude,
+                          installed_from=snapshot)
+        if not args.quiet:
+            print json.dumps(diff, indent=4)
+        return len(diff)
+
+    if args.env:
+        from pipsqueak.virtualenvs import VirtualEnvironment
+        try:
+            environments = [VirtualEnvironment(root) for root in args.env]
+        except ConfigurationError as exc:
+            print exc
+            return 1
+        environment_caches = None if args.no_cache else {
+            env.root: EnvironmentCache(args.cache_dir, env.paths)
+            for env in environments
+        }
+        diffs = report_environments(
+            filename, environments, cache=cache, jobs=args.jobs,
+            freeze_jobs=args.freeze_jobs, only=args.only,
+            exclude=args.exclude, environment_caches=environment_caches)
+        if not args.quiet:
+            print json.dumps(diffs, indent=4)
+        return sum(len(diff) for diff in diffs.values())
+
+    environment = None if args.no_cache else EnvironmentCache(args.cache_dir)
+    diff = report(filename, cache=cache, jobs=args.jobs,
+                  freeze_jobs=args.freeze_jobs, only=args.only,
+                  exclude=args.exclude, environment=environment)
     if not args.quiet:
         print json.dumps(diff, indent=4)
     return len(diff)
 
 
-def parse_installed():
-    # TODO: We keep the frozenreq around b/c it has the disk location and
-    # we can easily turn it into a Requirement. Add as_requirement and
-    # from_dist methods to PipReq and store location when created from dist.
-    # to PipReq and store location, i.e., from_dist() Or just store the dist
-    # too.
-    installed_frozen = _get_installed_as_frozen_reqs()
-    reqs = [str(dist.req) for dist in installed_frozen.itervalues()]
-    installed_reqs = _parse_requirements_iterable(reqs)
-    return installed_reqs, installed_frozen
+@run_scoped
+def parse_installed(workers=None, names=None, environment=None, paths=None):
+    """ Return dictionaries from package name to the PipReq and to the
+    FrozenRequirement of each package installed on paths, sys.path by
+    default, freezing editable checkouts in up to workers threads. When
+    names, canonical package names, are given only those packages are
+    looked up. environment, an EnvironmentCache of the same paths, saves
+    rescanning and refreezing what didn't change since the last run. """
+    installed_frozen = _get_installed_as_frozen_reqs(workers, names,
+                                                     environment, paths)
+    installed = {name: PipReq.from_frozen(frozen)
+                 for name, frozen in installed_frozen.iteritems()}
+    return installed, installed_frozen
 
 
 def _compare_versions(installed, required, dist):
@@ -311,45 +876,411 @@ def _compare_versions(installed, required, dist):
     return dict(diff)
 
 
-def _grab_vc_version_info(installed, required, frozen):
-    diff = defaultdict(lambda: defaultdict(dict))
+def _should_compare_vc(installed, required):
+    installed_vc = installed.version_control
+    required_vc = required.version_control
+    return (installed_vc and required_vc and
+            installed_vc['type'] == required_vc['type'])
 
-    check = []
-    for name, _ in required.iteritems():
-        if name not in installed:
-            continue
-        installed_vc = installed[name].version_control
-        required_vc = installed[name].version_control
-        if (installed_vc and required_vc and
-                installed_vc['type'] == required_vc['type']):
-            check.append(name)
-
-    pool = Pool()
-    for name in check:
-        diff[name] = pool.apply_async(
-            _compare_versions,
-            (installed[name], required[name], frozen[name])
-        )
-    pool.close()
-    pool.join()
 
-    consume = {name: obj.get() for name, obj in diff.iteritems() if obj.get()}
-    return consume
+def _unsupported_wheel(details, tags):
+    """ Return the filename of the wheel details is pinned to if none of its
+    tags are in tags, the set of supported tags, else None.
+    """
+    if not details.link:
+        return None
+    link = Link(details.link)
+    if not link.is_wheel or Wheel(link.filename).supported(tags):
+        return None
+    return link.filename
 
 
-def report(requirements):
-    required = parse_requirements_file(requirements)
-    for _, details in required.iteritems():
-        details.source = None
+def _command_line_verify(args):
+    ap = argparse.ArgumentParser(
+        description='Check local archives against their --hash pins'
+    )
+    ap.add_argument(
+        '--file', '-f',
+        type=str,
+        default='requirements.txt',
+        help='pip-requirements file',
+    )
+    ap.add_argument(
+        '-q',
+        '--quiet',
+        action='store_true',
+        help='No output, only return value'
+    )
+    ap.add_argument(
+        '--jobs', '-j',
+        type=_job_count,
+        default=None,
+        help='Hash this many archives at a time',
+    )
+    ap.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Hash every archive, ignoring cached digests',
+    )
+    ap.add_argument(
+        '--cache-dir',
+        type=str,
+        default=None,
+        help='Cache directory (default $XDG_CACHE_HOME/pipsqueak)',
+    )
+    args = ap.parse_args(args)
+    filename = os.path.abspath(args.file)
+    if not os.path.exists(filename):
+        print "Could not locate %s" % filename
+        return 1
+    cache = None if args.no_cache else DigestCache(args.cache_dir)
+    failures = verify_hashes(filename, cache=cache, jobs=args.jobs)
+    if not args.quiet:
+        print json.dumps(failures, indent=4)
+    return len(failures)
 
-    installed, installed_frozen = parse_installed()
-    installed = installed.to_pipreq_dict()
 
-    version_info = _grab_vc_version_info(installed, required, installed_frozen)
+def _command_line_matrix(args):
+    ap = argparse.ArgumentParser(
+        description='Show the requirements that apply in each of several '
+                    'target environments'
+    )
+    ap.add_argument(
+        '--file', '-f',
+        type=str,
+        default='requirements.txt',
+        help="pip-requirements file, or '-' to read from stdin",
+    )
+    ap.add_argument(
+        '--target', '-t',
+        action='append',
+        default=[],
+        help='Marker variables of a target, e.g. '
+             'python_version=3.6,sys_platform=win32',
+    )
+    ap.add_argument(
+        '--targets-file',
+        action='append',
+        default=[],
+        help='JSON list of marker dictionaries, or object from target name '
+             'to marker dictionary',
+    )
+    ap.add_argument(
+        '-q',
+        '--quiet',
+        action='store_true',
+        help='No output, only return value'
+    )
+    args = ap.parse_args(args)
+    documents = []
+    for path in args.targets_file:
+        with open(path) as fp:
+            documents.append(fp.read())
+    try:
+        targets = parse_targets(args.target, documents)
+    except ValueError as exc:
+        print "Invalid target: %s" % exc
+        return 1
+    if not targets:
+        print "No target environments given"
+        return 1
+
+    if args.file != '-':
+        args.file = os.path.abspath(args.file)
+        if not os.path.exists(args.file):
+            print "Could not locate %s" % args.file
+            return 1
+    matrix = requirements_matrix(args.file, targets)
+    if not args.quiet:
+        print json.dumps({
+            target: {name: pipreq.to_dict() for name, pipreq in reqs.items()}
+            for target, reqs in matrix.items()
+        }, indent=4, sort_keys=True)
+    return 0
+
+
+def _command_line_snapshot(args):
+    ap = argparse.ArgumentParser(
+        description='Write a snapshot of the installed packages that report '
+                    '--installed-from can compare against'
+    )
+    ap.add_argument(
+        '--output', '-o',
+        required=True,
+        help='Path of the snapshot to write',
+    )
+    ap.add_argument(
+        '--from-freeze',
+        metavar='FILE',
+        help="Record the packages in FILE, pip freeze output or '-' for "
+             "stdin, instead of the installed ones",
+    )
+    ap.add_argument(
+        '--env',
+        metavar='ROOT',
+        help='Record the packages of the virtualenv at ROOT instead of the '
+             "running interpreter; with --from-freeze, only its interpreter's "
+             'markers',
+    )
+    ap.add_argument(
+        '--target', '-t',
+        help='Marker variables of the interpreter the packages are installed '
+             'for, e.g. python_version=3.6,sys_platform=linux, overriding '
+             "those of the running interpreter or of --env's",
+    )
+    args = ap.parse_args(args)
+    from pipsqueak.snapshot import from_freeze, stored, write_snapshot
+    paths = None
+    markers = dict(current_environment(), extra='')
+    try:
+        if args.env:
+            from pipsqueak.virtualenvs import VirtualEnvironment
+            env = VirtualEnvironment(args.env)
+            paths, markers = env.paths, dict(env.markers)
+        if args.target:
+            markers.update(parse_inline_target(args.target))
+    except (ConfigurationError, ValueError) as exc:
+        print exc
+        return 1
+
+    if args.from_freeze == '-':
+        pipreqs = from_freeze(sys.stdin)
+    elif args.from_freeze:
+        with open(args.from_freeze) as fp:
+            pipreqs = from_freeze(fp)
+    else:
+        installed, _ = parse_installed(paths=paths)
+        pipreqs = {name: stored(pipreq)
+                   for name, pipreq in installed.items()}
+    write_snapshot(args.output, pipreqs, markers)
+    logger.info("Wrote %d packages to %s", len(pipreqs), args.output)
+    return 0
+
+
+def _command_line_prune_cache(args):
+    ap = argparse.ArgumentParser(
+        description='Remove entries from the requirements cache'
+    )
+    ap.add_argument(
+        '--max-age',
+        type=float,
+        default=None,
+        help='Only remove entries unused for this many days',
+    )
+    ap.add_argument(
+        '--cache-dir',
+        type=str,
+        default=None,
+        help='Cache directory (default $XDG_CACHE_HOME/pipsqueak)',
+    )
+    args = ap.parse_args(args)
+    max_age = args.max_age * 86400 if args.max_age is not None else None
+    removed = RequirementsCache(args.cache_dir).prune(max_age)
+    logger.info("Removed %d cache entries", removed)
+    return 0
+
+
+@run_scoped
+def verify_hashes(requirements, cache=None, jobs=None):
+    """ Hash the local archives the requirements file pins with --hash, in
+    up to jobs threads, skipping digests found in cache, a DigestCache.
+
+    Return a dictionary from package name to each archive that's missing or
+    doesn't match its pins.
+    """
+    reqset = _parse_requirements_file(requirements)
+    return verify(reqset.itervalues(), cache=cache, workers=jobs)
+
+
+def _selected(name, only=None, exclude=None):
+    """ Is the canonical package name matched by a glob in only, when there
+    are any, and by none in exclude? """
+    if only and not any(fnmatchcase(name, canonicalize_name(pattern))
+                        for pattern in only):
+        return False
+    return not (exclude and any(fnmatchcase(name, canonicalize_name(pattern))
+                                for pattern in exclude))
+
+
+def _is_running_interpreter(markers):
+    """ Is markers, a marker environment, the running interpreter's? """
+    return markers is None or markers == dict(current_environment(), extra='')
+
+
+def _iter_pipreqs(requirements):
+    """ Yield the PipReq of every line of requirements, leaving conflicts
+    to be checked by the caller. """
+    with run_scope():
+        for ireq in _iter_requirements(requirements):
+            yield PipReq.from_ireq(ireq)
+
+
+def _report_requirements(requirements, cache=None, jobs=None, host=True):
+    """ Return an iterable of the PipReqs in requirements for _applicable,
+    read through cache and in jobs processes when requirements is a path.
+
+    Parsing keeps one requirement per package, chosen by the markers of the
+    running interpreter, so unless host is true every line is returned
+    instead, for _applicable to choose by the markers it's given.
+    """
+    if host and (cache is not None or jobs > 1) and requirements != '-' and \
+            isinstance(requirements, six.string_types):
+        return parse_requirements_file(
+            requirements, cache=cache, jobs=jobs,
+        ).itervalues()
+    return _iter_pipreqs(requirements)
+
+
+def _applicable(reqs, only=None, exclude=None, markers=None):
+    """ Return a dictionary from package name to the PipReqs in reqs whose
+    markers hold in markers, a marker environment, or the running
+    interpreter's, and whose names _selected keeps. Requirements that name
+    no package are skipped with a warning. A later requirement for a
+    package replaces an earlier one, and ConflictingRequirementsError is
+    raised if no version satisfies both. """
+    required = {}
+    conflicts = ConflictDetector()
+    for details in reqs:
+        if markers is None:
+            holds = evaluate_markers(details.markers)
+        else:
+            holds = (not details.markers or
+                     compile_marker(details.markers)(markers))
+        if not holds:
+            continue
+        if not details.project_name:
+            # an archive given only by its path or URL can't be matched to
+            # an installed distribution
+            logger.warning("Skipping %s, which names no package",
+                           details.link)
+            continue
+        name = canonicalize_name(details.project_name)
+        if details.source:
+            comes_from = '%s:%s' % (details.source, details.line_number)
+        else:
+            comes_from = None
+        conflicts.add(name, details.specifiers or '', comes_from)
+        if not _selected(name, only, exclude):
+            continue
+        details.source = None
+        required[name] = details
+    return required
+
+
+@run_scoped
+def report(requirements, cache=None, jobs=None, freeze_jobs=None,
+           only=None, exclude=None, environment=None, installed_from=None):
+    """ Compare the pip requirements in requirements, a path, an open file or
+    '-' for stdin, against the installed packages.
+
+    A requirements file given by path is read through cache, a
+    RequirementsCache, when one is given, and parsed in jobs processes when
+    jobs is greater than one. Requirements whose markers don't hold here,
+    and those whose names don't match a glob in only or do match one in
+    exclude, are dropped. Only the installed packages the remaining
+    requirements name are looked up, with editable checkouts frozen in up
+    to freeze_jobs threads, through environment, an EnvironmentCache, when
+    one is given.
+
+    When installed_from, a Snapshot, is given the installed packages are
+    looked up in it instead, and markers and wheel tags are judged for the
+    interpreter it was taken from. Its checkouts aren't on this machine, so
+    their revisions aren't compared with the required ones.
+    """
+    if installed_from is not None:
+        markers = installed_from.markers
+        reqs = _report_requirements(requirements, cache, jobs,
+                                    _is_running_interpreter(markers))
+        required = _applicable(reqs, only, exclude, markers)
+        return _compare(required, installed_from.lookup(required), None,
+                        installed_from.tags)
+    reqs = _report_requirements(requirements, cache, jobs)
+    required = _applicable(reqs, only, exclude)
+    installed, installed_frozen = parse_installed(freeze_jobs, required,
+                                                  environment)
+    return _compare(required, installed, installed_frozen)
+
+
+@run_scoped
+def report_environments(requirements, environments, cache=None, jobs=None,
+                        freeze_jobs=None, only=None, exclude=None,
+                        environment_caches=None):
+    """ Compare the pip requirements in requirements against the packages
+    installed in each of environments, VirtualEnvironments, returning a
+    dictionary from environment root to its report.
+
+    requirements is read once, as report reads it, and its markers are
+    evaluated against each environment's interpreter. It's only read
+    through cache, or in jobs processes, when every environment's markers
+    are the running interpreter's. The environments are
+    scanned and frozen concurrently, each through its EnvironmentCache in
+    environment_caches, a dictionary keyed by root, when there is one.
+    """
+    host = all(_is_running_interpreter(env.markers) for env in environments)
+    reqs = list(_report_requirements(requirements, cache, jobs, host))
+    environment_caches = environment_caches or {}
+    required = {env.root: _applicable(reqs, only, exclude, env.markers)
+                for env in environments}
+
+    def scan(env):
+        return parse_installed(freeze_jobs, required[env.root],
+                               environment_caches.get(env.root), env.paths)
+
+    if len(environments) > 1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(len(environments))
+        try:
+            scanned = pool.map(scan, environments)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        scanned = [scan(env) for env in environments]
+
+    return {
+        env.root: _compare(required[env.root], installed, installed_frozen,
+                           env.tags)
+        for env, (installed, installed_frozen) in zip(environments, scanned)
+    }
+
+
+def _compare(required, installed, installed_frozen, tags=None):
+    """ Return the differences between required and installed, dictionaries
+    from package name to PipReq, judging pinned wheels by tags, those of
+    the running interpreter by default. Checkouts are only compared with
+    the required revisions when their FrozenRequirements, installed_frozen,
+    are given. """
+    pending = {}
+    pool = None
+    for name, details in sorted(required.iteritems()):
+        if (installed_frozen is not None and name in installed and
+                _should_compare_vc(installed[name], details)):
+            if pool is None:
+                from multiprocessing import Pool
+                pool = Pool()
+            pending[name] = pool.apply_async(
+                _compare_versions,
+                (installed[name], details, installed_frozen[name])
+            )
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    version_info = {}
+    for name, result in pending.iteritems():
+        result = result.get()
+        if result:
+            version_info[name] = result
 
     diff = defaultdict(lambda: defaultdict(dict))
+    if tags is None:
+        tags = get_supported()
 
     for name, details in required.iteritems():
+        unsupported = _unsupported_wheel(details, tags)
+        if unsupported:
+            diff[name]['wheel']['unsupported'] = unsupported
+
         if name not in installed:
             if details.specifiers:
                 diff[name]['specifiers'] = details.specifiers
@@ -389,22 +1320,41 @@ def report(requirements):
                     diff[name]['specifiers']['installed'] = installed_specs
                     diff[name]['specifiers']['required'] = required_specs
 
+    logger.debug("Parsed object memo: %s", cache_info())
     return diff
 
 
+def _configure_logging(level):
+    stream_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+    stream_handler.setFormatter(formatter)
+    root_logger = logging.getLogger('')
+    root_logger.addHandler(stream_handler)
+    logger.setLevel(level.upper())
+
+
 def main():
     ap = argparse.ArgumentParser(
         description='Parse and compare python dependencies'
     )
     ap.add_argument('--logging', choices=['info', 'warn', 'debug'],
                     help='log level', default='info')
-    ap.add_argument('command', choices=['report'])
+    ap.add_argument('command', choices=sorted(COMMANDS))
     ap.add_argument('args', nargs=argparse.REMAINDER)
     args = ap.parse_args()
 
-    logger.setLevel(args.logging.upper())
+    _configure_logging(args.logging)
+
+    return COMMANDS[args.command](args.args)
+
 
-    return _command_line_report(args.args)
+COMMANDS = {
+    'report': _command_line_report,
+    'matrix': _command_line_matrix,
+    'prune-cache': _command_line_prune_cache,
+    'snapshot': _command_line_snapshot,
+    'verify': _command_line_verify,
+}
 
 
 if __name__ == '__main__':
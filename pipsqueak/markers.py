@@ -0,0 +1,215 @@
+"""Evaluation of environment markers against the running interpreter, or a
+matrix of target environments
+
+Each distinct marker is compiled once into a function of an environment
+dictionary, with its version specifiers built ahead of time, so evaluating
+it against one more environment costs a few dictionary lookups. The
+running interpreter's environment is computed once per process, and each
+marker's result against it is remembered.
+"""
+import json
+import operator
+import threading
+
+from pipsqueak.exceptions import PipsqueakError
+from pipsqueak.memo import LRUCache, parse_marker
+
+_environment = None
+_results = {}
+_lock = threading.Lock()
+_compiled = LRUCache()
+
+# packaging.markers builds its grammar with pyparsing when it's imported, so
+# it and packaging.specifiers are bound by _load_packaging on first use
+_markers = None
+_specifiers = None
+
+# the comparisons used when the right side isn't a version
+_operators = {
+    'in': lambda lhs, rhs: lhs in rhs,
+    'not in': lambda lhs, rhs: lhs not in rhs,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>=': operator.ge,
+    '>': operator.gt,
+}
+
+
+def _load_packaging():
+    global _markers, _specifiers
+    if _markers is None:
+        from packaging import markers, specifiers
+        _specifiers = specifiers
+        _markers = markers
+
+
+def current_environment():
+    """ Return the marker environment of the running interpreter. The
+    dictionary is shared and must not be mutated.
+    """
+    global _environment
+    if _environment is None:
+        _load_packaging()
+        _environment = _markers.default_environment()
+    return _environment
+
+
+def _lookup(environment, name):
+    try:
+        return environment[name]
+    except KeyError:
+        raise _markers.UndefinedEnvironmentName(
+            "%r does not exist in evaluation environment." % name)
+
+
+def _operand(node):
+    """ Return a function of an environment giving the value of node. """
+    if isinstance(node, _markers.Variable):
+        name = node.value
+        return lambda environment: _lookup(environment, name)
+    value = node.value
+    return lambda environment: value
+
+
+def _compare(op, lhs, rhs):
+    """ Evaluate lhs op rhs the way packaging does: as a version
+    specifier when op and rhs make one, else as a plain comparison.
+    """
+    try:
+        spec = _specifiers.Specifier(op + rhs)
+    except _specifiers.InvalidSpecifier:
+        pass
+    else:
+        return spec.contains(lhs)
+    try:
+        return _operators[op](lhs, rhs)
+    except KeyError:
+        raise _markers.UndefinedComparison(
+            "Undefined %r on %r and %r." % (op, lhs, rhs))
+
+
+def _compile_comparison(lhs, op, rhs):
+    op = op.serialize()
+    if not isinstance(rhs, _markers.Variable):
+        try:
+            spec = _specifiers.Specifier(op + rhs.value)
+        except _specifiers.InvalidSpecifier:
+            pass
+        else:
+            # the common case, e.g. python_version >= "3", is compiled to
+            # a prebuilt specifier
+            left = _operand(lhs)
+            return lambda environment: spec.contains(left(environment))
+    left, right = _operand(lhs), _operand(rhs)
+    return lambda environment: _compare(op, left(environment),
+                                        right(environment))
+
+
+def _compile_markers(markers):
+    # "and" binds tighter than "or": any group of anded items holding
+    groups = [[]]
+    for item in markers:
+        if isinstance(item, list):
+            groups[-1].append(_compile_markers(item))
+        elif isinstance(item, tuple):
+            groups[-1].append(_compile_comparison(*item))
+        elif item == 'or':
+            groups.append([])
+    groups = [tuple(group) for group in groups]
+    return lambda environment: any(
+        all(test(environment) for test in group) for group in groups)
+
+
+def _parsed(marker):
+    """ Return the parsed form of marker, a Marker: a list of (lhs, op,
+    rhs) comparisons, 'and', 'or' and nested lists. """
+    # packaging keeps it in a private attribute, so a release that doesn't
+    # is reported rather than failing with an AttributeError
+    try:
+        return marker._markers
+    except AttributeError:
+        import packaging
+        raise PipsqueakError(
+            "packaging %s is not supported, pipsqueak needs "
+            "packaging>=20,<22" % packaging.__version__)
+
+
+def _compile(marker):
+    _load_packaging()
+    return _compile_markers(_parsed(parse_marker(marker)))
+
+
+def compile_marker(marker):
+    """ Return a function from an environment dictionary to whether marker,
+    a Marker or marker string, holds in it.
+    """
+    return _compiled.get(str(marker), _compile)
+
+
+def evaluate(marker, extra=''):
+    """ Does marker, a Marker or marker string, hold in the current
+    environment when extra is the extra being installed?
+    """
+    if marker is None:
+        return True
+    key = (str(marker), extra)
+    try:
+        return _results[key]
+    except KeyError:
+        pass
+    environment = dict(current_environment(), extra=extra)
+    result = compile_marker(marker)(environment)
+    with _lock:
+        _results[key] = result
+    return result
+
+
+def parse_inline_target(target):
+    """ Return the marker variables target, a string of comma separated
+    key=value pairs, sets. """
+    environment = {}
+    for assignment in target.split(','):
+        key, sep, value = assignment.partition('=')
+        if not sep or not key.strip():
+            raise ValueError("Expected key=value in target %r" % target)
+        environment[key.strip()] = value.strip()
+    return environment
+
+
+def parse_targets(inline=(), documents=()):
+    """
+    Return a list of (name, environment) targets from inline, strings of
+    comma separated key=value marker variables, and documents, JSON texts
+    holding either a list of marker dictionaries or an object from target
+    name to marker dictionary. Variables a target doesn't set are those of
+    the running interpreter, and extra is always ''.
+    """
+    named = []
+    for target in inline:
+        named.append((target, parse_inline_target(target)))
+    for document in documents:
+        document = json.loads(document)
+        if isinstance(document, dict):
+            named.extend(sorted(document.items()))
+        else:
+            for environment in document:
+                name = ','.join('%s=%s' % item
+                                for item in sorted(environment.items()))
+                named.append((name, environment))
+
+    targets = []
+    for name, environment in named:
+        full = dict(current_environment(), extra='')
+        full.update(environment)
+        targets.append((name, full))
+    return targets
+
+
+def clear():
+    global _environment
+    with _lock:
+        _environment = None
+        _results.clear()
+    _compiled.clear()
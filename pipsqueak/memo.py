@@ -0,0 +1,118 @@
+"""Bounded, thread-safe memoization of parsed packaging objects
+
+Requirement, Marker and Specifier parsing is slow pyparsing work while the
+same strings recur across included files, the installed set and repeated
+reports. The objects handed out here are shared and must not be mutated.
+"""
+from collections import namedtuple, OrderedDict
+import threading
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+class LRUCache(object):
+    """ A mapping from key to value that forgets the least recently used
+    keys beyond maxsize, and counts its hits and misses.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        """ Return the value for key, calling factory(key) to create it on a
+        miss. Exceptions raised by factory propagate and are not cached.
+        """
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                pass
+            else:
+                self._data[key] = value
+                self.hits += 1
+                return value
+
+        value = factory(key)
+        with self._lock:
+            self.misses += 1
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize,
+                             len(self._data))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_requirements = LRUCache()
+_markers = LRUCache()
+_specifiers = LRUCache()
+
+
+# packaging's requirement and marker grammars are built with pyparsing at
+# import time, and its specifiers import its tags machinery, so each is only
+# imported once something needs parsing
+def _make_requirement(req):
+    from packaging.requirements import Requirement
+    return Requirement(req)
+
+
+def _make_marker(marker):
+    from packaging.markers import Marker
+    return Marker(marker)
+
+
+def _make_specifier(spec):
+    from packaging.specifiers import (
+        InvalidSpecifier,
+        LegacySpecifier,
+        Specifier,
+    )
+    try:
+        return Specifier(spec)
+    except InvalidSpecifier:
+        return LegacySpecifier(spec)
+
+
+def parse_requirement(req):
+    """ Return the packaging Requirement for the string req. """
+    return _requirements.get(req, _make_requirement)
+
+
+def parse_marker(marker):
+    """ Return the packaging Marker for the string marker. """
+    return _markers.get(marker, _make_marker)
+
+
+def parse_specifier(spec):
+    """ Return the Specifier, or LegacySpecifier if it is not PEP 440
+    compliant, for the string spec.
+    """
+    return _specifiers.get(spec, _make_specifier)
+
+
+def cache_info():
+    """ Return the CacheInfo of each memo by the kind of object it holds. """
+    return {
+        'requirement': _requirements.info(),
+        'marker': _markers.info(),
+        'specifier': _specifiers.info(),
+    }
+
+
+def clear():
+    for cache in (_requirements, _markers, _specifiers):
+        cache.clear()
@@ -1,7 +1,10 @@
 from functools import partial
 import optparse
 from optparse import Option
+import re
+import shlex
 
+from pipsqueak.hashes import STRONG_HASHES
 from pipsqueak.pip.index import PyPI
 from pipsqueak.exceptions import RequirementsFileParseError
 
@@ -115,6 +118,36 @@ require_hashes = partial(
 )
 
 
+def _merge_hash(option, opt_str, value, parser):
+    """Given a value spelled "algo:digest", append the digest to a list
+    pointed to in a dict by the algo name."""
+    if not parser.values.hashes:
+        parser.values.hashes = {}
+    try:
+        algo, digest = value.split(':', 1)
+    except ValueError:
+        parser.error('Arguments to %s must be a hash name '
+                     'followed by a value, like --hash=sha256:abcde...' %
+                     opt_str)
+    if algo not in STRONG_HASHES:
+        parser.error('Allowed hash algorithms for %s are %s.' %
+                     (opt_str, ', '.join(STRONG_HASHES)))
+    parser.values.hashes.setdefault(algo, []).append(digest)
+
+
+def hash():
+    return Option(
+        '--hash',
+        # Hash values eventually end up in InstallRequirement.options.
+        dest='hashes',
+        action='callback',
+        callback=_merge_hash,
+        type='string',
+        help="Verify that the package's archive matches this "
+             'hash before installing. Example: --hash=sha256:abcdef...',
+    )
+
+
 SUPPORTED_OPTIONS = [
     constraints,
     editable,
@@ -125,8 +158,16 @@ SUPPORTED_OPTIONS = [
     extra_index_url,
     trusted_host,
     require_hashes,
+    hash,
+]
+
+# options that apply to the requirement on the line they're given
+SUPPORTED_OPTIONS_REQ = [
+    hash,
 ]
 
+SUPPORTED_OPTIONS_REQ_DEST = [o().dest for o in SUPPORTED_OPTIONS_REQ]
+
 
 def break_args_options(line):
     """Break up the line into an args and options string.  We only want to shlex
@@ -163,6 +204,77 @@ def build_parser(line):
         msg = 'Invalid requirement: %s\n%s' % (line, msg)
         raise RequirementsFileParseError(msg)
     parser.exit = parser_exit
-    parser.exit = parser_exit
 
     return parser
+
+
+# Matches the overwhelmingly common option lines, `-e <url>` and
+# `-r <file>`, whose single value needs no shlex unquoting.
+_simple_option_re = re.compile(
+    r'^(?:-(?P<short>[er])\s+|--(?P<long>editable|requirement)(?:=|\s+))'
+    r'(?P<value>[^\s\'"\\]+)$'
+)
+
+_option_dests = {
+    'e': 'editables',
+    'editable': 'editables',
+    'r': 'requirements',
+    'requirement': 'requirements',
+}
+
+_default_values = None
+
+
+def _get_default_values():
+    """
+    Return a fresh optparse.Values holding the defaults of SUPPORTED_OPTIONS.
+    The defaults are computed once; list defaults are copied so that callers
+    may append to them.
+    """
+    global _default_values
+    if _default_values is None:
+        _default_values = build_parser('').get_default_values().__dict__
+    defaults = {}
+    for dest, value in _default_values.items():
+        if isinstance(value, list):
+            value = list(value)
+        defaults[dest] = value
+    return optparse.Values(defaults)
+
+
+def _fast_parse_line(line):
+    """
+    Tokenize a requirement line without optparse or shlex. Returns None if
+    the line carries options that need the full parser.
+    """
+    if not line.startswith('-'):
+        if ' -' in line:
+            return None
+        return line, _get_default_values()
+
+    match = _simple_option_re.match(line)
+    if not match:
+        return None
+    opts = _get_default_values()
+    dest = _option_dests[match.group('short') or match.group('long')]
+    getattr(opts, dest).append(match.group('value'))
+    return '', opts
+
+
+def _full_parse_line(line):
+    parser = build_parser(line)
+    defaults = parser.get_default_values()
+    args_str, options_str = break_args_options(line)
+    opts, _ = parser.parse_args(shlex.split(options_str), defaults)
+    return args_str, opts
+
+
+def parse_line(line):
+    """
+    Split a requirement line into its requirement string and an
+    optparse.Values of the options found on it.
+    """
+    parsed = _fast_parse_line(line)
+    if parsed is None:
+        parsed = _full_parse_line(line)
+    return parsed
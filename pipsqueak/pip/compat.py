@@ -15,6 +15,14 @@ def samefile(file1, file2):
         return path1 == path2
 
 
+def buffer_slice(obj, offset, size):
+    """Return a view of size bytes of obj from offset, without copying."""
+    try:
+        return buffer(obj, offset, size)
+    except NameError:
+        return memoryview(obj)[offset:offset + size]
+
+
 def console_to_str(readline):
     return readline
 
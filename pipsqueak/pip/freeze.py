@@ -3,28 +3,35 @@ import re
 import logging
 
 from pipsqueak.pip.vcs import vcs, get_src_requirement
-from pipsqueak.pip.util import dist_is_editable
+from pipsqueak.pip.util import dist_editable_location, dist_is_editable
+from pipsqueak.slots import SlottedObject, intern_string
 
 logger = logging.getLogger(__file__)
 
 
-class FrozenRequirement(object):
+class FrozenRequirement(SlottedObject):
+    __slots__ = ('name', 'req', 'editable', 'comments', 'location')
+
     def __init__(self, name, req, editable, location, comments=()):
-        self.name = name
+        self.name = intern_string(name)
         self.req = req
         self.editable = editable
         self.comments = comments
-        self.location = location
+        self.location = intern_string(location)
 
     _rev_re = re.compile(r'-r(\d+)$')
     _date_re = re.compile(r'-(20\d\d\d\d\d\d)$')
 
     @classmethod
-    def from_dist(cls, dist, dependency_links):
-        location = os.path.normcase(os.path.abspath(dist.location))
+    def from_dist(cls, dist, dependency_links, paths=None):
+        """ Freeze dist, installed on paths, sys.path by default. """
+        # PEP 660 editables keep their metadata in site-packages, away from
+        # the source directory
+        location = dist_editable_location(dist, paths) or dist.location
+        location = os.path.normcase(os.path.abspath(location))
         comments = []
 
-        if dist_is_editable(dist) and vcs.get_backend_name(location):
+        if dist_is_editable(dist, paths) and vcs.get_backend_name(location):
             editable = True
             try:
                 req = get_src_requirement(dist, location)
@@ -46,11 +53,11 @@ class FrozenRequirement(object):
         else:
             editable = False
             req = dist.as_requirement()
-            specs = req.specs
-            assert len(specs) == 1 and specs[0][0] in ["==", "==="], \
+            specs = list(req.specifier)
+            assert len(specs) == 1 and specs[0].operator in ["==", "==="], \
                 'Expected 1 spec with == or ===; specs = %r; dist = %r' % \
                 (specs, dist)
-            version = specs[0][1]
+            version = specs[0].version
             ver_match = cls._rev_re.search(version)
             date_match = cls._date_re.search(version)
             if ver_match or date_match:
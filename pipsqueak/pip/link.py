@@ -2,10 +2,71 @@ import posixpath
 from urlparse import urlsplit, unquote, urlunsplit
 import re
 
+from pipsqueak.memo import LRUCache
 from pipsqueak.pip.util import path_to_url, splitext
+from pipsqueak.slots import SlottedObject, intern_string
+
+
+# user@host:path, as git and scp spell ssh locations
+_scp_re = re.compile(r'^(?:[^@/]+@)?(?P<host>[^:/]{2,}):(?!//)(?P<path>.*)$')
+
+# default ports of the protocols repositories are reached over
+_default_ports = frozenset(['22', '80', '443', '9418'])
+
+_canonical_keys = LRUCache()
+
+
+def _strip_rev(path):
+    return path.rsplit('@', 1)[0] if '@' in path else path
+
+
+def _canonical_url_key(url):
+    url = url.strip().split('#', 1)[0]
+    if '://' in url:
+        scheme, netloc, path, _, _ = urlsplit(url)
+        if '+' in scheme:
+            # a VCS URL, where the revision follows the path after an @
+            scheme = scheme.split('+', 1)[1]
+            path = _strip_rev(path)
+        host = netloc.rsplit('@', 1)[-1].lower()
+        if ':' in host:
+            hostname, port = host.rsplit(':', 1)
+            if port in _default_ports:
+                host = hostname
+        if scheme == 'file':
+            host = ''
+    else:
+        vcs_prefix, sep, rest = url.partition('+')
+        if sep and '/' not in vcs_prefix and ':' not in vcs_prefix:
+            url = _strip_rev(rest)
+        match = _scp_re.match(url)
+        if match is None:
+            return url.rstrip('/')
+        host = match.group('host').lower()
+        path = match.group('path')
+
+    path = unquote(path).rstrip('/')
+    if path.endswith('.git'):
+        path = path[:-len('.git')]
+    return '%s/%s' % (host, path.lstrip('/'))
+
+
+def canonical_url_key(url):
+    """
+    Return a key that's equal for the spellings of a repository URL that
+    reach the same repository: the VCS prefix, user, default port,
+    revision, fragment, trailing slash and .git suffix are dropped, and
+    scp-style user@host:path locations are read as ssh URLs. So
+    git+ssh://git@github.com/org/repo.git@v1, git@github.com:org/repo and
+    https://github.com/org/repo/ all have the key github.com/org/repo.
+    """
+    return _canonical_keys.get(url, _canonical_url_key)
+
+
+class Link(SlottedObject):
+    __slots__ = ('url', 'comes_from', 'requires_python', '_parts',
+                 '_fragments')
 
-
-class Link(object):
     def __init__(self, url, comes_from=None, requires_python=None):
         """
         Object representing a parsed link from https://pypi.python.org/simple/*
@@ -24,7 +85,7 @@ class Link(object):
         if url.startswith('\\\\'):
             url = path_to_url(url)
 
-        self.url = url
+        self.url = intern_string(url)
         self.comes_from = comes_from
         self.requires_python = requires_python if requires_python else None
 
@@ -74,9 +135,17 @@ class Link(object):
     def __hash__(self):
         return hash(self.url)
 
+    def _split(self):
+        """ Return the urlsplit of url, splitting it on first use. """
+        try:
+            return self._parts
+        except AttributeError:
+            self._parts = urlsplit(self.url)
+            return self._parts
+
     @property
     def filename(self):
-        _, netloc, path, _, _ = urlsplit(self.url)
+        _, netloc, path, _, _ = self._split()
         name = posixpath.basename(path.rstrip('/')) or netloc
         name = unquote(name)
         assert name, ('URL %r produced no filename' % self.url)
@@ -84,15 +153,15 @@ class Link(object):
 
     @property
     def scheme(self):
-        return urlsplit(self.url)[0]
+        return self._split()[0]
 
     @property
     def netloc(self):
-        return urlsplit(self.url)[1]
+        return self._split()[1]
 
     @property
     def path(self):
-        return unquote(urlsplit(self.url)[2])
+        return unquote(self._split()[2])
 
     def splitext(self):
         return splitext(posixpath.basename(self.path.rstrip('/')))
@@ -103,44 +172,53 @@ class Link(object):
 
     @property
     def url_without_fragment(self):
-        scheme, netloc, path, query, _ = urlsplit(self.url)
+        scheme, netloc, path, query, _ = self._split()
         return urlunsplit((scheme, netloc, path, query, None))
 
     _egg_fragment_re = re.compile(r'[#&]egg=([^&]*)')
+    _subdirectory_fragment_re = re.compile(r'[#&]subdirectory=([^&]*)')
+    _hash_re = re.compile(
+        r'(sha1|sha224|sha384|sha256|sha512|md5)=([a-f0-9]+)'
+    )
+
+    def _fragment_info(self):
+        """ Return the egg and subdirectory fragments, hash name and hash of
+        url, searching for them on first use.
+        """
+        try:
+            return self._fragments
+        except AttributeError:
+            pass
+        egg = self._egg_fragment_re.search(self.url)
+        subdirectory = self._subdirectory_fragment_re.search(self.url)
+        hash_match = self._hash_re.search(self.url)
+        self._fragments = (
+            egg.group(1) if egg else None,
+            subdirectory.group(1) if subdirectory else None,
+            hash_match.group(1) if hash_match else None,
+            hash_match.group(2) if hash_match else None,
+        )
+        return self._fragments
 
     @property
     def egg_fragment(self):
-        match = self._egg_fragment_re.search(self.url)
-        if not match:
-            return None
-        return match.group(1)
-
-    _subdirectory_fragment_re = re.compile(r'[#&]subdirectory=([^&]*)')
+        return self._fragment_info()[0]
 
     @property
     def subdirectory_fragment(self):
-        match = self._subdirectory_fragment_re.search(self.url)
-        if not match:
-            return None
-        return match.group(1)
+        return self._fragment_info()[1]
 
-    _hash_re = re.compile(
-        r'(sha1|sha224|sha384|sha256|sha512|md5)=([a-f0-9]+)'
-    )
+    @property
+    def hash_name(self):
+        return self._fragment_info()[2]
 
     @property
     def hash(self):
-        match = self._hash_re.search(self.url)
-        if match:
-            return match.group(2)
-        return None
+        return self._fragment_info()[3]
 
     @property
-    def hash_name(self):
-        match = self._hash_re.search(self.url)
-        if match:
-            return match.group(1)
-        return None
+    def canonical_key(self):
+        return canonical_url_key(self.url)
 
     @property
     def show_url(self):
@@ -148,7 +226,7 @@ class Link(object):
 
     @property
     def is_wheel(self):
-        return self.ext == 'whl'
+        return self.ext == '.whl'
 
     @property
     def is_artifact(self):
@@ -0,0 +1,35 @@
+"""Tags of the wheels the running interpreter, or another one on this host,
+can install"""
+from __future__ import absolute_import
+
+_supported = {}
+
+
+def get_supported(python_version=None, implementation='cp'):
+    """ Return the frozenset of (python, abi, platform) tags the running
+    interpreter supports, or with python_version, a (major, minor) tuple,
+    that an implementation ('cp' or 'pp') interpreter of that version on
+    this host would. Computed on first use.
+    """
+    key = (python_version, implementation)
+    try:
+        return _supported[key]
+    except KeyError:
+        pass
+    from itertools import chain
+    from packaging import tags
+    if python_version is None:
+        found = tags.sys_tags()
+    else:
+        interpreter = '%s%d%d' % ((implementation,) + tuple(python_version))
+        if implementation == 'cp':
+            specific = tags.cpython_tags(python_version)
+        else:
+            # the ABI of another implementation can't be told from here
+            specific = tags.generic_tags(interpreter, abis=['none'])
+        found = chain(specific,
+                      tags.compatible_tags(python_version, interpreter))
+    supported = _supported[key] = frozenset(
+        (tag.interpreter, tag.abi, tag.platform) for tag in found
+    )
+    return supported
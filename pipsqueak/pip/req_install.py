@@ -2,28 +2,32 @@ import logging
 import os
 import re
 import traceback
-import pkg_resources
 import six
 
 from packaging import specifiers
-from packaging.markers import Marker
 from packaging.requirements import InvalidRequirement, Requirement
 
 from pipsqueak.pip.util import (
-    display_path,
     is_installable_dir,
     url_to_path,
     is_archive_file,
     is_url,
     path_to_url,
+    safe_extra,
+    safe_name,
 )
 from pipsqueak.exceptions import (
     ConfigurationError,
     RequirementParseError,
 )
+from pipsqueak.fscache import probe
+from pipsqueak.markers import evaluate as evaluate_markers
+from pipsqueak.memo import parse_marker, parse_requirement
 from pipsqueak.pip.link import Link
 from pipsqueak.pip.vcs import vcs
 from pipsqueak.pip.wheel import Wheel
+from pipsqueak import static_deps
+from pipsqueak.slots import SlottedObject
 
 
 logger = logging.getLogger(__name__)
@@ -42,13 +46,31 @@ def _strip_extras(path):
     return path_no_extras, extras
 
 
-class InstallRequirement(object):
+def _looks_like_path(name, path_no_extras):
+    """Syntactic check for a requirement that may name a local directory or
+    archive; obvious PEP 508 names never touch the filesystem."""
+    return (
+        os.path.sep in name or
+        (os.path.altsep is not None and os.path.altsep in name) or
+        name.startswith('.') or
+        is_archive_file(path_no_extras)
+    )
+
+
+class InstallRequirement(SlottedObject):
     """
-    Represents something that may be installed later on, may have information
-    about where to fetch the relavant requirement and also contains logic for
-    installing the said requirement.
+    Represents something that may be installed later on and may have
+    information about where to fetch the relavant requirement.
+
+    Only the attributes pipsqueak reads are kept; update, pycompile,
+    isolated and wheel_cache are accepted for compatibility with pip.
     """
 
+    __slots__ = (
+        'req', 'comes_from', 'constraint', 'source_dir', 'editable', 'link',
+        'extras', 'markers', 'options',
+    )
+
     def __init__(self, req, comes_from, source_dir=None, editable=False,
                  link=None, update=True, pycompile=True, markers=None,
                  isolated=False, options=None, wheel_cache=None,
@@ -63,17 +85,16 @@ class InstallRequirement(object):
             self.source_dir = None
         self.editable = editable
 
-        self._wheel_cache = wheel_cache
         if link is not None:
-            self.link = self.original_link = link
+            self.link = link
         else:
-            self.link = self.original_link = req and req.url and Link(req.url)
+            self.link = req and req.url and Link(req.url)
 
         if extras:
             self.extras = extras
         elif req:
             self.extras = {
-                pkg_resources.safe_extra(extra) for extra in req.extras
+                safe_extra(extra) for extra in req.extras
             }
         else:
             self.extras = set()
@@ -81,24 +102,7 @@ class InstallRequirement(object):
             self.markers = markers
         else:
             self.markers = req and req.marker
-        self._egg_info_path = None
-        # This holds the pkg_resources.Distribution object if this requirement
-        # is already available:
-        self.satisfied_by = None
-        # True if the editable should be updated:
-        self.update = update
-        # Set to True after successful installation
-        self.install_succeeded = None
-        # UninstallPathSet of uninstalled distribution (for possible rollback)
-        self.uninstalled_pathset = None
-        self.use_user_site = False
-        self.target_dir = None
         self.options = options if options else {}
-        self.pycompile = pycompile
-        # Set to True after successful preparation of this requirement
-        self.prepared = False
-
-        self.isolated = isolated
 
     @classmethod
     def from_editable(cls, editable_req, comes_from=None, isolated=False,
@@ -106,12 +110,14 @@ class InstallRequirement(object):
         name, url, extras_override = parse_editable(editable_req)
         if url.startswith('file:'):
             source_dir = url_to_path(url)
+            if name is None:
+                name = static_deps.project_name(source_dir)
         else:
             source_dir = None
 
         if name is not None:
             try:
-                req = Requirement(name)
+                req = parse_requirement(name)
             except InvalidRequirement:
                 raise RequirementParseError("Invalid requirement: '%s'" % name)
         else:
@@ -130,7 +136,7 @@ class InstallRequirement(object):
     @classmethod
     def from_req(cls, req, comes_from=None, isolated=False, wheel_cache=None):
         try:
-            req = Requirement(req)
+            req = parse_requirement(req)
         except InvalidRequirement:
             raise RequirementParseError("Invalid requirement: '%s'" % req)
         if req.url:
@@ -157,25 +163,30 @@ class InstallRequirement(object):
             if not markers:
                 markers = None
             else:
-                markers = Marker(markers)
+                markers = parse_marker(markers)
         else:
             markers = None
 
         name = name.strip()
         req = None
-        path = os.path.normpath(os.path.abspath(name))
         link = None
         extras = None
+        source_dir = None
 
         if is_url(name):
             link = Link(name)
         else:
-            p, extras = _strip_extras(path)
-            looks_like_dir = os.path.isdir(p) and (
-                os.path.sep in name or
-                (os.path.altsep is not None and os.path.altsep in name) or
-                name.startswith('.')
-            )
+            p, extras = _strip_extras(name)
+            if _looks_like_path(name, p):
+                p = os.path.normpath(os.path.abspath(p))
+                looks_like_dir = probe.isdir(p) and (
+                    os.path.sep in name or
+                    (os.path.altsep is not None and
+                     os.path.altsep in name) or
+                    name.startswith('.')
+                )
+            else:
+                looks_like_dir = False
             if looks_like_dir:
                 if not is_installable_dir(p):
                     raise RequirementParseError(
@@ -183,8 +194,9 @@ class InstallRequirement(object):
                         "not found." % name
                     )
                 link = Link(path_to_url(p))
+                source_dir = p
             elif is_archive_file(p):
-                if not os.path.isfile(p):
+                if not probe.isfile(p):
                     logger.warning(
                         'Requirement %r looks like a filename, but the '
                         'file does not exist',
@@ -203,21 +215,25 @@ class InstallRequirement(object):
                 wheel = Wheel(link.filename)  # can raise InvalidWheelFilename
                 req = "%s==%s" % (wheel.name, wheel.version)
             else:
-                # set the req to the egg fragment.  when it's not there, this
+                # set the req to the egg fragment, or the name a local
+                # project gives statically.  when neither is there, this
                 # will become an 'unnamed' requirement
                 req = link.egg_fragment
+                if req is None and source_dir is not None:
+                    req = static_deps.project_name(source_dir)
 
         # a requirement specifier
         else:
             req = name
 
         if extras:
-            extras = Requirement("placeholder" + extras.lower()).extras
+            extras = parse_requirement("placeholder" + extras.lower()).extras
+            extras = set(extras)
         else:
             extras = ()
         if req is not None:
             try:
-                req = Requirement(req)
+                req = parse_requirement(req)
             except InvalidRequirement:
                 if os.path.sep in req:
                     add_msg = "It looks like a path."
@@ -228,8 +244,8 @@ class InstallRequirement(object):
                 raise RequirementParseError(
                     "Invalid requirement: '%s'\n%s" % (req, add_msg))
         return cls(
-            req, comes_from, link=link, markers=markers,
-            isolated=isolated,
+            req, comes_from, source_dir=source_dir, link=link,
+            markers=markers, isolated=isolated,
             options=options if options else {},
             wheel_cache=wheel_cache,
             constraint=constraint,
@@ -243,8 +259,6 @@ class InstallRequirement(object):
                 s += ' from %s' % self.link.url
         else:
             s = self.link.url if self.link else None
-        if self.satisfied_by is not None:
-            s += ' in %s' % display_path(self.satisfied_by.location)
         if self.comes_from:
             if isinstance(self.comes_from, six.string_types):
                 comes_from = self.comes_from
@@ -260,6 +274,9 @@ class InstallRequirement(object):
 
     @property
     def specifier(self):
+        if self.req is None:
+            # an archive or directory given without a name
+            return specifiers.SpecifierSet()
         return self.req.specifier
 
     @property
@@ -289,7 +306,7 @@ class InstallRequirement(object):
     def name(self):
         if self.req is None:
             return None
-        return pkg_resources.safe_name(self.req.name)
+        return safe_name(self.req.name)
 
     @property
     def setup_py_dir(self):
@@ -302,12 +319,8 @@ class InstallRequirement(object):
             # Provide an extra to safely evaluate the markers
             # without matching any extra
             extras_requested = ('',)
-        if self.markers is not None:
-            return any(
-                self.markers.evaluate({'extra': extra})
-                for extra in extras_requested)
-        else:
-            return True
+        return any(evaluate_markers(self.markers, extra)
+                   for extra in extras_requested)
 
     @property
     def is_wheel(self):
@@ -347,8 +360,8 @@ def parse_editable(editable_req):
     # If a file path is specified with extras, strip off the extras.
     url_no_extras, extras = _strip_extras(url)
 
-    if os.path.isdir(url_no_extras):
-        if not os.path.exists(os.path.join(url_no_extras, 'setup.py')):
+    if probe.isdir(url_no_extras):
+        if not probe.exists(os.path.join(url_no_extras, 'setup.py')):
             raise RequirementParseError(
                 "Directory %r is not installable. File 'setup.py' not found." %
                 url_no_extras
@@ -362,12 +375,12 @@ def parse_editable(editable_req):
             return (
                 package_name,
                 url_no_extras,
-                Requirement("placeholder" + extras.lower()).extras,
+                set(parse_requirement("placeholder" + extras.lower()).extras),
             )
         else:
             return package_name, url_no_extras, None
 
-    for version_control in vcs.backend_instances():
+    for version_control in vcs.names:
         if url.lower().startswith('%s:' % version_control):
             url = '%s+%s' % (version_control, url)
             break
@@ -383,7 +396,7 @@ def parse_editable(editable_req):
 
     if not vcs.get_backend(vc_type):
         error_message = 'For --editable=%s only ' % editable_req + \
-            ', '.join([backend.name + '+URL' for backend in vcs.backends]) + \
+            ', '.join([name + '+URL' for name in vcs.names]) + \
             ' is currently supported'
         raise InvalidRequirement(error_message)
 
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 
 import os
 import posixpath
+import re
 import sys
 import subprocess
 import logging
@@ -9,6 +10,7 @@ import logging
 from six.moves.urllib import parse as urllib_parse
 from six.moves.urllib import request as urllib_request
 
+from pipsqueak.fscache import probe
 from pipsqueak.pip.compat import console_to_str, expanduser
 
 logger = logging.getLogger(__file__)
@@ -23,6 +25,25 @@ ARCHIVE_EXTENSIONS = (
 )
 
 
+def canonicalize_name(name):
+    """Normalize a project name for comparison as PEP 503 does, without
+    importing packaging.utils and the tags machinery it brings."""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def safe_name(name):
+    """Convert an arbitrary string to a standard distribution name, as
+    pkg_resources does: runs of other than alphanumerics and . become -."""
+    return re.sub('[^A-Za-z0-9.]+', '-', name)
+
+
+def safe_extra(extra):
+    """Convert an arbitrary string to a standard 'extra' name, as
+    pkg_resources does: runs of other than alphanumerics and . become _,
+    and the name is lowercased."""
+    return re.sub('[^A-Za-z0-9.-]+', '_', extra).lower()
+
+
 def display_path(path):
     """Gives the display value for a given path, making it relative to cwd
     if possible."""
@@ -37,10 +58,10 @@ def display_path(path):
 
 def is_installable_dir(path):
     """Return True if `path` is a directory containing a setup.py file."""
-    if not os.path.isdir(path):
+    if not probe.isdir(path):
         return False
     setup_py = os.path.join(path, 'setup.py')
-    if os.path.isfile(setup_py):
+    if probe.isfile(setup_py):
         return True
     return False
 
@@ -101,10 +122,9 @@ def is_archive_file(name):
 def get_used_vcs_backend(link):
     from pipsqueak.pip.vcs import vcs
 
-    for backend in vcs.backends:
-        if link.scheme in backend.schemes:
-            vcs_backend = backend(link.url)
-            return vcs_backend
+    backend = vcs.get_backend_for_scheme(link.scheme)
+    if backend is not None:
+        return backend(link.url)
 
 
 def call_subprocess(cmd, cwd=None,
@@ -202,13 +222,36 @@ def normalize_path(path, resolve_symlinks=True):
     return os.path.normcase(path)
 
 
-def dist_is_editable(dist):
-    """ Is distribution an editable install? """
-    for path_item in sys.path:
-        egg_link = os.path.join(path_item, dist.project_name + '.egg-link')
-        if os.path.isfile(egg_link):
-            return True
-    return False
+def requirement_key(ireq):
+    """ Return the key of ireq in a set of requirements: its canonical
+    name, else the #egg= name of its link, else its link's path or URL, for
+    archives given without a name. """
+    if ireq.name:
+        return canonicalize_name(ireq.name)
+    link = ireq.link
+    if link is None:
+        return None
+    if link.egg_fragment:
+        return canonicalize_name(link.egg_fragment)
+    if link.scheme == 'file':
+        return link.path
+    return link.url_without_fragment
+
+
+def dist_is_editable(dist, paths=None):
+    """ Is distribution an editable install on paths, sys.path by default?
+    """
+    from pipsqueak.scanner import editable_locations
+    return canonicalize_name(dist.project_name) in editable_locations(paths)
+
+
+def dist_editable_location(dist, paths=None):
+    """ Return the source directory of an editable distribution installed on
+    paths, sys.path by default, or None if it isn't editable or the
+    directory can't be found. """
+    from pipsqueak.scanner import editable_locations
+    return editable_locations(paths).get(
+        canonicalize_name(dist.project_name))
 
 
 def is_file_url(link):
@@ -1,11 +1,15 @@
 """Handles all VCS (version control) support"""
+from collections import OrderedDict
 import errno
+import importlib
 import logging
 import os
+import threading
 
 from six.moves.urllib import parse as urllib_parse
 
 from pipsqueak.exceptions import BadCommand
+from pipsqueak.pip.link import canonical_url_key
 from pipsqueak.pip.util import call_subprocess, display_path
 
 
@@ -80,6 +84,25 @@ class VcsSupport(object):
     _registry = {}  # type: Dict[str, Command]
     schemes = ['ssh', 'git', 'hg', 'bzr', 'sftp', 'svn']
 
+    # The bundled backends by name, with the module defining each and the
+    # dirname and schemes it declares. A backend's module is only imported
+    # once its name, one of its schemes or its directory is seen.
+    bundled = OrderedDict([
+        ('git', ('pipsqueak.pip.vcs.git', '.git', (
+            'git', 'git+http', 'git+https', 'git+ssh', 'git+git', 'git+file',
+        ))),
+        ('hg', ('pipsqueak.pip.vcs.mercurial', '.hg', (
+            'hg', 'hg+http', 'hg+https', 'hg+ssh', 'hg+static-http',
+        ))),
+        ('svn', ('pipsqueak.pip.vcs.subversion', '.svn', (
+            'svn', 'svn+ssh', 'svn+http', 'svn+https', 'svn+svn',
+        ))),
+        ('bzr', ('pipsqueak.pip.vcs.bazaar', '.bzr', (
+            'bzr', 'bzr+http', 'bzr+https', 'bzr+ssh', 'bzr+sftp', 'bzr+ftp',
+            'bzr+lp',
+        ))),
+    ])
+
     def __init__(self):
         # Register more schemes with urlparse for various version control
         # systems
@@ -87,27 +110,59 @@ class VcsSupport(object):
         # Python >= 2.7.4, 3.3 doesn't have uses_fragment
         if getattr(urllib_parse, 'uses_fragment', None):
             urllib_parse.uses_fragment.extend(self.schemes)
+        self._imported = set()
+        self._lock = threading.Lock()
         super(VcsSupport, self).__init__()
 
+    def _load(self, name):
+        """ Import the module of the bundled backend name, which registers
+        it. """
+        if name not in self.bundled:
+            return
+        # held through the import, so no thread sees a backend imported but
+        # not yet registered
+        with self._lock:
+            if name not in self._imported:
+                importlib.import_module(self.bundled[name][0])
+                self._imported.add(name)
+
+    def _load_all(self):
+        for name in self.bundled:
+            self._load(name)
+
     def __iter__(self):
+        self._load_all()
         return self._registry.__iter__()
 
+    @property
+    def names(self):
+        names = list(self.bundled)
+        names.extend(name for name in self._registry if name not in names)
+        return names
+
     @property
     def backends(self):
+        self._load_all()
         return list(self._registry.values())
 
     def backend_instances(self):
-        return [cls() for cls in self._registry.values()]
+        return [cls() for cls in self.backends]
 
     @property
     def dirnames(self):
-        return [backend.dirname for backend in self.backends]
+        dirnames = [dirname for _, dirname, _ in self.bundled.values()]
+        dirnames.extend(backend.dirname for name, backend in
+                        self._registry.items() if name not in self.bundled)
+        return dirnames
 
     @property
     def all_schemes(self):
         schemes = []
-        for backend in self.backends:
-            schemes.extend(backend.schemes)
+        for _, _, backend_schemes in self.bundled.values():
+            schemes.extend(backend_schemes)
+        for name, backend in self._registry.items():
+            if name not in self.bundled:
+                schemes.extend(backend.schemes)
         return schemes
 
     def register(self, cls):
@@ -131,7 +186,19 @@ class VcsSupport(object):
         Return the name of the version control backend if found at given
         location, e.g. vcs.get_backend_name('/path/to/vcs/checkout')
         """
-        for vc_type in self._registry.values():
+        # try the backend whose directory is there before importing the
+        # rest for their smarter detection
+        candidates = [
+            name for name, (_, dirname, _) in self.bundled.items()
+            if os.path.exists(os.path.join(location, dirname))
+        ]
+        for name in candidates:
+            self._load(name)
+        vc_types = [self._registry[name] for name in candidates
+                    if name in self._registry]
+        vc_types.extend(backend for backend in self.backends
+                        if backend not in vc_types)
+        for vc_type in vc_types:
             if vc_type.controls_location(location):
                 logger.debug('Determine that %s uses VCS: %s',
                              location, vc_type.name)
@@ -140,9 +207,20 @@ class VcsSupport(object):
 
     def get_backend(self, name):
         name = name.lower()
+        self._load(name)
         if name in self._registry:
             return self._registry[name]
 
+    def get_backend_for_scheme(self, scheme):
+        """ Return the backend handling URLs with scheme, if any. """
+        for name, (_, _, schemes) in self.bundled.items():
+            if scheme in schemes:
+                return self.get_backend(name)
+        for backend in self._registry.values():
+            if scheme in backend.schemes:
+                return backend
+        return None
+
     def get_backend_from_location(self, location):
         vc_type = self.get_backend_name(location)
         if vc_type:
@@ -238,9 +316,10 @@ class VersionControl(object):
 
     def compare_urls(self, url1, url2):
         """
-        Compare two repo URLs for identity, ignoring incidental differences.
+        Compare two repo URLs for identity, ignoring incidental differences
+        such as an ssh rather than https spelling of the same repository.
         """
-        return self.normalize_url(url1) == self.normalize_url(url2)
+        return canonical_url_key(url1) == canonical_url_key(url2)
 
     def is_commit_id_equal(self, dest, name):
         """
@@ -357,9 +436,3 @@ def get_src_requirement(dist, location):
         location,
     )
     return dist.as_requirement()
-
-
-import pipsqueak.pip.vcs.git            # noqa
-import pipsqueak.pip.vcs.bazaar         # noqa
-import pipsqueak.pip.vcs.mercurial      # noqa
-import pipsqueak.pip.vcs.subversion     # noqa
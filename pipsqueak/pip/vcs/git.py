@@ -8,6 +8,7 @@ from packaging.version import parse as parse_version
 from six.moves.urllib import parse as urllib_parse
 from six.moves.urllib import request as urllib_request
 
+from pipsqueak.fscache import probe
 from pipsqueak.pip.compat import samefile
 from pipsqueak.pip.vcs import VersionControl, vcs
 
@@ -192,18 +193,16 @@ class Git(VersionControl):
         root_dir = os.path.join(git_dir, '..')
         # find setup.py
         orig_location = location
-        while not os.path.exists(os.path.join(location, 'setup.py')):
-            last_location = location
-            location = os.path.dirname(location)
-            if location == last_location:
-                # We've traversed up to the root of the filesystem without
-                # finding setup.py
-                logger.warning(
-                    "Could not find setup.py for directory %s (tried all "
-                    "parent directories)",
-                    orig_location,
-                )
-                return None
+        location = probe.find_upward(location, 'setup.py')
+        if location is None:
+            # We've traversed up to the root of the filesystem without
+            # finding setup.py
+            logger.warning(
+                "Could not find setup.py for directory %s (tried all "
+                "parent directories)",
+                orig_location,
+            )
+            return None
         # relative path of setup.py to repo root
         if samefile(root_dir, location):
             return None
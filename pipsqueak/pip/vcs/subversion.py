@@ -4,6 +4,7 @@ import logging
 import os
 import re
 
+from pipsqueak.fscache import probe
 from pipsqueak.pip.link import Link
 from pipsqueak.pip.vcs import VersionControl, vcs
 from pipsqueak.pip.util import display_path
@@ -109,18 +110,16 @@ class Subversion(VersionControl):
         # setup.py we have to look up in the location until we find a real
         # setup.py
         orig_location = location
-        while not os.path.exists(os.path.join(location, 'setup.py')):
-            last_location = location
-            location = os.path.dirname(location)
-            if location == last_location:
-                # We've traversed up to the root of the filesystem without
-                # finding setup.py
-                logger.warning(
-                    "Could not find setup.py for directory %s (tried all "
-                    "parent directories)",
-                    orig_location,
-                )
-                return None
+        location = probe.find_upward(location, 'setup.py')
+        if location is None:
+            # We've traversed up to the root of the filesystem without
+            # finding setup.py
+            logger.warning(
+                "Could not find setup.py for directory %s (tried all "
+                "parent directories)",
+                orig_location,
+            )
+            return None
 
         return self._get_svn_url_rev(location)[0]
 
@@ -3,6 +3,7 @@ from __future__ import absolute_import
 import re
 
 from pipsqueak.exceptions import InvalidWheelFilename
+from pipsqueak.pip.pep425tags import get_supported
 
 
 class Wheel(object):
@@ -35,7 +36,14 @@ class Wheel(object):
         self.plats = wheel_info.group('plat').split('.')
 
         # All the tag combinations from this file
-        self.file_tags = {
+        self.file_tags = frozenset(
             (x, y, z) for x in self.pyversions
             for y in self.abis for z in self.plats
-        }
+        )
+
+    def supported(self, tags=None):
+        """Is this wheel installable with any of tags, by default those of
+        the running interpreter?"""
+        if tags is None:
+            tags = get_supported()
+        return not self.file_tags.isdisjoint(tags)
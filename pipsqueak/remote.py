@@ -0,0 +1,210 @@
+"""Requirements files fetched over HTTP
+
+Responses are kept on disk keyed by URL and revalidated with their ETag or
+Last-Modified date, so fetching an unchanged file again costs one
+304 Not Modified. Within a run each URL is fetched at most once, and
+connections to a host are kept alive and reused between fetches.
+"""
+from collections import defaultdict
+import hashlib
+import logging
+import os
+import threading
+
+from six.moves import cPickle as pickle
+from six.moves.urllib import parse as urllib_parse
+
+from pipsqueak.cache import atomic_write, default_cache_dir
+from pipsqueak.exceptions import RemoteFetchError
+from pipsqueak.fscache import probe
+
+logger = logging.getLogger(__name__)
+
+
+MAX_REDIRECTS = 5
+
+_REDIRECTS = (301, 302, 303, 307, 308)
+
+
+def is_remote(path):
+    """ Is path an http or https URL? """
+    return path.lower().startswith(('http://', 'https://'))
+
+
+class ConnectionPool(object):
+    """ Idle keep-alive connections by scheme and host. """
+
+    def __init__(self, timeout=30, maxsize=4):
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def get(self, scheme, netloc):
+        """ Return a connection to netloc and whether it was used before. """
+        from six.moves import http_client
+        with self._lock:
+            idle = self._idle[(scheme, netloc)]
+            if idle:
+                return idle.pop(), True
+        if scheme == 'https':
+            conn = http_client.HTTPSConnection(netloc, timeout=self.timeout)
+        else:
+            conn = http_client.HTTPConnection(netloc, timeout=self.timeout)
+        return conn, False
+
+    def put(self, scheme, netloc, conn):
+        with self._lock:
+            idle = self._idle[(scheme, netloc)]
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+            self._idle.clear()
+
+
+class RemoteFetcher(object):
+    """
+    Fetches requirements files over a ConnectionPool, through a cache of
+    responses in directory/http.
+    """
+
+    subdir = 'http'
+
+    def __init__(self, directory=None, timeout=30):
+        if directory is None:
+            directory = default_cache_dir()
+        self.directory = os.path.join(directory, self.subdir)
+        self.pool = ConnectionPool(timeout=timeout)
+        self._fetched = probe.memo()
+
+    def _entry_path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url).hexdigest())
+
+    def _load(self, url):
+        try:
+            with open(self._entry_path(url), 'rb') as fp:
+                entry = pickle.load(fp)
+        except IOError:
+            return None
+        except Exception as exc:
+            logger.debug("Ignoring unreadable response for %s: %s", url, exc)
+            return None
+        return entry if entry.get('url') == url else None
+
+    def _store(self, url, entry):
+        try:
+            atomic_write(self._entry_path(url), pickle.dumps(entry, 2))
+        except (IOError, OSError) as exc:
+            logger.warning("Could not cache response for %s: %s", url, exc)
+
+    def _request(self, url, headers):
+        """ GET url, returning its status, response headers and body. """
+        import socket
+        from six.moves import http_client
+        scheme, netloc, path, query, _ = urllib_parse.urlsplit(url)
+        target = urllib_parse.urlunsplit(('', '', path or '/', query, ''))
+        while True:
+            conn, reused = self.pool.get(scheme, netloc)
+            try:
+                conn.request('GET', target, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (http_client.HTTPException, socket.error) as exc:
+                conn.close()
+                if reused:
+                    # the server closed an idle connection; retry on a new one
+                    continue
+                raise RemoteFetchError("Could not fetch %s: %s" % (url, exc))
+            if response.will_close:
+                conn.close()
+            else:
+                self.pool.put(scheme, netloc, conn)
+            response_headers = {name.lower(): value
+                                for name, value in response.getheaders()}
+            return response.status, response_headers, body
+
+    def _get(self, url, headers):
+        location = url
+        for _ in range(MAX_REDIRECTS + 1):
+            status, response_headers, body = self._request(location, headers)
+            if status not in _REDIRECTS:
+                return status, response_headers, body
+            location = urllib_parse.urljoin(
+                location, response_headers.get('location', ''))
+            logger.debug("Following redirect from %s to %s", url, location)
+        raise RemoteFetchError("Too many redirects fetching %s" % url)
+
+    def fetch(self, url):
+        """ Return the body of url, from the cache when the server says
+        it's not modified. """
+        try:
+            return self._fetched[url]
+        except KeyError:
+            pass
+
+        entry = self._load(url)
+        headers = {'User-Agent': 'pipsqueak', 'Accept-Encoding': 'identity'}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            status, response_headers, body = self._get(url, headers)
+        except RemoteFetchError as exc:
+            if entry is None:
+                raise
+            logger.warning("Using cached copy of %s: %s", url, exc)
+            status, body = 304, None
+
+        if status == 304 and entry is not None:
+            logger.debug("%s not modified", url)
+            body = entry['body']
+        elif status == 200:
+            etag = response_headers.get('etag')
+            last_modified = response_headers.get('last-modified')
+            if etag or last_modified:
+                self._store(url, dict(url=url, etag=etag,
+                                      last_modified=last_modified, body=body))
+        else:
+            raise RemoteFetchError("Could not fetch %s: HTTP %d" %
+                                   (url, status))
+
+        if probe.active:
+            self._fetched[url] = body
+        return body
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def configure(directory=None, timeout=30):
+    """ Make fetch() cache responses under directory, by default the
+    pipsqueak cache directory. """
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is not None:
+            _fetcher.pool.close()
+        _fetcher = RemoteFetcher(directory, timeout=timeout)
+
+
+def default_fetcher():
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = RemoteFetcher()
+        return _fetcher
+
+
+def fetch(url):
+    """ Return the body of url through the shared RemoteFetcher. """
+    return default_fetcher().fetch(url)
@@ -0,0 +1,438 @@
+"""Discovery of the distributions installed on sys.path
+
+A lighter stand-in for pkg_resources.working_set: each sys.path entry is
+listed once, and only the Name and Version headers of each distribution's
+METADATA or PKG-INFO are read. Zipped eggs are identified from their file
+name and the zip central directory. The same listing finds the editable
+installs recorded by .egg-link files, easy-install.pth and PEP 660
+__editable__ .pth files.
+"""
+import os
+import re
+import sys
+
+from pipsqueak.fscache import probe
+from pipsqueak.memo import parse_requirement
+from pipsqueak.pip.util import canonicalize_name, safe_name
+from pipsqueak.slots import SlottedObject, intern_string
+
+PY_MAJOR = sys.version[:3]
+
+_METADATA_HEADERS = frozenset(['name', 'version'])
+
+_EGG_INFO = 'EGG-INFO/PKG-INFO'
+
+_EDITABLE_PTH_PREFIX = '__editable__.'
+
+# editable locations by sys.path entries, for the current run
+_editables = probe.memo()
+
+# name-version[-pyX.Y[-platform]] of .egg, .egg-info and .dist-info names
+_filename_re = re.compile(
+    r'^(?P<name>[^-]+)(-(?P<version>[^-]+)(-py(?P<pyver>[^-]+)'
+    r'(-(?P<platform>.+))?)?)?$'
+)
+
+
+def safe_version(version):
+    """ Convert an arbitrary string to a standard version string, as
+    pkg_resources does. """
+    from packaging.version import InvalidVersion, Version
+    try:
+        return str(Version(version))
+    except InvalidVersion:
+        version = version.replace(' ', '.')
+        return re.sub('[^A-Za-z0-9.]+', '-', version)
+
+
+def _to_filename(name):
+    return name.replace('-', '_')
+
+
+class Distribution(SlottedObject):
+    """
+    The part of a pkg_resources Distribution that freezing an installation
+    needs.
+    """
+    __slots__ = ('project_name', 'version', 'location', 'py_version',
+                 'platform')
+
+    def __init__(self, project_name, version, location, py_version=None,
+                 platform=None):
+        self.project_name = intern_string(safe_name(project_name))
+        self.version = safe_version(version)
+        self.location = intern_string(location)
+        self.py_version = py_version
+        self.platform = platform
+
+    @property
+    def key(self):
+        return self.project_name.lower()
+
+    def as_requirement(self):
+        """ Return a Requirement pinning this distribution's version. """
+        try:
+            return parse_requirement('%s==%s' % (self.project_name,
+                                                 self.version))
+        except Exception:
+            return parse_requirement('%s===%s' % (self.project_name,
+                                                  self.version))
+
+    def egg_name(self):
+        """ Return what this distribution's egg filename should be, without
+        the extension. """
+        filename = '%s-%s-py%s' % (
+            _to_filename(self.project_name),
+            _to_filename(self.version),
+            self.py_version or PY_MAJOR,
+        )
+        if self.platform:
+            filename += '-' + self.platform
+        return filename
+
+    def __repr__(self):
+        return '%s %s (%s)' % (self.project_name, self.version, self.location)
+
+
+def read_headers(lines):
+    """ Return the lowercased Name and Version headers found in lines, the
+    start of a METADATA or PKG-INFO file, stopping at the end of its
+    headers or as soon as both are found.
+    """
+    headers = {}
+    for line in lines:
+        if not line.strip():
+            break
+        if line[0].isspace() or ':' not in line:
+            continue
+        key, value = line.split(':', 1)
+        key = key.strip().lower()
+        if key in _METADATA_HEADERS and key not in headers:
+            headers[key] = value.strip()
+            if len(headers) == len(_METADATA_HEADERS):
+                break
+    return headers
+
+
+def _read_metadata_file(path):
+    try:
+        with open(path) as fp:
+            return read_headers(fp)
+    except IOError:
+        return None
+
+
+def _parse_filename(entry):
+    """ Return the name, version, python version and platform in an .egg,
+    .egg-info or .dist-info file name, with None for those not given.
+    """
+    base = os.path.splitext(entry)[0]
+    match = _filename_re.match(base)
+    if match is None:
+        return base, None, None, None
+    return match.group('name', 'version', 'pyver', 'platform')
+
+
+def _make_distribution(entry, headers, location):
+    name, version, py_version, platform = _parse_filename(entry)
+    if headers:
+        # the file name wins, as it does for pkg_resources
+        name = name or headers.get('name')
+        version = version or headers.get('version')
+    if not name or not version:
+        return None
+    return Distribution(name, version, location, py_version, platform)
+
+
+def _from_metadata(directory, entry):
+    """ Return the distribution described by the .dist-info or .egg-info
+    entry in directory. """
+    path = os.path.join(directory, entry)
+    if probe.isdir(path):
+        names = probe.listdir(path)
+        if not names:
+            return None
+        name = 'METADATA' if entry.lower().endswith('.dist-info') \
+            else 'PKG-INFO'
+        headers = None
+        if name in names:
+            headers = _read_metadata_file(os.path.join(path, name))
+    else:
+        headers = _read_metadata_file(path)
+    if headers is None:
+        return None
+    return _make_distribution(entry, headers, directory)
+
+
+def _from_egg(path):
+    """ Return the distribution of the .egg directory or zip file at path.
+    """
+    entry = os.path.basename(path)
+    if probe.isdir(path):
+        headers = _read_metadata_file(os.path.join(path, 'EGG-INFO',
+                                                   'PKG-INFO'))
+        if headers is None:
+            return None
+        return _make_distribution(entry, headers, path)
+
+    import zipfile
+    try:
+        archive = zipfile.ZipFile(path)
+    except (IOError, zipfile.BadZipfile):
+        return None
+    try:
+        # opening reads just the central directory
+        if _EGG_INFO not in archive.NameToInfo:
+            return None
+        headers = {}
+        if _parse_filename(entry)[1] is None:
+            headers = read_headers(
+                archive.read(_EGG_INFO).splitlines(True))
+    finally:
+        archive.close()
+    return _make_distribution(entry, headers, path)
+
+
+def read_lines(path):
+    """ Return the stripped, non-blank lines of the file at path. """
+    try:
+        with open(path) as fp:
+            return [line.strip() for line in fp if line.strip()]
+    except IOError:
+        return []
+
+
+def _egg_link_target(path):
+    """ Return the directory the .egg-link at path points to, or None. """
+    lines = read_lines(path)
+    if not lines:
+        return None
+    return os.path.normpath(os.path.join(os.path.dirname(path), lines[0]))
+
+
+def _from_egg_link(path):
+    """ Return the first distribution in the directory an .egg-link points
+    to, in a list. """
+    directory = _egg_link_target(path)
+    if directory is None:
+        return []
+    return scan_path_entry(directory)[:1]
+
+
+def is_egg(path_item):
+    """ Is path_item, a sys.path entry, an egg rather than a directory of
+    distributions? """
+    return path_item.lower().endswith('.egg')
+
+
+def is_scanned_entry(entry):
+    """ Is entry, a name in a sys.path directory, one that distributions or
+    editable installs are read from? """
+    lower = entry.lower()
+    return (lower.endswith(('.dist-info', '.egg-info', '.egg-link')) or
+            lower == 'easy-install.pth' or
+            (entry.startswith(_EDITABLE_PTH_PREFIX) and
+             lower.endswith('.pth')))
+
+
+def scan_entry(path_item, entry):
+    """ Return the distributions entry in the sys.path directory path_item
+    gives. """
+    lower = entry.lower()
+    if lower.endswith(('.dist-info', '.egg-info')):
+        dist = _from_metadata(path_item, entry)
+        return [dist] if dist is not None else []
+    elif lower.endswith('.egg-link'):
+        return _from_egg_link(os.path.join(path_item, entry))
+    return []
+
+
+def scan_path_entry(path_item):
+    """ Return the distributions found in path_item, a sys.path entry. """
+    if is_egg(path_item):
+        dist = _from_egg(path_item)
+        return [dist] if dist is not None else []
+
+    # eggs inside a directory only count once a .pth puts them on sys.path
+    dists = []
+    for entry in sorted(probe.listdir(path_item)):
+        dists.extend(scan_entry(path_item, entry))
+    return dists
+
+
+def installed_distributions(paths=None):
+    """
+    Return a dictionary from canonical project name to the Distribution
+    first found for it on paths, sys.path by default.
+    """
+    if paths is None:
+        paths = sys.path
+    installed = {}
+    for path_item in paths:
+        path_item = os.path.normcase(os.path.abspath(path_item or '.'))
+        for dist in scan_path_entry(path_item):
+            installed.setdefault(canonicalize_name(dist.project_name), dist)
+    return installed
+
+
+def pth_paths(directory, lines):
+    """ Return the directories lines of a .pth file in directory add to
+    sys.path, leaving out its import lines and comments. """
+    return [os.path.normpath(os.path.join(directory, line)) for line in lines
+            if not line.startswith(('#', 'import ', 'import\t'))]
+
+
+def _finder_location(directory, lines):
+    """ Return the directory holding the packages that the setuptools
+    finder a PEP 660 .pth file imports maps to, or None. """
+    import ast
+    path = _finder_module(directory, lines)
+    if path is None or not probe.isfile(path):
+        return None
+    try:
+        with open(path, 'rb') as fp:
+            tree = ast.parse(fp.read(), path)
+    except (IOError, SyntaxError, TypeError, ValueError):
+        return None
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and
+                any(getattr(target, 'id', None) == 'MAPPING'
+                    for target in node.targets)):
+            try:
+                mapping = ast.literal_eval(node.value)
+            except ValueError:
+                return None
+            if isinstance(mapping, dict) and mapping:
+                return os.path.dirname(sorted(mapping.values())[0])
+    return None
+
+
+def _develop_editables(directory):
+    """ Return the names and locations of the projects set up for
+    development in directory, one of the paths easy-install.pth lists. """
+    editables = []
+    for entry in sorted(probe.listdir(directory)):
+        if entry.lower().endswith('.egg-info'):
+            name = _parse_filename(entry)[0]
+            editables.append((canonicalize_name(safe_name(name)), directory))
+    return editables
+
+
+def _develop_directories(path_item, lines):
+    """ Return the source checkouts among the directories lines of
+    easy-install.pth in path_item list. """
+    return [directory for directory in pth_paths(path_item, lines)
+            if directory != path_item and not is_egg(directory)]
+
+
+def _finder_module(path_item, lines):
+    """ Return the path of the setuptools finder module a PEP 660 .pth file
+    in path_item imports, or None. """
+    for line in lines:
+        if line.startswith('import '):
+            module = line[len('import '):].split(';', 1)[0].strip()
+            return os.path.join(path_item, module + '.py')
+    return None
+
+
+def scan_editable_entry(path_item, entry):
+    """ Return the (canonical name, location) pairs of the editable installs
+    entry in the sys.path directory path_item records, with None for
+    locations that can't be found. """
+    lower = entry.lower()
+    path = os.path.join(path_item, entry)
+    if lower.endswith('.egg-link'):
+        name = canonicalize_name(safe_name(entry[:-len('.egg-link')]))
+        return [(name, _egg_link_target(path))]
+    elif lower == 'easy-install.pth':
+        editables = []
+        for directory in _develop_directories(path_item, read_lines(path)):
+            editables.extend(_develop_editables(directory))
+        return editables
+    elif entry.startswith(_EDITABLE_PTH_PREFIX) and lower.endswith('.pth'):
+        name = entry[len(_EDITABLE_PTH_PREFIX):-len('.pth')]
+        name = canonicalize_name(safe_name(name.rsplit('-', 1)[0]))
+        lines = read_lines(path)
+        directories = pth_paths(path_item, lines)
+        location = (directories[0] if directories
+                    else _finder_location(path_item, lines))
+        return [(name, location)]
+    return []
+
+
+def scan_editables(path_item):
+    """
+    Return a dictionary from canonical project name to the location of each
+    editable install recorded in path_item, a sys.path entry, with None
+    when the location can't be found.
+    """
+    editables = {}
+    for entry in sorted(probe.listdir(path_item)):
+        for name, location in scan_editable_entry(path_item, entry):
+            editables.setdefault(name, location)
+    return editables
+
+
+def entry_inputs(path_item, entry=None):
+    """
+    Return the paths that what scan_entry and scan_editable_entry find in
+    entry of the sys.path directory path_item is read from, or when entry is
+    None, that scan_path_entry finds in path_item, an egg. Unless one of
+    them changes, scanning again finds the same.
+    """
+    if entry is None:
+        return [path_item, os.path.join(path_item, 'EGG-INFO', 'PKG-INFO')]
+    path = os.path.join(path_item, entry)
+    lower = entry.lower()
+    if lower.endswith('.dist-info'):
+        return [path, os.path.join(path, 'METADATA')]
+    elif lower.endswith('.egg-info'):
+        return [path, os.path.join(path, 'PKG-INFO')]
+    elif lower.endswith('.egg-link'):
+        inputs = [path]
+        directory = _egg_link_target(path)
+        if directory is not None:
+            inputs.append(directory)
+            for name in probe.listdir(directory):
+                if name.lower().endswith(('.dist-info', '.egg-info')):
+                    inputs.extend(entry_inputs(directory, name))
+        return inputs
+    elif lower == 'easy-install.pth':
+        return [path] + _develop_directories(path_item, read_lines(path))
+    inputs = [path]
+    finder = _finder_module(path_item, read_lines(path))
+    if finder is not None:
+        inputs.append(finder)
+    return inputs
+
+
+def editable_locations(paths=None):
+    """
+    Return a dictionary from canonical project name to the location of the
+    editable install first found for it on paths, sys.path by default. Each
+    path is scanned once per run.
+    """
+    if paths is None:
+        paths = sys.path
+    key = tuple(paths)
+    try:
+        return _editables[key]
+    except KeyError:
+        pass
+    editables = {}
+    for path_item in paths:
+        path_item = os.path.normcase(os.path.abspath(path_item or '.'))
+        for name, location in scan_editables(path_item).items():
+            editables.setdefault(name, location)
+    if probe.active:
+        _editables[key] = editables
+    return editables
+
+
+def remember_editables(editables, paths=None):
+    """ Make editable_locations(paths) return editables, found some other
+    way, for the rest of the run. """
+    if paths is None:
+        paths = sys.path
+    if probe.active:
+        _editables[tuple(paths)] = editables
@@ -0,0 +1,55 @@
+"""Support for compact, __slots__ based record classes"""
+from six.moves import intern
+
+
+def intern_string(value):
+    """ Intern value if it's a byte string, so equal names and URLs held by
+    many records share one object.
+    """
+    if type(value) is str:
+        return intern(value)
+    return value
+
+
+class SlottedObject(object):
+    """
+    Base class for objects that keep their attributes in __slots__.
+
+    Pickled state is the same attribute dictionary a __dict__ based instance
+    produces, so pickles made before and after a class gained __slots__ load
+    into either, with any pickle protocol. Slots whose names start with an
+    underscore hold values derived from the others and are left out of it.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def _slot_names(cls):
+        try:
+            return cls.__dict__['_all_slots']
+        except KeyError:
+            names = []
+            for klass in reversed(cls.__mro__):
+                for name in klass.__dict__.get('__slots__', ()):
+                    if name not in names:
+                        names.append(name)
+            cls._all_slots = tuple(names)
+            return cls._all_slots
+
+    def _slot_items(self):
+        for name in self._slot_names():
+            if name.startswith('_'):
+                continue
+            try:
+                yield name, getattr(self, name)
+            except AttributeError:
+                continue
+
+    def __getstate__(self):
+        return dict(self._slot_items())
+
+    def __setstate__(self, state):
+        names = self._slot_names()
+        for name, value in state.items():
+            # attributes dropped from the class are ignored
+            if name in names:
+                setattr(self, name, value)
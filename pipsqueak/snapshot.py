@@ -0,0 +1,347 @@
+"""Compact, memory-mappable snapshots of an installed environment
+
+A snapshot records, for each installed distribution, what report compares:
+its name, pinned version, location, link and version control details. It
+also records the marker environment of the interpreter they're installed
+for, which gives its Python version and implementation, so markers and
+wheel tags are judged for that interpreter wherever the file is read. The
+file is laid out so one distribution can be looked up without reading the
+rest:
+
+    header   magic, format version, record count, the offsets of the
+             index and the string table, and the string offset of the
+             marker environment as JSON
+    index    one fixed-size record per distribution, sorted by canonical
+             name, holding string table offsets and a few flag bytes
+    strings  every distinct string once, each a little-endian uint32
+             length followed by its UTF-8 bytes
+
+Snapshot maps the file and binary searches the index, decoding only the
+strings of the records it returns.
+"""
+import json
+import logging
+import mmap
+import re
+import struct
+
+from packaging.requirements import InvalidRequirement
+import six
+
+from pipsqueak.cache import atomic_write
+from pipsqueak.exceptions import ConfigurationError, PipsqueakError
+from pipsqueak.main import _iter_requirements_iterable, _link_details, PipReq
+from pipsqueak.markers import current_environment
+from pipsqueak.memo import parse_requirement
+from pipsqueak.pip.link import Link
+from pipsqueak.pip.util import canonicalize_name
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PSQS'
+
+# Bump whenever the layout of the file changes.
+SNAPSHOT_FORMAT = 2
+
+# magic, format, reserved, record count, index offset, strings offset,
+# marker environment string offset
+_header = struct.Struct('<4sHHIIII')
+
+# key, project_name, specifiers, location, link, vcs type, protocol,
+# location and version string offsets, then the type and flag bytes
+_record = struct.Struct('<9IBB2x')
+
+_length = struct.Struct('<I')
+
+# the string offset of a missing value
+_NONE = 0xffffffff
+
+_types = ('pypi', 'version_control', 'file', 'url')
+
+_EDITABLE = 0x01
+
+_VCS_FIELDS = ('type', 'protocol', 'location', 'version')
+
+# pip freeze's note ahead of an editable it has no URL for, e.g.
+# "# Editable install with no version control (mypkg==0.1)"
+_editable_note_re = re.compile(r'^#\s*Editable\b.*\((?P<req>[^()]+)\)\s*$')
+
+# a PEP 508 direct reference, e.g. "mypkg @ file:///src/mypkg-0.1.tar.gz"
+_direct_re = re.compile(
+    r'^(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*@\s*'
+    r'(?P<url>\S+)'
+)
+
+
+def _encode(value):
+    if isinstance(value, six.text_type):
+        return value.encode('utf-8')
+    return value
+
+
+def _decode(value):
+    return value.decode('utf-8') if six.PY3 else value
+
+
+def stored(pipreq):
+    """ Return a PipReq with only the fields of pipreq a snapshot keeps. """
+    return PipReq(
+        project_name=pipreq.project_name,
+        type=pipreq.type,
+        editable=bool(pipreq.editable),
+        specifiers=pipreq.specifiers,
+        location=pipreq.location,
+        link=pipreq.link,
+        version_control=dict(pipreq.version_control)
+        if pipreq.version_control else None,
+    )
+
+
+def dumps(pipreqs, markers=None):
+    """ Return the snapshot of pipreqs, a dictionary from package name to
+    PipReq, installed for an interpreter with markers, a marker environment,
+    the running interpreter's by default, as a byte string. """
+    if markers is None:
+        markers = dict(current_environment(), extra='')
+    strings = []
+    offsets = {}
+    size = [0]
+
+    def add(value):
+        if value is None:
+            return _NONE
+        value = _encode(value)
+        try:
+            return offsets[value]
+        except KeyError:
+            offset = offsets[value] = size[0]
+            strings.append(_length.pack(len(value)) + value)
+            size[0] += _length.size + len(value)
+            return offset
+
+    records = []
+    keyed = sorted((_encode(canonicalize_name(name)), pipreq)
+                   for name, pipreq in pipreqs.items())
+    for key, pipreq in keyed:
+        vc = pipreq.version_control or {}
+        flags = _EDITABLE if pipreq.editable else 0
+        records.append(_record.pack(
+            add(key),
+            add(pipreq.project_name),
+            add(pipreq.specifiers),
+            add(pipreq.location),
+            add(pipreq.link),
+            *([add(vc.get(field)) for field in _VCS_FIELDS] +
+              [_types.index(pipreq.type or 'pypi'), flags])
+        ))
+
+    environment = add(json.dumps(markers, sort_keys=True))
+    index_offset = _header.size
+    strings_offset = index_offset + _record.size * len(records)
+    header = _header.pack(MAGIC, SNAPSHOT_FORMAT, 0, len(records),
+                          index_offset, strings_offset, environment)
+    return b''.join([header] + records + strings)
+
+
+def write_snapshot(path, pipreqs, markers=None):
+    """ Write the snapshot of pipreqs, a dictionary from package name to
+    PipReq, installed for an interpreter with markers, to path. """
+    atomic_write(path, dumps(pipreqs, markers))
+
+
+def _freeze_line(line, note=None):
+    """ Return the PipReqs of line, a line of pip freeze output, given the
+    requirement in the note pip wrote ahead of it, if any. """
+    if note is not None and line.startswith(('-e', '--editable')):
+        # the path after -e is on the machine pip ran on, so the package
+        # is recorded from the note, the way freezing it here would
+        req = parse_requirement(note)
+        location = re.split(r'\s+|=', line, 1)[1:]
+        return [PipReq(project_name=req.name, type='pypi',
+                       specifiers=str(req.specifier) or None,
+                       location=location[0].strip() if location else None)]
+    match = _direct_re.match(line)
+    if match:
+        link = Link(match.group('url'))
+        type, version_control = _link_details(link)
+        return [PipReq(project_name=match.group('name'), type=type,
+                       link=link.url, version_control=version_control)]
+    pipreqs = []
+    for ireq in _iter_requirements_iterable([line]):
+        if not ireq.name:
+            raise ConfigurationError("it names no package")
+        pipreqs.append(stored(PipReq.from_ireq(ireq)))
+    return pipreqs
+
+
+def from_freeze(lines):
+    """ Return a dictionary from package name to the PipReq of each
+    requirement in lines, the output of pip freeze. Lines that can't be
+    read are skipped with a warning. """
+    pipreqs = {}
+    note = None
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        match = _editable_note_re.match(line)
+        if match:
+            note = match.group('req')
+            continue
+        if not line or line.startswith('#'):
+            continue
+        try:
+            found = _freeze_line(line, note)
+        except (InvalidRequirement, PipsqueakError) as exc:
+            logger.warning("Skipping line %d of pip freeze output, %r: %s",
+                           lineno, line, exc)
+            found = []
+        note = None
+        for pipreq in found:
+            pipreqs[canonicalize_name(pipreq.project_name)] = pipreq
+    return pipreqs
+
+
+class Snapshot(object):
+    """
+    A snapshot file, mapped into memory. Look distributions up with get, or
+    by canonical package name with [] and in. markers is the marker
+    environment of the interpreter they're installed for.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fp:
+            try:
+                self._map = mmap.mmap(fp.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+            except (ValueError, mmap.error):
+                # an empty file can't be mapped
+                raise ConfigurationError("%s is not a snapshot" % path)
+        try:
+            self._read_header()
+        except Exception:
+            self._map.close()
+            raise
+
+    def _read_header(self):
+        if len(self._map) < _header.size:
+            raise ConfigurationError("%s is not a snapshot" % self.path)
+        magic, version = struct.unpack_from('<4sH', self._map, 0)
+        if magic != MAGIC:
+            raise ConfigurationError("%s is not a snapshot" % self.path)
+        if version != SNAPSHOT_FORMAT:
+            raise ConfigurationError(
+                "%s has snapshot format %d, expected %d" % (
+                    self.path, version, SNAPSHOT_FORMAT))
+        _, _, _, count, index_offset, strings_offset, environment = \
+            _header.unpack_from(self._map, 0)
+        if index_offset + count * _record.size > strings_offset or \
+                strings_offset > len(self._map):
+            raise ConfigurationError("%s is truncated" % self.path)
+        self._count = count
+        self._index = index_offset
+        self._strings = strings_offset
+        self.markers = json.loads(self._string(environment))
+
+    @property
+    def python_version(self):
+        return tuple(int(part) for part in
+                     self.markers['python_version'].split('.')[:2])
+
+    @property
+    def tags(self):
+        """ The wheel tags the interpreter supports, as far as they can be
+        told from its markers. """
+        from pipsqueak.pip.pep425tags import get_supported
+        pypy = self.markers.get('implementation_name') == 'pypy'
+        return get_supported(self.python_version, 'pp' if pypy else 'cp')
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def _bytes(self, offset):
+        if offset == _NONE:
+            return None
+        start = self._strings + offset
+        length, = _length.unpack_from(self._map, start)
+        start += _length.size
+        return self._map[start:start + length]
+
+    def _string(self, offset):
+        value = self._bytes(offset)
+        return None if value is None else _decode(value)
+
+    def _fields(self, i):
+        return _record.unpack_from(self._map, self._index + i * _record.size)
+
+    def _find(self, key):
+        """ Return the index of the record whose key is key, or -1. """
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found = self._bytes(self._fields(mid)[0])
+            if found < key:
+                lo = mid + 1
+            elif found > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def _pipreq(self, fields):
+        (_, name, specifiers, location, link, vcs_type, protocol, url,
+         version, type, flags) = fields
+        if vcs_type == _NONE:
+            version_control = None
+        else:
+            version_control = dict(zip(_VCS_FIELDS, [
+                self._string(offset)
+                for offset in (vcs_type, protocol, url, version)]))
+        return PipReq(
+            project_name=self._string(name),
+            type=_types[type],
+            editable=bool(flags & _EDITABLE),
+            specifiers=self._string(specifiers),
+            location=self._string(location),
+            link=self._string(link),
+            version_control=version_control,
+        )
+
+    def get(self, name, default=None):
+        """ Return the PipReq of the distribution named name, or default. """
+        i = self._find(_encode(canonicalize_name(name)))
+        if i < 0:
+            return default
+        return self._pipreq(self._fields(i))
+
+    def __getitem__(self, name):
+        pipreq = self.get(name)
+        if pipreq is None:
+            raise KeyError(name)
+        return pipreq
+
+    def __contains__(self, name):
+        return self._find(_encode(canonicalize_name(name))) >= 0
+
+    def names(self):
+        """ Return the canonical names of the distributions, in order. """
+        return [self._string(self._fields(i)[0])
+                for i in range(self._count)]
+
+    def lookup(self, names):
+        """ Return a dictionary from each of names, canonical package names,
+        found in the snapshot to its PipReq. """
+        found = {}
+        for name in names:
+            pipreq = self.get(name)
+            if pipreq is not None:
+                found[name] = pipreq
+        return found
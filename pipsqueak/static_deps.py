@@ -0,0 +1,301 @@
+"""Static extraction of the dependencies of local projects
+
+Dependencies of a local directory are read without running any of its
+code: from the literal arguments of the setup() call in setup.py, and for
+anything setup.py doesn't give literally, from setup.cfg and the [project]
+table of pyproject.toml. The latter is only read when the optional toml
+package is installed. Fields no file gives literally are unknown.
+"""
+import ast
+import os
+
+import six
+from six.moves import configparser
+
+from pipsqueak.fscache import probe
+
+try:
+    import toml
+except ImportError:
+    toml = None
+
+
+# The value of PipReq.dependencies when they can't be read statically
+UNKNOWN = 'unknown'
+
+METADATA_FILES = ('setup.py', 'setup.cfg', 'pyproject.toml')
+
+_FIELDS = ('name', 'install_requires', 'extras_require')
+
+_DEFAULTS = dict(install_requires=list, extras_require=dict)
+
+# read_metadata's answers by directory, for the current run: a local
+# requirement's name and its dependencies are read from the same files
+_metadata = probe.memo()
+
+
+class _Dynamic(object):
+    """ Marks a field given to setup() as an expression that isn't a
+    literal. """
+
+
+DYNAMIC = _Dynamic()
+
+
+def _literal(node, assignments):
+    if isinstance(node, ast.Name) and node.id in assignments:
+        node = assignments[node.id]
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return DYNAMIC
+
+
+def _unpacks_arguments(call):
+    """ Does call pass *args or **kwargs, which may hold any field? """
+    # Python 2 keeps them apart; Python 3 as Starred args and keywords
+    # without a name
+    if getattr(call, 'starargs', None) or getattr(call, 'kwargs', None):
+        return True
+    return (any(keyword.arg is None for keyword in call.keywords) or
+            any(type(arg).__name__ == 'Starred' for arg in call.args))
+
+
+def _base_name(node):
+    """ Return the name x in x.a, x[k] or x[k].a, or None. """
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def from_setup_py(path):
+    """ Return a dictionary of the fields setup.py at path passes to
+    setup(), with DYNAMIC for those that aren't literals, and for every
+    field it doesn't name when it unpacks *args or **kwargs, or None if it
+    has no setup() call that can be read.
+    """
+    try:
+        with open(path, 'rb') as fp:
+            tree = ast.parse(fp.read(), path)
+    except (IOError, SyntaxError, TypeError, ValueError):
+        return None
+
+    # names bound nowhere but one module level assignment, as in
+    # install_requires = [...]; setup(install_requires=install_requires).
+    # Names rebound, assigned or deleted through an item or attribute, as
+    # in extras['test'] = [...], or that have a method called, such as
+    # append, are left out, as their value at the setup() call isn't known.
+    bindings = {}
+    changed = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and \
+                isinstance(node.ctx, (ast.Store, ast.Del)):
+            bindings[node.id] = bindings.get(node.id, 0) + 1
+        elif (isinstance(node, (ast.Attribute, ast.Subscript)) and
+              isinstance(node.ctx, (ast.Store, ast.Del))):
+            changed.add(_base_name(node))
+        elif (isinstance(node, ast.Call) and
+              isinstance(node.func, ast.Attribute)):
+            changed.add(_base_name(node.func.value))
+    assignments = {}
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1 and
+                isinstance(node.targets[0], ast.Name)):
+            name = node.targets[0].id
+            if bindings[name] == 1 and name not in changed:
+                assignments[name] = node.value
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        name = getattr(func, 'id', None) or getattr(func, 'attr', None)
+        if name != 'setup':
+            continue
+        fields = {}
+        if _unpacks_arguments(node):
+            fields = dict.fromkeys(_FIELDS, DYNAMIC)
+        for keyword in node.keywords:
+            if keyword.arg in _FIELDS:
+                fields[keyword.arg] = _literal(keyword.value, assignments)
+        return fields
+    return None
+
+
+def _parse_list(value):
+    """ Split a setup.cfg list the way setuptools does for requirements. """
+    if '\n' in value:
+        items = value.splitlines()
+    else:
+        items = value.split(';')
+    return [item.strip() for item in items if item.strip()]
+
+
+def _is_directive(value):
+    return value.strip().startswith(('file:', 'attr:'))
+
+
+def from_setup_cfg(path):
+    """ Return a dictionary of the fields setup.cfg at path sets, with
+    DYNAMIC for those set by file: or attr: directives, or None if it
+    can't be read.
+    """
+    parser = configparser.RawConfigParser()
+    try:
+        if not parser.read(path):
+            return None
+    except configparser.Error:
+        return None
+
+    fields = {}
+    if parser.has_option('metadata', 'name'):
+        name = parser.get('metadata', 'name')
+        fields['name'] = DYNAMIC if _is_directive(name) else name.strip()
+    if parser.has_option('options', 'install_requires'):
+        value = parser.get('options', 'install_requires')
+        fields['install_requires'] = (
+            DYNAMIC if _is_directive(value) else _parse_list(value))
+    if parser.has_section('options.extras_require'):
+        extras = {}
+        for extra, value in parser.items('options.extras_require'):
+            if _is_directive(value):
+                extras = DYNAMIC
+                break
+            extras[extra] = _parse_list(value)
+        fields['extras_require'] = extras
+    return fields
+
+
+def from_pyproject(path):
+    """ Return a dictionary of the fields the [project] table of the
+    pyproject.toml at path sets, with DYNAMIC for those it lists as
+    dynamic, or None if it can't be read.
+    """
+    if toml is None:
+        return None
+    try:
+        project = toml.load(path).get('project')
+    except (IOError, ValueError):
+        return None
+    if not isinstance(project, dict):
+        return None
+
+    dynamic = set(project.get('dynamic', ()))
+    fields = {}
+    if 'name' in project:
+        fields['name'] = project['name']
+    if 'dependencies' in dynamic:
+        fields['install_requires'] = DYNAMIC
+    elif 'dependencies' in project:
+        fields['install_requires'] = list(project['dependencies'])
+    if 'optional-dependencies' in dynamic:
+        fields['extras_require'] = DYNAMIC
+    elif 'optional-dependencies' in project:
+        fields['extras_require'] = {
+            extra: list(reqs)
+            for extra, reqs in project['optional-dependencies'].items()
+        }
+    return fields
+
+
+def _requirement_list(value):
+    if isinstance(value, six.string_types):
+        return _parse_list(value)
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return DYNAMIC
+
+
+def _normalize(field, value):
+    if field == 'install_requires':
+        return _requirement_list(value)
+    if field == 'extras_require':
+        if not isinstance(value, dict):
+            return DYNAMIC
+        extras = {}
+        for extra, reqs in value.items():
+            extras[extra] = _requirement_list(reqs)
+            if extras[extra] is DYNAMIC:
+                return DYNAMIC
+        return extras
+    return value
+
+
+def read_metadata(directory):
+    """
+    Return a dictionary with the name, install_requires and extras_require
+    of the project in directory, each of which is UNKNOWN when it can't be
+    read statically, or None if directory isn't installable.
+    """
+    key = os.path.normpath(os.path.abspath(directory))
+    try:
+        return _metadata[key]
+    except KeyError:
+        pass
+    metadata = _read_metadata(directory)
+    if probe.active:
+        _metadata[key] = metadata
+    return metadata
+
+
+def _read_metadata(directory):
+    readers = [
+        (os.path.join(directory, 'setup.py'), from_setup_py),
+        (os.path.join(directory, 'setup.cfg'), from_setup_cfg),
+        (os.path.join(directory, 'pyproject.toml'), from_pyproject),
+    ]
+    sources = [reader(path) for path, reader in readers
+               if probe.isfile(path)]
+    sources = [fields for fields in sources if fields is not None]
+    if not sources:
+        return None
+
+    metadata = {}
+    for field in _FIELDS:
+        # the first literal value wins; a field that's only given as an
+        # expression is unknown, and one that's never given has its default
+        value = _DEFAULTS[field]() if field in _DEFAULTS else None
+        for fields in sources:
+            if field not in fields:
+                continue
+            value = fields[field]
+            if value is not DYNAMIC:
+                value = _normalize(field, value)
+            if value is not DYNAMIC:
+                break
+        metadata[field] = UNKNOWN if value is DYNAMIC else value
+    return metadata
+
+
+def dependencies(directory):
+    """ Return the install_requires and extras_require of the project in
+    directory as a dictionary, or UNKNOWN if either can't be read
+    statically.
+    """
+    metadata = read_metadata(directory)
+    if metadata is None:
+        return UNKNOWN
+    if UNKNOWN in (metadata['install_requires'],
+                   metadata['extras_require']):
+        return UNKNOWN
+    return dict(
+        install_requires=metadata['install_requires'],
+        extras_require=metadata['extras_require'],
+    )
+
+
+def project_name(directory):
+    """ Return the name of the project in directory, or None if it can't be
+    read statically.
+    """
+    metadata = read_metadata(directory)
+    if metadata is None or metadata['name'] in (None, UNKNOWN):
+        return None
+    return metadata['name']
+
+
+def metadata_files(directory):
+    """ Return the paths of the files in directory dependencies are read
+    from. """
+    return [os.path.join(directory, name) for name in METADATA_FILES
+            if probe.isfile(os.path.join(directory, name))]
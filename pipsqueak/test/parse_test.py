@@ -1,9 +1,19 @@
 #!/usr/bin/env python
 
+import mmap
+import multiprocessing
 import os
+import sys
 import unittest
 
+from six import StringIO
+
+from pipsqueak.exceptions import ConflictingRequirementsError
+from pipsqueak import main
 from pipsqueak.main import (
+    _line_chunks,
+    _parse_requirements_file_chunked,
+    iter_requirements,
     parse_requirements_file,
 )
 from pipsqueak.test.util import (
@@ -118,5 +128,118 @@ class TestParse(unittest.TestCase):
         ))
 
 
+class TestIterRequirements(unittest.TestCase):
+    def test_yields_from_path(self):
+        with req_file("./test_requirements_005.txt", "tornado<=6.0\n"
+                      "codecov\n"):
+            reqs = list(iter_requirements('test_requirements_005.txt'))
+            self.assertEqual([r.project_name for r in reqs],
+                             ['tornado', 'codecov'])
+            self.assertEqual(reqs[1].line_number, 2)
+
+    def test_yields_from_open_file(self):
+        with req_file("./test_requirements_006.txt", "tornado<=6.0\n"):
+            with open("test_requirements_006.txt") as fp:
+                reqs = iter_requirements(fp)
+                self.assertEqual(next(reqs), default_desc(
+                    project_name="tornado",
+                    specifiers="<=6.0",
+                    source="test_requirements_006.txt",
+                    line_number=1,
+                ))
+
+    def test_yields_from_stdin(self):
+        stdin = sys.stdin
+        sys.stdin = StringIO("codecov\npymongo==2.8\ncodecov==2.0\n")
+        try:
+            reqs = list(iter_requirements('-'))
+        finally:
+            sys.stdin = stdin
+        self.assertEqual([r.project_name for r in reqs],
+                         ['codecov', 'pymongo', 'codecov'])
+        self.assertEqual(reqs[2].specifiers, "==2.0")
+
+    def test_yields_included(self):
+        with req_file("./test_requirements_007.txt", "scipy~=0.18.1\n"):
+            with req_file("test_requirements_008.txt",
+                          "codecov\n-r test_requirements_007.txt\n"):
+                reqs = list(iter_requirements('test_requirements_008.txt'))
+                self.assertEqual([r.project_name for r in reqs],
+                                 ['codecov', 'scipy'])
+
+    def test_yields_unnamed_archive(self):
+        sdist = os.path.abspath('foo-1.0.tar.gz')
+        with req_file(sdist, 'sdist'):
+            with req_file("test_requirements_093.txt",
+                          "six==1.10.0\n%s\n" % sdist):
+                reqs = list(iter_requirements('test_requirements_093.txt'))
+        self.assertEqual([r.project_name for r in reqs], ['six', None])
+        self.assertEqual(reqs[1].type, 'file')
+
+
+class TestChunkedParse(unittest.TestCase):
+    def test_line_chunks(self):
+        with req_file("./test_requirements_020.txt", "a\nbb\n\nccc\nd"):
+            with open("test_requirements_020.txt", "rb") as fp:
+                mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+                chunks = _line_chunks(mm, 3)
+                mm.close()
+        self.assertEqual(chunks, [(0, 5, 1), (5, 10, 3), (10, 11, 5)])
+
+    def test_matches_serial(self):
+        lines = []
+        for i in range(8000):
+            if i % 100 == 0:
+                lines.append("# comment %d" % i)
+            lines.append("package%d>=1.%d" % (i % 3000, i))
+        lines.append("-r test_requirements_021.txt")
+        with req_file("./test_requirements_021.txt", "six==1.10.0\n"), \
+                req_file("./test_requirements_022.txt", "\n".join(lines)):
+            serial = parse_requirements_file('test_requirements_022.txt')
+            chunked, _ = _parse_requirements_file_chunked(
+                os.path.abspath('test_requirements_022.txt'), 3)
+        self.assertEqual(len(serial), 3001)
+        self.assertEqual(serial, chunked)
+        self.assertEqual(chunked['package5'].line_number, 6067)
+
+    def test_conflict_across_chunks(self):
+        lines = ["a>=2", "a<=5"]
+        lines.extend("package%d" % i for i in range(20000))
+        lines.append("a<1")
+        with req_file("./test_requirements_023.txt", "\n".join(lines)):
+            path = os.path.abspath('test_requirements_023.txt')
+            for parse in (parse_requirements_file,
+                          lambda path: _parse_requirements_file_chunked(
+                              path, 4)):
+                with self.assertRaises(ConflictingRequirementsError) as cm:
+                    parse(path)
+                self.assertEqual(cm.exception.name, 'a')
+                sides = [(specifiers, comes_from.rsplit(':', 1)[1])
+                         for specifiers, comes_from in cm.exception.sides]
+                self.assertEqual(sides, [('>=2', '1'), ('<1', '20003')])
+
+    def test_serial_when_chunks_dont_pay(self):
+        def chunked(requirements, jobs):
+            raise AssertionError("parsed in %d processes" % jobs)
+
+        lines = "\n".join("package%d" % i for i in range(20000))
+        original = main._parse_requirements_file_chunked
+        cpu_count = multiprocessing.cpu_count
+        main._parse_requirements_file_chunked = chunked
+        try:
+            # a file smaller than two chunks
+            with req_file("./test_requirements_024.txt", "six\n"):
+                parse_requirements_file('test_requirements_024.txt', jobs=4)
+            # a single CPU
+            multiprocessing.cpu_count = lambda: 1
+            with req_file("./test_requirements_025.txt", lines):
+                reqs = parse_requirements_file('test_requirements_025.txt',
+                                               jobs=4)
+            self.assertEqual(len(reqs), 20000)
+        finally:
+            main._parse_requirements_file_chunked = original
+            multiprocessing.cpu_count = cpu_count
+
+
 if __name__ == '__main__':
     unittest.main()
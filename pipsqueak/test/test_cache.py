@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pipsqueak.cache import RequirementsCache
+from pipsqueak.main import parse_requirements_file
+from pipsqueak.pip.req_install import InstallRequirement
+from pipsqueak.test.util import req_file, write
+
+
+class TestRequirementsCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = RequirementsCache(self.directory)
+        self.from_line = InstallRequirement.__dict__['from_line']
+
+    def tearDown(self):
+        InstallRequirement.from_line = self.from_line
+        shutil.rmtree(self.directory)
+
+    def forbid_parsing(self):
+        def from_line(cls, *args, **kwargs):
+            raise AssertionError("requirement parsed on a warm run")
+        InstallRequirement.from_line = classmethod(from_line)
+
+    def test_warm_run_skips_parsing(self):
+        with req_file("test_requirements_010.txt", "six==1.10.0\n"), \
+                req_file("test_requirements_011.txt",
+                         "-r test_requirements_010.txt\ntornado<=6.0\n"):
+            cold = parse_requirements_file("test_requirements_011.txt",
+                                           cache=self.cache)
+            self.forbid_parsing()
+            warm = parse_requirements_file("test_requirements_011.txt",
+                                           cache=self.cache)
+            self.assertEqual(cold, warm)
+
+    def test_changed_include_invalidates(self):
+        with req_file("test_requirements_012.txt",
+                      "-r test_requirements_013.txt\n"):
+            with req_file("test_requirements_013.txt", "six==1.10.0\n"):
+                parse_requirements_file("test_requirements_012.txt",
+                                        cache=self.cache)
+            with req_file("test_requirements_013.txt", "six==1.11.0\n"):
+                reqs = parse_requirements_file("test_requirements_012.txt",
+                                               cache=self.cache)
+                self.assertEqual(reqs['six'].specifiers, "==1.11.0")
+
+    def test_includes_follow_the_working_directory(self):
+        # -r base.txt is relative to the directory pipsqueak runs in
+        requirements = write(self.directory, 'requirements.txt',
+                             "-r base.txt\n")
+        write(self.directory, 'a/base.txt', "six==1.10.0\n")
+        write(self.directory, 'b/base.txt', "six==1.11.0\n")
+        cwd = os.getcwd()
+        try:
+            os.chdir(os.path.join(self.directory, 'a'))
+            reqs = parse_requirements_file(requirements, cache=self.cache)
+            self.assertEqual(reqs['six'].specifiers, "==1.10.0")
+            os.chdir(os.path.join(self.directory, 'b'))
+            reqs = parse_requirements_file(requirements, cache=self.cache)
+            self.assertEqual(reqs['six'].specifiers, "==1.11.0")
+        finally:
+            os.chdir(cwd)
+
+    def test_prune(self):
+        with req_file("test_requirements_014.txt", "six\n"):
+            parse_requirements_file("test_requirements_014.txt",
+                                    cache=self.cache)
+        self.assertEqual(self.cache.prune(max_age=3600), 0)
+        self.assertEqual(self.cache.prune(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+from pipsqueak import main
+from pipsqueak.envcache import EnvironmentCache, git_inputs
+from pipsqueak.fscache import run_scope
+from pipsqueak.scanner import installed_distributions
+from pipsqueak.test.util import git, write
+
+
+class TestEnvironmentCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.directory, 'cache')
+        self.site = os.path.join(self.directory, 'site-packages')
+        os.makedirs(self.site)
+        write(self.site, 'requests-2.0.0.dist-info/METADATA',
+              "Name: requests\nVersion: 2.0.0\n")
+        # without a version in its name, six's is read from PKG-INFO
+        write(self.site, 'six.egg-info/PKG-INFO',
+              "Name: six\nVersion: 1.10.0\n")
+        self.checkout = os.path.join(self.directory, 'src', 'pkg0')
+        write(self.checkout, 'setup.py', "from setuptools import setup\n")
+        write(self.checkout, 'pkg0.egg-info/PKG-INFO',
+              "Name: pkg0\nVersion: 0.1\n")
+        git(self.checkout, 'init')
+        git(self.checkout, 'add', 'setup.py')
+        git(self.checkout, 'commit', '-m', 'initial')
+        git(self.checkout, 'remote', 'add', 'origin',
+            'https://example.com/pkg0.git')
+        write(self.site, 'pkg0.egg-link', self.checkout + '\n.\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def bump(self, path):
+        """ Move path's mtime on, as coarse filesystem clocks may not. """
+        st = os.stat(path)
+        os.utime(path, (st.st_atime, st.st_mtime + 10))
+
+    def scan(self, paths=None):
+        environment = EnvironmentCache(self.cache_dir, paths or [self.site])
+        with run_scope():
+            installed = environment.distributions()
+            environment.save()
+        versions = {name: dist.version for name, dist in installed.items()}
+        return versions, [entry for _, entry in environment.rescanned]
+
+    def test_unchanged_environment_isnt_rescanned(self):
+        versions, rescanned = self.scan()
+        with run_scope():
+            expected = installed_distributions([self.site])
+        self.assertEqual(
+            versions, {name: dist.version for name, dist in expected.items()})
+        self.assertEqual(sorted(versions), ['pkg0', 'requests', 'six'])
+        self.assertEqual(len(rescanned), 3)
+        self.assertEqual(self.scan(), (versions, []))
+
+    def test_only_changed_entries_are_rescanned(self):
+        self.scan()
+        metadata = os.path.join(self.site, 'six.egg-info', 'PKG-INFO')
+        with open(metadata, 'w') as fp:
+            fp.write("Name: six\nVersion: 1.11.0\n")
+        self.bump(metadata)
+        versions, rescanned = self.scan()
+        self.assertEqual(versions['six'], '1.11.0')
+        self.assertEqual(rescanned, ['six.egg-info'])
+
+        write(self.site, 'attrs-17.0.dist-info/METADATA',
+              "Name: attrs\nVersion: 17.0\n")
+        self.bump(self.site)
+        versions, rescanned = self.scan()
+        self.assertEqual(versions['attrs'], '17.0')
+        self.assertEqual(rescanned, ['attrs-17.0.dist-info'])
+
+        shutil.rmtree(os.path.join(self.site, 'requests-2.0.0.dist-info'))
+        self.bump(self.site)
+        versions, rescanned = self.scan()
+        self.assertNotIn('requests', versions)
+        self.assertEqual(rescanned, [])
+
+    def test_worktree_inputs(self):
+        worktree = os.path.join(self.directory, 'src', 'wt')
+        git(self.checkout, 'worktree', 'add', '-b', 'wtb', worktree)
+        git_dir = os.path.join(self.checkout, '.git')
+        with run_scope():
+            inputs = git_inputs(worktree)
+        self.assertEqual(inputs, [
+            os.path.join(git_dir, 'worktrees', 'wt', 'HEAD'),
+            os.path.join(git_dir, 'config'),
+            os.path.join(git_dir, 'packed-refs'),
+            os.path.join(git_dir, 'refs', 'heads', 'wtb'),
+            os.path.join(git_dir, 'worktrees', 'wt', 'refs', 'heads', 'wtb'),
+        ])
+
+        # the checkout installed is the worktree's
+        write(worktree, 'pkg0.egg-info/PKG-INFO',
+              "Name: pkg0\nVersion: 0.1\n")
+        write(self.site, 'pkg0.egg-link', worktree + '\n.\n')
+        environment = EnvironmentCache(self.cache_dir, [self.site])
+        with run_scope():
+            dist = environment.distributions()['pkg0']
+            environment.remember('pkg0', dist, 'frozen')
+        with run_scope():
+            self.assertEqual(environment.frozen('pkg0', dist), 'frozen')
+
+        # a commit in the worktree moves the branch in the common dir
+        time.sleep(0.01)
+        write(worktree, 'README', 'readme\n')
+        git(worktree, 'add', 'README')
+        git(worktree, 'commit', '-m', 'readme')
+        self.bump(inputs[3])
+        with run_scope():
+            self.assertIsNone(environment.frozen('pkg0', dist))
+
+    def test_commit_refreezes_only_that_checkout(self):
+        frozen = []
+        original = main.FrozenRequirement.__dict__['from_dist']
+        from_dist = main.FrozenRequirement.from_dist
+
+        def counting(dist, dependency_links, paths=None):
+            frozen.append(dist.project_name)
+            return from_dist(dist, dependency_links, paths)
+
+        def freeze():
+            del frozen[:]
+            environment = EnvironmentCache(self.cache_dir)
+            with run_scope():
+                installations = main._get_installed_as_frozen_reqs(
+                    1, ['pkg0', 'six'], environment)
+            return {name: str(req) for name, req in installations.items()}
+
+        old_path = sys.path[:]
+        sys.path.insert(0, self.site)
+        main.FrozenRequirement.from_dist = staticmethod(counting)
+        try:
+            first = freeze()
+            self.assertEqual(sorted(frozen), ['pkg0', 'six'])
+            self.assertEqual(freeze(), first)
+            self.assertEqual(frozen, [])
+
+            # a commit moves HEAD's ref on; git can do it within one clock
+            # tick, so make sure the ref's mtime differs
+            time.sleep(0.01)
+            write(self.checkout, 'README', 'readme\n')
+            git(self.checkout, 'add', 'README')
+            git(self.checkout, 'commit', '-m', 'readme')
+            self.bump(os.path.join(self.checkout, '.git', 'refs', 'heads',
+                                   'master'))
+            second = freeze()
+            self.assertEqual(frozen, ['pkg0'])
+            self.assertEqual(second['six'], first['six'])
+            self.assertNotEqual(second['pkg0'], first['pkg0'])
+        finally:
+            main.FrozenRequirement.from_dist = original
+            sys.path[:] = old_path
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from pipsqueak.fscache import run_scope
+from pipsqueak.main import (
+    _command_line_report,
+    _get_installed_as_frozen_reqs,
+    _iter_requirements_iterable,
+    _job_count,
+    PipReq,
+    parse_installed,
+    report,
+)
+from pipsqueak.scanner import installed_distributions
+from pipsqueak.test.util import git, req_file, write
+
+
+class TestFreeze(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.site = os.path.join(self.directory, 'site-packages')
+        os.makedirs(self.site)
+        write(self.site, 'six-1.10.0.dist-info/METADATA',
+              "Name: six\nVersion: 1.10.0\n")
+        for i in range(3):
+            name = 'pkg%d' % i
+            checkout = os.path.join(self.directory, 'src', name)
+            write(checkout, 'setup.py', "from setuptools import setup\n")
+            write(checkout, '%s.egg-info/PKG-INFO' % name,
+                  "Name: %s\nVersion: 0.%d\n" % (name, i))
+            git(checkout, 'init')
+            git(checkout, 'add', 'setup.py')
+            git(checkout, 'commit', '-m', 'initial')
+            git(checkout, 'remote', 'add', 'origin',
+                'https://example.com/%s.git' % name)
+            write(self.site, '%s.egg-link' % name, checkout + '\n.\n')
+        self.old_path = sys.path[:]
+        sys.path.insert(0, self.site)
+
+    def tearDown(self):
+        sys.path[:] = self.old_path
+        shutil.rmtree(self.directory)
+
+    def frozen(self, workers):
+        with run_scope():
+            installations = _get_installed_as_frozen_reqs(workers)
+        return [(name, str(installations[name]))
+                for name in sorted(installations)
+                if name in ('pkg0', 'pkg1', 'pkg2', 'six')]
+
+    def test_threaded_freeze_matches_serial(self):
+        serial = self.frozen(1)
+        self.assertEqual(self.frozen(3), serial)
+        # fewer than one thread freezes serially too
+        self.assertEqual(self.frozen(0), serial)
+        self.assertEqual([name for name, _ in serial],
+                         ['pkg0', 'pkg1', 'pkg2', 'six'])
+        self.assertTrue(serial[0][1].startswith(
+            '-e git+https://example.com/pkg0.git@'))
+        self.assertTrue(serial[0][1].endswith('#egg=pkg0\n'))
+        self.assertEqual(serial[3][1], 'six==1.10.0\n')
+
+    def test_job_counts_below_one_are_rejected(self):
+        for option in ('--freeze-jobs', '--jobs'):
+            self.assertRaises(SystemExit, _command_line_report,
+                              [option, '0'])
+        self.assertEqual(_job_count('2'), 2)
+
+    def test_targeted_lookup(self):
+        installed, frozen = parse_installed(names=['pkg1', 'six', 'missing'])
+        self.assertEqual(sorted(frozen), ['pkg1', 'six'])
+        self.assertEqual(sorted(installed), ['pkg1', 'six'])
+
+    def test_from_frozen_matches_parsed_text(self):
+        installed, frozen = parse_installed(names=['pkg0', 'six'])
+        for name in ('pkg0', 'six'):
+            lines = [line for line in str(frozen[name]).splitlines()
+                     if not line.startswith('#')]
+            ireq, = _iter_requirements_iterable(lines)
+            parsed = PipReq.from_ireq(ireq)
+            parsed.update(project_name=frozen[name].name,
+                          location=frozen[name].location)
+            self.assertEqual(installed[name], parsed)
+
+        pkg0 = installed['pkg0']
+        self.assertTrue(pkg0.editable)
+        self.assertEqual(pkg0.type, 'version_control')
+        self.assertEqual(pkg0.version_control['location'],
+                         'https://example.com/pkg0.git')
+        self.assertEqual(pkg0.location,
+                         os.path.join(self.directory, 'src', 'pkg0'))
+        self.assertEqual(installed['six'].specifiers, '==1.10.0')
+        self.assertEqual(installed['six'].location, self.site)
+
+    def test_from_dist(self):
+        dist = installed_distributions([self.site])['six']
+        pipreq = PipReq.from_dist(dist)
+        self.assertEqual((pipreq.project_name, pipreq.type,
+                          pipreq.specifiers, pipreq.location),
+                         ('six', 'pypi', '==1.10.0', self.site))
+
+    def test_report_only_and_exclude(self):
+        with req_file("test_requirements_080.txt",
+                      "six==1.9\nnot-installed==1.0\nPkg2\n"):
+            diff = report("test_requirements_080.txt")
+            self.assertEqual(sorted(diff), ['not-installed', 'pkg2', 'six'])
+            diff = report("test_requirements_080.txt", exclude=['not*'])
+            self.assertEqual(sorted(diff), ['pkg2', 'six'])
+            diff = report("test_requirements_080.txt", only=['PKG*'])
+            self.assertEqual(sorted(diff), ['pkg2'])
+            diff = report("test_requirements_080.txt", only=['Not_*', 'six'],
+                          exclude=['six'])
+            self.assertEqual(sorted(diff), ['not-installed'])
+        self.assertEqual(diff['not-installed']['installed'], 'false')
+
+    def test_report_skips_unnamed_archives(self):
+        sdist = write(self.directory, 'foo-1.0.tar.gz', 'sdist')
+        with req_file("test_requirements_094.txt",
+                      "six==1.9\n%s\n" % sdist):
+            self.assertEqual(sorted(report("test_requirements_094.txt")),
+                             ['six'])
+            diff = report("test_requirements_094.txt", exclude=['six'])
+        self.assertEqual(diff, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pipsqueak.fscache import FileSystemCache, probe, run_scope
+from pipsqueak.pip.req_install import InstallRequirement
+
+
+class TestFileSystemCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.fs = FileSystemCache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_probes_cached_while_active(self):
+        setup_py = os.path.join(self.directory, 'setup.py')
+        self.fs.enter()
+        self.assertFalse(self.fs.isfile(setup_py))
+        open(setup_py, 'w').close()
+        self.assertFalse(self.fs.isfile(setup_py))
+        self.fs.exit()
+        self.assertTrue(self.fs.isfile(setup_py))
+        self.assertTrue(self.fs.isdir(self.directory))
+        self.assertEqual(self.fs.listdir(self.directory), {'setup.py'})
+
+    def test_find_upward(self):
+        nested = os.path.join(self.directory, 'src', 'package')
+        os.makedirs(nested)
+        open(os.path.join(self.directory, 'setup.py'), 'w').close()
+        self.assertEqual(self.fs.find_upward(nested, 'setup.py'),
+                         self.directory)
+        self.assertIsNone(self.fs.find_upward(nested, 'no-such-file'))
+
+
+class TestRequirementProbes(unittest.TestCase):
+    def test_plain_names_skip_filesystem(self):
+        def stat(path):
+            raise AssertionError("probed %s" % path)
+        with run_scope():
+            probe.stat = stat
+            try:
+                ireq = InstallRequirement.from_line("requests[security]>=2.0")
+            finally:
+                del probe.stat
+        self.assertEqual(ireq.name, 'requests')
+        self.assertEqual(ireq.extras, {'security'})
+
+
+if __name__ == '__main__':
+    unittest.main()
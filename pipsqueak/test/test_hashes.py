@@ -0,0 +1,93 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from pipsqueak import hashes
+from pipsqueak.exceptions import RequirementsFileParseError
+from pipsqueak.hashes import DigestCache, hash_file
+from pipsqueak.main import _parse_requirements_file, verify_hashes
+from pipsqueak.test.util import req_file
+
+
+class TestHashes(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.wheel = os.path.join(self.directory,
+                                  'pkg-1.0-py2.py3-none-any.whl')
+        self.other = os.path.join(self.directory,
+                                  'other-1.0-py2.py3-none-any.whl')
+        for path in (self.wheel, self.other):
+            with open(path, 'wb') as fp:
+                fp.write(os.path.basename(path) * 1000)
+        self.digest = hashlib.sha256(open(self.wheel, 'rb').read())
+        self.digest = self.digest.hexdigest()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        hashes.hash_file = hash_file
+
+    def test_hash_file(self):
+        self.assertEqual(hash_file(self.wheel, ['sha256']),
+                         {'sha256': self.digest})
+
+    def test_hash_options_with_continuations(self):
+        with req_file("test_requirements_030.txt",
+                      "%s \\\n    --hash=sha256:%s \\\n"
+                      "    --hash=sha256:beef\nsix\n" %
+                      (self.wheel, self.digest)):
+            reqset = _parse_requirements_file("test_requirements_030.txt")
+        ireq = reqset.to_dict()['pkg']
+        self.assertEqual(ireq.options['hashes'],
+                         {'sha256': [self.digest, 'beef']})
+        self.assertTrue(ireq.comes_from.endswith(':1'))
+        self.assertTrue(reqset.to_dict()['six'].comes_from.endswith(':4'))
+
+    def test_weak_hash_rejected(self):
+        with req_file("test_requirements_031.txt",
+                      "six --hash=md5:abcdef\n"):
+            self.assertRaises(RequirementsFileParseError,
+                              _parse_requirements_file,
+                              "test_requirements_031.txt")
+
+    def test_verify(self):
+        with req_file("test_requirements_032.txt",
+                      "%s --hash=sha256:%s\n%s --hash=sha256:beef\n"
+                      "%s/missing-1.0-py2-none-any.whl --hash=sha256:beef\n" %
+                      (self.wheel, self.digest, self.other, self.directory)):
+            failures = verify_hashes("test_requirements_032.txt", jobs=2)
+        self.assertEqual(sorted(failures), ['missing', 'other'])
+        self.assertEqual(failures['other']['expected'], {'sha256': ['beef']})
+        self.assertIn('error', failures['missing'])
+
+    def test_verify_unnamed_sdist(self):
+        sdist = os.path.join(self.directory, 'foo-1.0.tar.gz')
+        with open(sdist, 'wb') as fp:
+            fp.write('sdist')
+        with req_file("test_requirements_033.txt",
+                      "%s --hash=sha256:abc\n"
+                      "%s --hash=sha256:%s\n" %
+                      (sdist, self.wheel, self.digest)):
+            reqset = _parse_requirements_file("test_requirements_033.txt")
+            failures = verify_hashes("test_requirements_033.txt")
+        self.assertEqual(sorted(reqset.to_dict()), sorted([sdist, 'pkg']))
+        self.assertEqual(sorted(failures), [sdist])
+        self.assertEqual(failures[sdist]['expected'], {'sha256': ['abc']})
+
+    def test_digest_cache(self):
+        cache = DigestCache(self.directory)
+        self.assertEqual(cache.hash_file(self.wheel, ['sha256']),
+                         {'sha256': self.digest})
+        cache.save()
+
+        def fail(path, algorithms):
+            raise AssertionError("rehashed %s" % path)
+        hashes.hash_file = fail
+        cache = DigestCache(self.directory)
+        self.assertEqual(cache.hash_file(self.wheel, ['sha256']),
+                         {'sha256': self.digest})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from pipsqueak.pip.vcs import vcs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+_PROBE = """
+import json, logging, sys
+import pipsqueak
+print(json.dumps({
+    'modules': sorted(sys.modules),
+    'handlers': len(logging.getLogger('').handlers),
+}))
+"""
+
+
+def _import_pipsqueak():
+    """ Import pipsqueak in a fresh interpreter, returning the modules it
+    loaded and the number of root logging handlers it left. """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.check_output([sys.executable, '-c', _PROBE],
+                                     cwd=ROOT, env=env)
+    return json.loads(output)
+
+
+class TestImports(unittest.TestCase):
+    def test_heavy_modules_are_deferred(self):
+        result = _import_pipsqueak()
+        modules = set(result['modules'])
+        for name in ('pkg_resources', 'multiprocessing', 'pyparsing',
+                     'packaging.requirements', 'packaging.tags',
+                     'pipsqueak.pip.vcs.git', 'pipsqueak.pip.vcs.subversion'):
+            self.assertNotIn(name, modules)
+
+    def test_no_logging_handler_on_import(self):
+        self.assertEqual(_import_pipsqueak()['handlers'], 0)
+
+    def test_bundled_backends_match_their_classes(self):
+        for name, (_, dirname, schemes) in vcs.bundled.items():
+            backend = vcs.get_backend(name)
+            self.assertEqual(backend.name, name)
+            self.assertEqual(backend.dirname, dirname)
+            self.assertEqual(tuple(backend.schemes), schemes)
+
+    def test_backend_for_scheme(self):
+        self.assertEqual(vcs.get_backend_for_scheme('git+ssh').name, 'git')
+        self.assertEqual(vcs.get_backend_for_scheme('hg+https').name, 'hg')
+        self.assertIsNone(vcs.get_backend_for_scheme('https'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import unittest
+
+from pipsqueak.exceptions import IncludeCycleError
+from pipsqueak.includes import IncludeResolver
+from pipsqueak.main import (
+    _read_requirements_entries,
+    iter_requirements,
+    parse_requirements_file,
+)
+from pipsqueak.test.util import req_file
+
+
+class TestIncludes(unittest.TestCase):
+    def test_diamond_parsed_once(self):
+        parsed = []
+
+        def parse_file(path):
+            parsed.append(os.path.basename(path))
+            return _read_requirements_entries(path)
+
+        with req_file("test_requirements_base.txt", "six==1.10.0\n"), \
+                req_file("test_requirements_left.txt",
+                         "-r test_requirements_base.txt\ntornado\n"), \
+                req_file("test_requirements_right.txt",
+                         "-r test_requirements_base.txt\nscipy\n"), \
+                req_file("test_requirements_top.txt",
+                         "-r test_requirements_left.txt\n"
+                         "-r test_requirements_right.txt\n"):
+            resolver = IncludeResolver(parse_file, workers=2)
+            ireqs = resolver.resolve(
+                os.path.abspath("test_requirements_top.txt"))
+            self.assertEqual([ireq.name for ireq in ireqs],
+                             ['six', 'tornado', 'six', 'scipy'])
+            self.assertEqual(sorted(parsed), [
+                'test_requirements_base.txt',
+                'test_requirements_left.txt',
+                'test_requirements_right.txt',
+                'test_requirements_top.txt',
+            ])
+
+            reqs = parse_requirements_file("test_requirements_top.txt")
+            self.assertEqual(reqs['six'].source, os.path.abspath(
+                "test_requirements_base.txt"))
+            self.assertEqual(reqs['six'].line_number, 1)
+            self.assertEqual(reqs['scipy'].line_number, 2)
+
+    def test_cycle(self):
+        with req_file("test_requirements_a.txt",
+                      "six\n-r test_requirements_b.txt\n"), \
+                req_file("test_requirements_b.txt",
+                         "-r test_requirements_a.txt\n"):
+            self.assertRaises(IncludeCycleError, parse_requirements_file,
+                              "test_requirements_a.txt")
+            self.assertRaises(IncludeCycleError, list,
+                              iter_requirements("test_requirements_a.txt"))
+
+    def test_self_include(self):
+        with req_file("test_requirements_self.txt",
+                      "-r test_requirements_self.txt\n"):
+            self.assertRaises(IncludeCycleError, parse_requirements_file,
+                              "test_requirements_self.txt")
+
+
+if __name__ == '__main__':
+    unittest.main()
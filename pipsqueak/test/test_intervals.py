@@ -0,0 +1,109 @@
+import unittest
+
+from packaging.version import Version
+
+from pipsqueak.exceptions import ConflictingRequirementsError
+from pipsqueak.intervals import (
+    ALL_VERSIONS,
+    ConflictDetector,
+    Interval,
+    intersect,
+    version_intervals,
+)
+from pipsqueak.main import parse_requirements_file
+from pipsqueak.test.util import req_file
+
+
+def V(version):
+    return Version(version)
+
+
+class TestIntervals(unittest.TestCase):
+    def test_operators(self):
+        self.assertEqual(version_intervals(''), ALL_VERSIONS)
+        self.assertEqual(version_intervals('==1.0'),
+                         (Interval(V('1.0'), True, V('1.0.post0.dev0'),
+                                   False),))
+        self.assertEqual(version_intervals('==1.0+local'),
+                         (Interval(V('1.0+local'), True, V('1.0+local'),
+                                   True),))
+        self.assertEqual(version_intervals('>=1.0,<2.0'),
+                         (Interval(V('1.0'), True, V('2.0'), False),))
+        self.assertEqual(version_intervals('!=1.5,>1.0'),
+                         (Interval(V('1.0'), False, V('1.5'), False),
+                          Interval(V('1.5.post0.dev0'), True, None, False)))
+        self.assertEqual(version_intervals('~=1.4.5'),
+                         (Interval(V('1.4.5'), True, V('1.5.dev0'), False),))
+        self.assertEqual(version_intervals('==1.4.*'),
+                         (Interval(V('1.4.dev0'), True, V('1.5.dev0'),
+                                   False),))
+        self.assertEqual(version_intervals('!=1.4.*,<=1.6'),
+                         (Interval(None, False, V('1.4.dev0'), False),
+                          Interval(V('1.5.dev0'), True, V('1.6.post0.dev0'),
+                                   False)))
+
+    def test_unknown(self):
+        self.assertIsNone(version_intervals('===foo'))
+        self.assertIsNone(version_intervals('==foo-bar'))
+
+    def test_intersect(self):
+        self.assertEqual(intersect(version_intervals('<=1.0'),
+                                   version_intervals('>=1.0')),
+                         version_intervals('==1.0'))
+        self.assertEqual(intersect(version_intervals('<1.0'),
+                                   version_intervals('>=1.0')), ())
+        self.assertEqual(intersect(version_intervals('!=1.5'),
+                                   version_intervals('==1.5')), ())
+        self.assertEqual(intersect(version_intervals('!=1.5'),
+                                   version_intervals('~=1.4')),
+                         version_intervals('>=1.4,<2.0.dev0,!=1.5'))
+
+
+class TestConflictDetector(unittest.TestCase):
+    def test_compatible(self):
+        detector = ConflictDetector()
+        detector.add('django', '>=1.11', 'a.txt:1')
+        detector.add('django', '<2.0', 'b.txt:1')
+        detector.add('django', '', 'c.txt:1')
+        detector.add('django', '==1.11.*', 'c.txt:2')
+
+    def test_local_versions(self):
+        detector = ConflictDetector()
+        detector.add('six', '==1.0', 'a.txt:1')
+        detector.add('six', '==1.0+ubuntu1', 'a.txt:2')
+        detector.add('six', '<=1.0', 'a.txt:3')
+        detector.add('six', '>=1.0', 'a.txt:4')
+        with self.assertRaises(ConflictingRequirementsError):
+            detector.add('six', '!=1.0', 'a.txt:5')
+        detector = ConflictDetector()
+        detector.add('six', '==1.0.post1', 'a.txt:1')
+        detector.add('six', '==1.0.post1+local', 'a.txt:2')
+        with self.assertRaises(ConflictingRequirementsError):
+            detector.add('six', '==1.0.post2', 'a.txt:3')
+
+    def test_conflict(self):
+        detector = ConflictDetector()
+        detector.add('django', '>=1.8', 'a.txt:1')
+        detector.add('django', '>=2.0', 'a.txt:2')
+        detector.add('six', '<1.0', 'a.txt:3')
+        with self.assertRaises(ConflictingRequirementsError) as cm:
+            detector.add('django', '<2.0', 'b.txt:7')
+        self.assertEqual(cm.exception.name, 'django')
+        self.assertEqual(cm.exception.sides,
+                         [('>=2.0', 'a.txt:2'), ('<2.0', 'b.txt:7')])
+
+    def test_conflict_across_includes(self):
+        with req_file("test_requirements_040.txt", "Django>=2.0\n"), \
+                req_file("test_requirements_041.txt", "django<2.0\n"), \
+                req_file("test_requirements_042.txt",
+                         "-r test_requirements_040.txt\n"
+                         "-r test_requirements_041.txt\n"):
+            with self.assertRaises(ConflictingRequirementsError) as cm:
+                parse_requirements_file("test_requirements_042.txt")
+        sources = [comes_from for _, comes_from in cm.exception.sides]
+        self.assertTrue(sources[0].endswith('test_requirements_040.txt:1'))
+        self.assertTrue(sources[1].endswith('test_requirements_041.txt:1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import pickle
+import unittest
+
+from pipsqueak.pip.link import Link, canonical_url_key
+from pipsqueak.pip.vcs.git import Git
+
+
+class TestLink(unittest.TestCase):
+    def test_components(self):
+        link = Link("https://host/path/pkg-1.0.tar.gz"
+                    "#sha256=abc123&egg=pkg&subdirectory=sub")
+        self.assertEqual(link.scheme, 'https')
+        self.assertEqual(link.netloc, 'host')
+        self.assertEqual(link.filename, 'pkg-1.0.tar.gz')
+        self.assertEqual(link.ext, '.tar.gz')
+        self.assertEqual(link.url_without_fragment,
+                         "https://host/path/pkg-1.0.tar.gz")
+        self.assertEqual(link.egg_fragment, 'pkg')
+        self.assertEqual(link.subdirectory_fragment, 'sub')
+        self.assertEqual(link.hash_name, 'sha256')
+        self.assertEqual(link.hash, 'abc123')
+        self.assertFalse(link.is_wheel)
+        self.assertTrue(Link("file:///tmp/pkg-1.0-py2-none-any.whl").is_wheel)
+
+    def test_cached_components_are_not_pickled(self):
+        link = Link("https://host/pkg-1.0.tar.gz#egg=pkg")
+        self.assertEqual(link.egg_fragment, 'pkg')
+        self.assertEqual(link.__getstate__(),
+                         dict(url=link.url, comes_from=None,
+                              requires_python=None))
+        copy = pickle.loads(pickle.dumps(link, 2))
+        self.assertEqual(copy.egg_fragment, 'pkg')
+
+    def test_canonical_url_key(self):
+        spellings = [
+            "git+ssh://git@github.com/org/repo.git@v1.0#egg=repo",
+            "git+https://github.com/org/repo@master",
+            "ssh://git@github.com:22/org/repo.git",
+            "git@github.com:org/repo.git",
+            "git+git@github.com:org/repo.git@v1.0",
+            "https://GitHub.com/org/repo/",
+            "git://github.com/org/repo",
+        ]
+        for url in spellings:
+            self.assertEqual(canonical_url_key(url), 'github.com/org/repo',
+                             url)
+        self.assertNotEqual(canonical_url_key("https://github.com/org/other"),
+                            canonical_url_key("https://github.com/org/repo"))
+        self.assertNotEqual(canonical_url_key("https://gitlab.com/org/repo"),
+                            canonical_url_key("https://github.com/org/repo"))
+        self.assertEqual(canonical_url_key("file:///srv/repo/"), '/srv/repo')
+        self.assertEqual(canonical_url_key("/srv/repo"), '/srv/repo')
+
+    def test_compare_urls(self):
+        git = Git()
+        self.assertTrue(git.compare_urls(
+            "git@github.com:org/repo.git", "ssh://git@github.com/org/repo"))
+        self.assertFalse(git.compare_urls(
+            "git@github.com:org/repo.git", "ssh://git@github.com/org/fork"))
+
+
+if __name__ == '__main__':
+    unittest.main()
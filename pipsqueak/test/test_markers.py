@@ -0,0 +1,125 @@
+import json
+import unittest
+
+from packaging.markers import Marker
+
+from pipsqueak import markers
+from pipsqueak.exceptions import PipsqueakError
+from pipsqueak.main import (
+    iter_requirements,
+    parse_requirements_file,
+    requirements_matrix,
+)
+from pipsqueak.test.util import _parse_requirement, req_file
+
+
+class TestMarkers(unittest.TestCase):
+    def tearDown(self):
+        markers.clear()
+
+    def test_current_environment(self):
+        environment = markers.current_environment()
+        self.assertIn('sys_platform', environment)
+        self.assertIs(markers.current_environment(), environment)
+
+    def test_evaluate(self):
+        self.assertTrue(markers.evaluate(None))
+        self.assertTrue(markers.evaluate("python_version >= '2'"))
+        self.assertFalse(markers.evaluate("sys_platform == 'nonesuch'"))
+        self.assertFalse(markers.evaluate("extra == 'test'"))
+        self.assertTrue(markers.evaluate("extra == 'test'", extra='test'))
+
+    def test_evaluated_once(self):
+        markers.evaluate("os_name == 'nonesuch'")
+        markers._environment = dict(markers._environment, os_name='nonesuch')
+        self.assertFalse(markers.evaluate("os_name == 'nonesuch'"))
+
+    def test_pipreq_markers(self):
+        pipreq = _parse_requirement("six==1.10.0; sys_platform == 'win32'")
+        self.assertEqual(pipreq.markers, 'sys_platform == "win32"')
+        self.assertIsNone(_parse_requirement("six").markers)
+
+    def test_applicable_requirement_kept(self):
+        with req_file("test_requirements_050.txt",
+                      "numpy>=1.17; python_version >= '2'\n"
+                      "numpy<1.17; python_version < '2'\n"):
+            reqs = parse_requirements_file("test_requirements_050.txt")
+            self.assertEqual(reqs['numpy'].specifiers, '>=1.17')
+            streamed = list(iter_requirements("test_requirements_050.txt"))
+        self.assertEqual(len(streamed), 2)
+
+
+class TestMarkerMatrix(unittest.TestCase):
+    def tearDown(self):
+        markers.clear()
+
+    def test_compiled_matches_packaging(self):
+        environments = [
+            dict(markers.current_environment(), extra=''),
+            dict(markers.current_environment(), python_version='3.6',
+                 sys_platform='win32', extra='test'),
+        ]
+        for marker in [
+            "python_version >= '3'",
+            "python_version < '3' and sys_platform == 'linux2'",
+            "sys_platform == 'win32' or (os_name == 'posix' and "
+            "python_version > '2.6')",
+            "'win' in sys_platform",
+            "platform_machine not in 'x86_64 amd64'",
+            "extra == 'test' and python_version == '3.6'",
+        ]:
+            for environment in environments:
+                self.assertEqual(markers.compile_marker(marker)(environment),
+                                 Marker(marker).evaluate(environment),
+                                 (marker, environment))
+
+    def test_compiled_once(self):
+        compiled = markers.compile_marker('python_version >= "3"')
+        self.assertIs(markers.compile_marker(Marker("python_version>='3'")),
+                      compiled)
+
+    def test_unsupported_packaging(self):
+        class Opaque(object):
+            """ A Marker of a packaging release that parses differently. """
+
+        marker = Marker('python_version >= "3"')
+        self.assertIs(markers._parsed(marker), marker._markers)
+        self.assertRaises(PipsqueakError, markers._parsed, Opaque())
+
+    def test_parse_targets(self):
+        targets = markers.parse_targets(
+            ["python_version=3.6, sys_platform=win32"],
+            [json.dumps({'py2': {'python_version': '2.7'}}),
+             json.dumps([{'sys_platform': 'darwin'}])],
+        )
+        names = [name for name, _ in targets]
+        self.assertEqual(names, ["python_version=3.6, sys_platform=win32",
+                                 'py2', 'sys_platform=darwin'])
+        self.assertEqual(targets[0][1]['sys_platform'], 'win32')
+        self.assertEqual(targets[0][1]['os_name'],
+                         markers.current_environment()['os_name'])
+        self.assertRaises(ValueError, markers.parse_targets, ['py3'])
+
+    def test_requirements_matrix(self):
+        targets = markers.parse_targets(['python_version=2.7',
+                                         'python_version=3.6',
+                                         'sys_platform=win32'])
+        with req_file("test_requirements_051.txt",
+                      "six\n"
+                      "futures; python_version < '3'\n"
+                      "pywin32; sys_platform == 'win32'\n"
+                      "numpy<1.17; python_version < '3'\n"
+                      "numpy>=1.17; python_version >= '3'\n"):
+            matrix = requirements_matrix("test_requirements_051.txt",
+                                         targets)
+        py27 = matrix['python_version=2.7']
+        py36 = matrix['python_version=3.6']
+        self.assertEqual(sorted(py27), ['futures', 'numpy', 'six'])
+        self.assertEqual(py27['numpy'].specifiers, '<1.17')
+        self.assertEqual(sorted(py36), ['numpy', 'six'])
+        self.assertEqual(py36['numpy'].specifiers, '>=1.17')
+        self.assertIn('pywin32', matrix['sys_platform=win32'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import threading
+import unittest
+
+from packaging.specifiers import LegacySpecifier, Specifier
+
+from pipsqueak.memo import LRUCache, parse_requirement, parse_specifier
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.get('a', str.upper)
+        cache.get('b', str.upper)
+        cache.get('a', str.upper)
+        cache.get('c', str.upper)
+        self.assertEqual(cache.get('a', lambda key: 'miss'), 'A')
+        self.assertEqual(cache.get('b', lambda key: 'miss'), 'miss')
+        self.assertEqual(cache.info(), (2, 4, 2, 2))
+
+    def test_errors_are_not_cached(self):
+        cache = LRUCache()
+
+        def fail(key):
+            raise ValueError(key)
+        self.assertRaises(ValueError, cache.get, 'a', fail)
+        self.assertEqual(cache.get('a', str.upper), 'A')
+
+    def test_threads(self):
+        cache = LRUCache(maxsize=10)
+
+        def work():
+            for i in range(1000):
+                cache.get(i % 20, str)
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        info = cache.info()
+        self.assertEqual(info.hits + info.misses, 4000)
+        self.assertEqual(info.currsize, 10)
+
+
+class TestParsers(unittest.TestCase):
+    def test_shared_requirement(self):
+        self.assertIs(parse_requirement('six==1.10.0'),
+                      parse_requirement('six==1.10.0'))
+
+    def test_specifier_falls_back_to_legacy(self):
+        self.assertIsInstance(parse_specifier('==1.0'), Specifier)
+        self.assertIsInstance(parse_specifier('==2012d'), LegacySpecifier)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from pipsqueak.options import (
+    _fast_parse_line,
+    _full_parse_line,
+    parse_line,
+)
+
+
+class TestParseLine(unittest.TestCase):
+    fast_lines = [
+        "pymongo==2.8",
+        "backports.shutil-get-terminal-size==1.0.0",
+        "requests[security]>=2.0; python_version < '3'",
+        "git+git://github.com/svrana/pipsqueak.git@7f9405a#egg=pipsqueak",
+        "-e git+git://github.com/ContextLogic/wheezy-captcha.git"
+        "#egg=wheezy.captcha",
+        "--editable=git+https://github.com/svrana/pipsqueak#egg=pipsqueak",
+        "--editable  hg+https://myrepo/hg/MyApp#egg=MyApp",
+        "-r base.txt",
+        "--requirement=base.txt",
+    ]
+
+    slow_lines = [
+        "-e 'git+https://github.com/svrana/pipsqueak#egg=pipsqueak'",
+        "-rbase.txt",
+        "-r base.txt -r other.txt",
+        "pymongo==2.8 --no-index",
+        "-i https://pypi.example.com/simple",
+    ]
+
+    def assertSameParse(self, line, parsed):
+        args_str, opts = parsed
+        full_args_str, full_opts = _full_parse_line(line)
+        self.assertEqual(args_str, full_args_str)
+        self.assertEqual(opts.__dict__, full_opts.__dict__)
+
+    def test_fast_path_matches_full_parser(self):
+        for line in self.fast_lines:
+            parsed = _fast_parse_line(line)
+            self.assertIsNotNone(parsed, line)
+            self.assertSameParse(line, parsed)
+
+    def test_option_lines_fall_back(self):
+        for line in self.slow_lines:
+            self.assertIsNone(_fast_parse_line(line), line)
+            self.assertSameParse(line, parse_line(line))
+
+    def test_defaults_are_not_shared(self):
+        _, opts = parse_line("-r base.txt")
+        _, other = parse_line("-r other.txt")
+        self.assertEqual(opts.requirements, ['base.txt'])
+        self.assertEqual(other.requirements, ['other.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
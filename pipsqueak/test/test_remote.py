@@ -0,0 +1,127 @@
+import hashlib
+import shutil
+import tempfile
+import threading
+import unittest
+
+from six.moves import BaseHTTPServer, socketserver
+
+from pipsqueak import remote
+from pipsqueak.cache import RequirementsCache
+from pipsqueak.exceptions import RemoteFetchError
+from pipsqueak.fscache import run_scope
+from pipsqueak.main import parse_requirements_file
+from pipsqueak.remote import RemoteFetcher
+from pipsqueak.test.util import req_file
+
+
+class RequirementsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path,
+                                self.headers.get('If-None-Match')))
+        if self.path in server.redirects:
+            self.send_response(302)
+            self.send_header('Location', server.redirects[self.path])
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path not in server.files:
+            self.send_error(404)
+            return
+        body = server.files[self.path]
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class TestRemote(unittest.TestCase):
+    def setUp(self):
+        self.server = Server(('127.0.0.1', 0), RequirementsHandler)
+        self.server.files = {
+            '/reqs/base.txt': "six==1.10.0\n-r common/extra.txt\n",
+            '/reqs/common/extra.txt': "\n\ntornado<=6.0\n",
+        }
+        self.server.redirects = {'/moved.txt': '/reqs/base.txt'}
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.base = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.directory = tempfile.mkdtemp()
+        remote.configure(self.directory)
+
+    def tearDown(self):
+        remote.default_fetcher().pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_fetch_revalidates(self):
+        url = self.base + '/reqs/base.txt'
+        body = self.server.files['/reqs/base.txt']
+        fetcher = RemoteFetcher(self.directory)
+        self.assertEqual(fetcher.fetch(url), body)
+        fetcher = RemoteFetcher(self.directory)
+        self.assertEqual(fetcher.fetch(url), body)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertIsNone(self.server.requests[0][1])
+        self.assertIsNotNone(self.server.requests[1][1])
+
+        with run_scope():
+            fetcher.fetch(url)
+            fetcher.fetch(url)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_fetch_errors(self):
+        fetcher = RemoteFetcher(self.directory)
+        self.assertRaises(RemoteFetchError, fetcher.fetch,
+                          self.base + '/missing.txt')
+        self.assertEqual(fetcher.fetch(self.base + '/moved.txt'),
+                         self.server.files['/reqs/base.txt'])
+
+    def test_remote_includes(self):
+        with req_file("test_requirements_070.txt",
+                      "-r %s/reqs/base.txt\n" % self.base):
+            reqs = parse_requirements_file("test_requirements_070.txt")
+        self.assertEqual(reqs['six'].source, self.base + '/reqs/base.txt')
+        self.assertEqual(reqs['six'].line_number, 1)
+        self.assertEqual(reqs['tornado'].source,
+                         self.base + '/reqs/common/extra.txt')
+        self.assertEqual(reqs['tornado'].line_number, 3)
+
+    def test_cached_parse_costs_one_revalidation_per_include(self):
+        url = self.base + '/reqs/base.txt'
+        cache = RequirementsCache(self.directory)
+        first = parse_requirements_file(url, cache=cache)
+        del self.server.requests[:]
+        second = parse_requirements_file(url, cache=cache)
+        self.assertEqual(first, second)
+        self.assertEqual(sorted(path for path, _ in self.server.requests),
+                         ['/reqs/base.txt', '/reqs/common/extra.txt'])
+
+        self.server.files['/reqs/common/extra.txt'] = "tornado<=5.0\n"
+        third = parse_requirements_file(url, cache=cache)
+        self.assertEqual(third['tornado'].specifiers, '<=5.0')
+
+
+if __name__ == '__main__':
+    unittest.main()
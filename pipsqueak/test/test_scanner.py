@@ -0,0 +1,130 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import zipfile
+
+from packaging.utils import canonicalize_name
+import pkg_resources
+
+from pipsqueak import scanner
+from pipsqueak.fscache import run_scope
+from pipsqueak.pip.util import dist_is_editable
+from pipsqueak.test.util import write
+
+
+def _metadata(name, version):
+    return "Metadata-Version: 2.1\nName: %s\nVersion: %s\n\nBody\n" % (
+        name, version)
+
+
+class TestScanner(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.site = os.path.join(self.directory, 'site-packages')
+        self.source = os.path.join(self.directory, 'src', 'Dev-Pkg')
+        os.makedirs(self.site)
+        os.makedirs(self.source)
+
+        write(self.site, 'six-1.10.0.dist-info/METADATA',
+              _metadata('six', '1.10.0'))
+        write(self.site, 'Foo_Bar-2.0.dist-info/METADATA',
+              _metadata('Foo-Bar', '2.0'))
+        write(self.site, 'legacy-0.9-py2.7.egg-info',
+              _metadata('legacy', '0.9'))
+        write(self.site, 'eggdir-3.1-py2.7.egg/EGG-INFO/PKG-INFO',
+              _metadata('eggdir', '3.1'))
+        write(self.site, 'empty-1.0.dist-info/.keep', '')
+        os.remove(os.path.join(self.site, 'empty-1.0.dist-info/.keep'))
+        with zipfile.ZipFile(os.path.join(self.site,
+                                          'zipped-1.2-py2.7.egg'), 'w') as zf:
+            zf.writestr('EGG-INFO/PKG-INFO', _metadata('zipped', '1.2'))
+            zf.writestr('zipped/__init__.py', '')
+
+        write(self.source, 'Dev_Pkg.egg-info/PKG-INFO',
+              _metadata('Dev-Pkg', '0.1.dev0'))
+        write(self.site, 'Dev-Pkg.egg-link', self.source + '\n.\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_matches_working_set(self):
+        paths = [self.site, self.source,
+                 os.path.join(self.site, 'eggdir-3.1-py2.7.egg'),
+                 os.path.join(self.site, 'zipped-1.2-py2.7.egg')]
+        expected = {
+            canonicalize_name(dist.project_name): dist.version
+            for dist in pkg_resources.WorkingSet(paths)
+        }
+        with run_scope():
+            installed = scanner.installed_distributions(paths)
+        self.assertEqual(
+            {name: dist.version for name, dist in installed.items()},
+            expected)
+        self.assertEqual(sorted(expected), ['dev-pkg', 'eggdir', 'foo-bar',
+                                            'legacy', 'six', 'zipped'])
+
+    def test_distribution(self):
+        installed = scanner.installed_distributions([
+            self.site, os.path.join(self.site, 'zipped-1.2-py2.7.egg')])
+        foo = installed['foo-bar']
+        self.assertEqual(foo.project_name, 'Foo-Bar')
+        self.assertEqual(foo.key, 'foo-bar')
+        self.assertEqual(foo.location, os.path.normcase(self.site))
+        self.assertEqual(str(foo.as_requirement()), 'Foo-Bar==2.0')
+
+        zipped = installed['zipped']
+        self.assertEqual(zipped.location,
+                         os.path.join(self.site, 'zipped-1.2-py2.7.egg'))
+        self.assertEqual(zipped.egg_name(), 'zipped-1.2-py2.7')
+        self.assertEqual(installed['dev-pkg'].location, self.source)
+
+    def test_editable_locations(self):
+        develop = os.path.join(self.directory, 'src', 'develop')
+        write(develop, 'develop_pkg.egg-info/PKG-INFO',
+              _metadata('develop-pkg', '1.0'))
+        write(self.site, 'easy-install.pth',
+              'import sys; sys.__plen = len(sys.path)\n'
+              '../src/develop\n'
+              './eggdir-3.1-py2.7.egg\n')
+
+        modern = os.path.join(self.directory, 'src', 'modern')
+        write(self.site, '__editable__.modern_pkg-2.0.pth',
+              modern + '\n')
+        finder = os.path.join(self.directory, 'src', 'finder', 'finder_pkg')
+        write(self.site, '__editable__.finder_pkg-0.3.pth',
+              'import __editable___finder_pkg_0_3_finder; '
+              '__editable___finder_pkg_0_3_finder.install()\n')
+        write(self.site, '__editable___finder_pkg_0_3_finder.py',
+              'import sys\nMAPPING = {%r: %r}\n' %
+              ('finder_pkg', finder))
+
+        with run_scope():
+            editables = scanner.editable_locations([self.site])
+            self.assertIs(scanner.editable_locations([self.site]),
+                          editables)
+        self.assertEqual(editables, {
+            'dev-pkg': self.source,
+            'develop-pkg': develop,
+            'modern-pkg': modern,
+            'finder-pkg': os.path.dirname(finder),
+        })
+
+    def test_dist_is_editable(self):
+        installed = scanner.installed_distributions([self.site])
+        old_path = sys.path[:]
+        sys.path.insert(0, self.site)
+        try:
+            self.assertTrue(dist_is_editable(installed['dev-pkg']))
+            self.assertFalse(dist_is_editable(installed['six']))
+        finally:
+            sys.path[:] = old_path
+
+    def test_read_headers_stops_at_body(self):
+        lines = ["Name: pkg\n", "Summary: x\n", "\n", "Version: 1.0\n"]
+        self.assertEqual(scanner.read_headers(lines), {'name': 'pkg'})
+
+
+if __name__ == '__main__':
+    unittest.main()
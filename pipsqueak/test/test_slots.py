@@ -0,0 +1,52 @@
+import pickle
+import unittest
+
+from pipsqueak.main import PipReq
+from pipsqueak.pip.freeze import FrozenRequirement
+from pipsqueak.pip.link import Link
+from pipsqueak.pip.req_install import InstallRequirement
+from pipsqueak.test.util import _parse_requirement
+
+
+class TestSlots(unittest.TestCase):
+    def roundtrip(self, obj):
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            yield pickle.loads(pickle.dumps(obj, protocol))
+
+    def test_pipreq(self):
+        pipreq = _parse_requirement(
+            "git+git://github.com/tornadoweb/tornado.git@v4.5.1#egg=tornado")
+        self.assertFalse(hasattr(pipreq, '__dict__'))
+        for copy in self.roundtrip(pipreq):
+            self.assertEqual(copy, pipreq)
+            self.assertEqual(copy.to_dict(), pipreq.to_dict())
+
+    def test_install_requirement(self):
+        ireq = InstallRequirement.from_line("six==1.10.0; python_version<'3'",
+                                            comes_from="requirements.txt:1")
+        for copy in self.roundtrip(ireq):
+            self.assertEqual(str(copy), str(ireq))
+            self.assertEqual(str(copy.markers), str(ireq.markers))
+
+    def test_link_and_frozen_requirement(self):
+        link = Link("git+https://github.com/svrana/pipsqueak#egg=pipsqueak")
+        frozen = FrozenRequirement('pipsqueak', str(link.url), True, '/src')
+        for copy in self.roundtrip(link):
+            self.assertEqual(copy, link)
+        for copy in self.roundtrip(frozen):
+            self.assertEqual(str(copy), str(frozen))
+
+    def test_loads_dict_state(self):
+        pipreq = PipReq.__new__(PipReq)
+        pipreq.__setstate__(dict(PipReq(project_name='six').__getstate__(),
+                                 removed_field=True))
+        self.assertEqual(pipreq, PipReq(project_name='six'))
+
+    def test_interned(self):
+        name = ''.join(['pipsq', 'ueak'])
+        self.assertIs(PipReq(project_name=name).project_name,
+                      PipReq(project_name='pipsqueak').project_name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pipsqueak.cache import RequirementsCache
+from pipsqueak.exceptions import ConfigurationError
+from pipsqueak.main import _command_line_snapshot, report
+from pipsqueak.markers import current_environment
+from pipsqueak.snapshot import (
+    dumps,
+    from_freeze,
+    MAGIC,
+    Snapshot,
+    write_snapshot,
+)
+from pipsqueak.test.util import default_desc, req_file
+
+FREEZE = """\
+# pip freeze output
+six==1.10.0
+Django==1.11.2
+-e git+https://github.com/svrana/pipsqueak.git@bf83d25#egg=pipsqueak
+zope.interface===4.4.1-custom
+"""
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'snapshot.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        pipreqs = from_freeze(FREEZE.splitlines())
+        self.assertEqual(sorted(pipreqs),
+                         ['django', 'pipsqueak', 'six', 'zope-interface'])
+        write_snapshot(self.path, pipreqs)
+        with Snapshot(self.path) as snapshot:
+            self.assertEqual(len(snapshot), 4)
+            self.assertEqual(snapshot.names(),
+                             ['django', 'pipsqueak', 'six', 'zope-interface'])
+            for name, pipreq in pipreqs.items():
+                self.assertEqual(snapshot[name], pipreq)
+            self.assertEqual(snapshot.get('Zope.Interface').specifiers,
+                             '===4.4.1-custom')
+            self.assertEqual(snapshot['six'], default_desc(
+                project_name='six', specifiers='==1.10.0'))
+            vc = snapshot['pipsqueak'].version_control
+            self.assertEqual(vc, {
+                'type': 'git',
+                'protocol': 'https',
+                'location': 'https://github.com/svrana/pipsqueak.git',
+                'version': 'bf83d25',
+            })
+            self.assertTrue(snapshot['pipsqueak'].editable)
+            self.assertIsNone(snapshot.get('missing'))
+            self.assertNotIn('missing', snapshot)
+            self.assertRaises(KeyError, lambda: snapshot['missing'])
+
+    def test_from_freeze_editables_and_direct_references(self):
+        pipreqs = from_freeze([
+            '# Editable install with no version control (mypkg==0.1)',
+            '-e /src/mypkg',
+            'other @ file:///src/other-0.2.tar.gz',
+            'bar @ git+https://github.com/x/bar.git@abc',
+            '-e /src/unnamed',
+            'six==1.10.0',
+        ])
+        self.assertEqual(sorted(pipreqs), ['bar', 'mypkg', 'other', 'six'])
+        self.assertEqual(pipreqs['mypkg'], default_desc(
+            project_name='mypkg', specifiers='==0.1', location='/src/mypkg'))
+        self.assertEqual(pipreqs['other'].type, 'file')
+        self.assertEqual(pipreqs['other'].link,
+                         'file:///src/other-0.2.tar.gz')
+        self.assertEqual(pipreqs['bar'].version_control['version'], 'abc')
+
+    def test_binary_search(self):
+        pipreqs = {
+            'package%d' % i: default_desc(project_name='package%d' % i,
+                                          specifiers='==1.%d' % (i % 7))
+            for i in range(500)
+        }
+        data = dumps(pipreqs)
+        # repeated versions are stored once
+        self.assertEqual(data.count(b'==1.3'), 1)
+        with open(self.path, 'wb') as fp:
+            fp.write(data)
+        with Snapshot(self.path) as snapshot:
+            for i in (0, 1, 99, 250, 498, 499):
+                name = 'package%d' % i
+                self.assertEqual(snapshot[name], pipreqs[name])
+            self.assertNotIn('package500', snapshot)
+            self.assertNotIn('aaa', snapshot)
+            self.assertNotIn('zzz', snapshot)
+
+    def test_empty(self):
+        write_snapshot(self.path, {})
+        with Snapshot(self.path) as snapshot:
+            self.assertEqual(len(snapshot), 0)
+            self.assertIsNone(snapshot.get('six'))
+
+    def test_invalid(self):
+        for data in (b'', b'not a snapshot at all, no sir',
+                     dumps({})[:10], MAGIC + b'\xff' * 20):
+            with open(self.path, 'wb') as fp:
+                fp.write(data)
+            self.assertRaises(ConfigurationError, Snapshot, self.path)
+
+    def test_markers_of_the_snapshotted_interpreter(self):
+        freeze = os.path.join(self.directory, 'freeze.txt')
+        with open(freeze, 'w') as fp:
+            fp.write("six==1.10.0\nenum34==1.1.6\n")
+        self.assertEqual(_command_line_snapshot(
+            ['--from-freeze', freeze, '-o', self.path,
+             '-t', 'python_version=3.8,implementation_name=cpython']), 0)
+        with req_file("test_requirements_092.txt",
+                      'six==1.10.0\nenum34; python_version < "3"\n'
+                      'bar; python_version < "3"\n'
+                      'baz; python_version >= "3"\n'):
+            with Snapshot(self.path) as snapshot:
+                self.assertEqual(snapshot.python_version, (3, 8))
+                self.assertEqual(snapshot.markers['python_version'], '3.8')
+                self.assertIn(('py3', 'none', 'any'), snapshot.tags)
+                self.assertNotIn(('py2', 'none', 'any'), snapshot.tags)
+                diff = report("test_requirements_092.txt",
+                              installed_from=snapshot)
+        self.assertEqual(sorted(diff), ['baz'])
+
+    def test_installed_from_another_interpreter_through_cache(self):
+        freeze = os.path.join(self.directory, 'freeze.txt')
+        with open(freeze, 'w') as fp:
+            fp.write("six==1.10.0\n")
+        self.assertEqual(_command_line_snapshot(
+            ['--from-freeze', freeze, '-o', self.path,
+             '-t', 'python_version=3.8,implementation_name=cpython']), 0)
+        cache = RequirementsCache(self.directory)
+        with req_file("test_requirements_097.txt",
+                      'six==1.10.0\n'
+                      'numpy<1.17; python_version < "3"\n'
+                      'numpy>=1.17; python_version >= "3"\n'):
+            with Snapshot(self.path) as snapshot:
+                self.assertNotEqual(snapshot.markers['python_version'],
+                                    current_environment()['python_version'])
+                for jobs in (None, 2):
+                    diff = report("test_requirements_097.txt", cache=cache,
+                                  jobs=jobs, installed_from=snapshot)
+                    self.assertEqual(sorted(diff), ['numpy'])
+                    self.assertEqual(diff['numpy']['specifiers'], '>=1.17')
+
+    def test_report_installed_from(self):
+        freeze = os.path.join(self.directory, 'freeze.txt')
+        with open(freeze, 'w') as fp:
+            fp.write(FREEZE)
+        self.assertEqual(_command_line_snapshot(
+            ['--from-freeze', freeze, '-o', self.path]), 0)
+        with req_file("test_requirements_091.txt",
+                      "six==1.9.0\nDjango==1.11.2\nnot-installed\n"):
+            with Snapshot(self.path) as snapshot:
+                diff = report("test_requirements_091.txt",
+                              installed_from=snapshot)
+        self.assertEqual(sorted(diff), ['not-installed', 'six'])
+        self.assertEqual(diff['six']['specifiers'],
+                         {'installed': '==1.10.0', 'required': '==1.9.0'})
+        self.assertEqual(diff['not-installed']['installed'], 'false')
+
+
+if __name__ == '__main__':
+    unittest.main()
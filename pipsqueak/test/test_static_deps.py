@@ -0,0 +1,187 @@
+import os
+import shutil
+import tempfile
+import textwrap
+import unittest
+
+from pipsqueak import static_deps
+from pipsqueak.main import parse_requirements_file
+from pipsqueak.test.util import req_file, write
+
+
+class TestStaticDeps(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, contents):
+        write(self.directory, name, textwrap.dedent(contents))
+
+    def test_setup_py_literals(self):
+        self.write('setup.py', """
+            from setuptools import setup
+
+            install_requires = ['six>=1.10', 'packaging']
+
+            setup(
+                name='local-pkg',
+                install_requires=install_requires,
+                extras_require={'test': ['pytest']},
+            )
+        """)
+        self.assertEqual(static_deps.project_name(self.directory),
+                         'local-pkg')
+        self.assertEqual(static_deps.dependencies(self.directory), dict(
+            install_requires=['six>=1.10', 'packaging'],
+            extras_require={'test': ['pytest']},
+        ))
+
+    def test_setup_cfg_fallback(self):
+        self.write('setup.py', """
+            import setuptools
+            setuptools.setup()
+        """)
+        self.write('setup.cfg', """
+            [metadata]
+            name = cfg-pkg
+
+            [options]
+            install_requires =
+                six
+                requests>=2.0; python_version >= "3"
+
+            [options.extras_require]
+            dev = flake8; pytest
+        """)
+        self.assertEqual(static_deps.project_name(self.directory), 'cfg-pkg')
+        self.assertEqual(static_deps.dependencies(self.directory), dict(
+            install_requires=['six', 'requests>=2.0; python_version >= "3"'],
+            extras_require={'dev': ['flake8', 'pytest']},
+        ))
+
+    def test_dynamic_is_unknown(self):
+        self.write('setup.py', """
+            from setuptools import setup
+
+            def requirements():
+                return open('requirements.txt').read().split()
+
+            setup(name='dynamic', install_requires=requirements())
+        """)
+        self.assertEqual(static_deps.dependencies(self.directory),
+                         static_deps.UNKNOWN)
+        self.assertEqual(static_deps.dependencies(
+            os.path.join(self.directory, 'missing')), static_deps.UNKNOWN)
+
+    def test_unpacked_arguments_are_unknown(self):
+        self.write('setup.py', """
+            from setuptools import setup
+
+            config = {'install_requires': ['six']}
+
+            setup(name='unpacked', **config)
+        """)
+        metadata = static_deps.read_metadata(self.directory)
+        self.assertEqual(metadata['name'], 'unpacked')
+        self.assertEqual(metadata['install_requires'], static_deps.UNKNOWN)
+        self.assertEqual(metadata['extras_require'], static_deps.UNKNOWN)
+
+    def test_rebound_names_are_unknown(self):
+        self.write('setup.py', """
+            from setuptools import setup
+
+            install_requires = ['six']
+            extras_require = {'test': ['pytest']}
+            if True:
+                install_requires = ['six', 'requests']
+            extras_require.update(dev=['flake8'])
+
+            setup(name='rebound', install_requires=install_requires,
+                  extras_require=extras_require)
+        """)
+        metadata = static_deps.read_metadata(self.directory)
+        self.assertEqual(metadata['install_requires'], static_deps.UNKNOWN)
+        self.assertEqual(metadata['extras_require'], static_deps.UNKNOWN)
+
+    def test_names_changed_in_place_are_unknown(self):
+        self.write('setup.py', """
+            from setuptools import setup
+
+            extras = {}
+            extras['test'] = ['pytest']
+            reqs = ['six']
+            reqs[0] = 'requests'
+
+            setup(name='changed', install_requires=reqs,
+                  extras_require=extras)
+        """)
+        metadata = static_deps.read_metadata(self.directory)
+        self.assertEqual(metadata['install_requires'], static_deps.UNKNOWN)
+        self.assertEqual(metadata['extras_require'], static_deps.UNKNOWN)
+
+        for change in ("del reqs['six']", "reqs['six'] += ['x']",
+                       "reqs.extra = 1", "reqs[0][0] = 'x'"):
+            self.write('setup.py', """
+                from setuptools import setup
+
+                reqs = {'six': ['six']}
+                %s
+
+                setup(name='changed', install_requires=reqs)
+            """ % change)
+            self.assertEqual(static_deps.from_setup_py(
+                os.path.join(self.directory, 'setup.py'))['install_requires'],
+                static_deps.DYNAMIC, change)
+
+        # only reading an item leaves the name known
+        self.write('setup.py', """
+            from setuptools import setup
+
+            reqs = ['six']
+            first = reqs[0]
+
+            setup(name='read', install_requires=reqs)
+        """)
+        metadata = static_deps.read_metadata(self.directory)
+        self.assertEqual(metadata['install_requires'], ['six'])
+
+    def test_local_directory_requirement(self):
+        self.write('setup.py', """
+            from setuptools import setup
+            setup(name='local-pkg', install_requires=['six'])
+        """)
+        with req_file("test_requirements_060.txt",
+                      "%s\n-e %s\n" % (self.directory, self.directory)):
+            reqs = parse_requirements_file("test_requirements_060.txt")
+        self.assertEqual(reqs['local-pkg'].editable, True)
+        self.assertEqual(reqs['local-pkg'].dependencies, dict(
+            install_requires=['six'], extras_require={}))
+
+    def test_metadata_read_once_per_run(self):
+        self.write('setup.py', """
+            from setuptools import setup
+            setup(name='local-pkg', install_requires=['six'])
+        """)
+        read = []
+        from_setup_py = static_deps.from_setup_py
+
+        def counting(path):
+            read.append(path)
+            return from_setup_py(path)
+
+        static_deps.from_setup_py = counting
+        try:
+            with req_file("test_requirements_061.txt",
+                          "%s\n" % self.directory):
+                reqs = parse_requirements_file("test_requirements_061.txt")
+        finally:
+            static_deps.from_setup_py = from_setup_py
+        self.assertEqual(reqs['local-pkg'].dependencies['install_requires'],
+                         ['six'])
+        self.assertEqual(len(read), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
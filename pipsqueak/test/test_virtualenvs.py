@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pipsqueak.cache import RequirementsCache
+from pipsqueak.exceptions import (
+    ConfigurationError,
+    ConflictingRequirementsError,
+)
+from pipsqueak.fscache import run_scope
+from pipsqueak.main import report_environments
+from pipsqueak.test.util import req_file, write
+from pipsqueak.virtualenvs import full_version, VirtualEnvironment
+
+
+class TestVirtualEnvironment(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def dist(self, site, name, version):
+        write(self.directory,
+              '%s/%s-%s.dist-info/METADATA' % (site, name, version),
+              "Name: %s\nVersion: %s\n" % (name, version))
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def make_venv(self, root, version, system=False, home=None):
+        write(self.directory, root + '/pyvenv.cfg',
+              'home = %s\ninclude-system-site-packages = %s\n'
+              'version = %s\n' % (home or '/usr/bin',
+                                  'true' if system else 'false',
+                                  version))
+        site = '%s/lib/python%s/site-packages' % (
+            root, '.'.join(version.split('.')[:2]))
+        os.makedirs(self.path(site))
+        return site
+
+    def test_full_version(self):
+        self.assertEqual(full_version('3.8.10'), '3.8.10')
+        self.assertEqual(full_version('3.8.10.final.0'), '3.8.10')
+        self.assertEqual(full_version('3.9.0.candidate.1'), '3.9.0c1')
+
+    def test_venv(self):
+        site = self.make_venv('venv', '3.8.10')
+        self.dist(site, 'six', '1.10.0')
+        write(self.directory, 'venv/lib/python3.8/site-packages/extra.pth',
+              '# comment\nimport os\n../../../../eggs\nmissing\n')
+        os.makedirs(self.path('eggs'))
+        with run_scope():
+            env = VirtualEnvironment(self.path('venv'))
+        self.assertEqual(env.python_version, (3, 8))
+        self.assertEqual(env.implementation, 'cpython')
+        self.assertEqual(env.paths, [self.path(site), self.path('eggs')])
+        self.assertEqual(env.markers['python_version'], '3.8')
+        self.assertEqual(env.markers['python_full_version'], '3.8.10')
+        self.assertEqual(env.markers['extra'], '')
+        self.assertIn(('py3', 'none', 'any'), env.tags)
+
+    def test_system_site_packages(self):
+        base = 'base/lib/python3.8/site-packages'
+        os.makedirs(self.path(base))
+        site = self.make_venv('venv', '3.8.10', system=True,
+                              home=self.path('base/bin'))
+        with run_scope():
+            env = VirtualEnvironment(self.path('venv'))
+        self.assertEqual(env.paths, [self.path(site), self.path(base)])
+
+    def test_legacy_virtualenv(self):
+        site = 'old/lib/python2.7/site-packages'
+        os.makedirs(self.path(site))
+        write(self.directory, 'old/lib/python2.7/orig-prefix.txt',
+              self.path('base'))
+        base = 'base/lib/python2.7/site-packages'
+        os.makedirs(self.path(base))
+        with run_scope():
+            env = VirtualEnvironment(self.path('old'))
+        self.assertEqual(env.paths, [self.path(site), self.path(base)])
+        self.assertEqual(env.markers['python_version'], '2.7')
+
+        write(self.directory, 'old/lib/python2.7/no-global-site-packages.txt')
+        with run_scope():
+            env = VirtualEnvironment(self.path('old'))
+        self.assertEqual(env.paths, [self.path(site)])
+
+    def test_not_a_virtualenv(self):
+        os.makedirs(self.path('empty'))
+        with run_scope():
+            self.assertRaises(ConfigurationError, VirtualEnvironment,
+                              self.path('empty'))
+
+    def test_report_environments(self):
+        py38 = self.make_venv('py38', '3.8.10')
+        self.dist(py38, 'six', '1.10.0')
+        py27 = self.make_venv('py27', '2.7.18')
+        self.dist(py27, 'six', '1.9.0')
+        self.dist(py27, 'enum34', '1.1.6')
+        environments = [VirtualEnvironment(self.path('py38')),
+                        VirtualEnvironment(self.path('py27'))]
+        with req_file("test_requirements_090.txt",
+                      'six==1.9.0\nenum34==1.1.6; python_version < "3.4"\n'):
+            diffs = report_environments("test_requirements_090.txt",
+                                        environments)
+        self.assertEqual(sorted(diffs),
+                         sorted([self.path('py38'), self.path('py27')]))
+        self.assertEqual(diffs[self.path('py27')], {})
+        self.assertEqual(sorted(diffs[self.path('py38')]), ['six'])
+        self.assertEqual(diffs[self.path('py38')]['six']['specifiers'],
+                         {'installed': '==1.10.0', 'required': '==1.9.0'})
+
+    def test_report_environments_through_cache(self):
+        # the running interpreter is 2.7, so parsing for it keeps numpy<1.17
+        py38 = self.make_venv('py38', '3.8.10')
+        self.dist(py38, 'six', '1.10.0')
+        environments = [VirtualEnvironment(self.path('py38'))]
+        cache = RequirementsCache(self.path('cache'))
+        with req_file("test_requirements_095.txt",
+                      'six==1.10.0\n'
+                      'numpy<1.17; python_version < "3"\n'
+                      'numpy>=1.17; python_version >= "3"\n'):
+            for jobs in (None, 2):
+                diffs = report_environments("test_requirements_095.txt",
+                                            environments, cache=cache,
+                                            jobs=jobs)
+                diff = diffs[self.path('py38')]
+                self.assertEqual(sorted(diff), ['numpy'])
+                self.assertEqual(diff['numpy']['installed'], 'false')
+                self.assertEqual(diff['numpy']['specifiers'], '>=1.17')
+
+    def test_conflicts_are_judged_by_the_environment(self):
+        self.make_venv('py38', '3.8.10')
+        environments = [VirtualEnvironment(self.path('py38'))]
+        with req_file("test_requirements_096.txt",
+                      'six>=1.10\nsix<1.9; python_version >= "3"\n'):
+            self.assertRaises(ConflictingRequirementsError,
+                              report_environments,
+                              "test_requirements_096.txt", environments,
+                              cache=RequirementsCache(self.path('cache')))
+
+
+if __name__ == '__main__':
+    unittest.main()
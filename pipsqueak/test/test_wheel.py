@@ -0,0 +1,47 @@
+import unittest
+
+from pipsqueak.main import _unsupported_wheel
+from pipsqueak.pip.pep425tags import get_supported
+from pipsqueak.pip.wheel import Wheel
+from pipsqueak.test.util import _parse_requirement
+
+
+class TestWheel(unittest.TestCase):
+    tags = frozenset([('py2', 'none', 'any'),
+                      ('cp27', 'cp27mu', 'manylinux1_x86_64')])
+
+    def test_file_tags(self):
+        wheel = Wheel('pkg-1.0-py2.py3-none-any.whl')
+        self.assertEqual(wheel.file_tags, frozenset([('py2', 'none', 'any'),
+                                                     ('py3', 'none', 'any')]))
+
+    def test_supported(self):
+        self.assertTrue(Wheel('pkg-1.0-py2.py3-none-any.whl')
+                        .supported(self.tags))
+        self.assertTrue(Wheel('pkg-1.0-cp27-cp27mu-manylinux1_x86_64.whl')
+                        .supported(self.tags))
+        self.assertFalse(Wheel('pkg-1.0-cp36-cp36m-win_amd64.whl')
+                         .supported(self.tags))
+
+    def test_interpreter_tags(self):
+        supported = get_supported()
+        self.assertIsInstance(supported, frozenset)
+        self.assertIs(get_supported(), supported)
+        self.assertTrue(Wheel('pkg-1.0-py2.py3-none-any.whl').supported())
+
+    def test_unsupported_wheel(self):
+        pipreq = _parse_requirement(
+            '/wheels/pkg-1.0-cp36-cp36m-win_amd64.whl')
+        self.assertEqual(pipreq.type, 'file')
+        self.assertEqual(pipreq.project_name, 'pkg')
+        self.assertEqual(_unsupported_wheel(pipreq, self.tags),
+                         'pkg-1.0-cp36-cp36m-win_amd64.whl')
+
+        pipreq = _parse_requirement('/wheels/pkg-1.0-py2-none-any.whl')
+        self.assertIsNone(_unsupported_wheel(pipreq, self.tags))
+        self.assertIsNone(_unsupported_wheel(_parse_requirement('six'),
+                                             self.tags))
+
+
+if __name__ == '__main__':
+    unittest.main()
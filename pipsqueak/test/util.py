@@ -1,5 +1,6 @@
 from contextlib import contextmanager
 import os
+import subprocess
 
 from pipsqueak.main import _process_line, PipReq, IReqSet
 
@@ -14,6 +15,27 @@ def req_file(filename, contents):
         os.unlink(filename)
 
 
+def write(directory, name, contents=''):
+    """ Write contents to name under directory, creating the directories
+    it's in, and return its path. """
+    path = os.path.join(directory, name)
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as fp:
+        fp.write(contents)
+    return path
+
+
+def git(cwd, *args):
+    """ Run git with args in cwd, as a test user, quietly. """
+    with open(os.devnull, 'w') as devnull:
+        subprocess.check_call(
+            ['git', '-c', 'user.name=test', '-c', 'user.email=test@test',
+             '-c', 'init.defaultBranch=master'] + list(args),
+            cwd=cwd, stdout=devnull, stderr=devnull,
+        )
+
+
 def default_desc(**kwargs):
     desc = PipReq()
 
@@ -0,0 +1,196 @@
+"""Virtualenvs described from their files, without running their interpreter
+
+A venv's pyvenv.cfg, or for virtualenvs made before it existed the files
+virtualenv left in lib/pythonX.Y, tell which Python an environment was made
+with and whether it sees that interpreter's own site-packages. From those
+and the directories under lib come the sys.path entries distributions are
+installed on, the marker variables that hold inside the environment and
+the wheel tags its interpreter supports.
+"""
+import os
+import re
+
+from pipsqueak.exceptions import ConfigurationError
+from pipsqueak.fscache import probe
+from pipsqueak.markers import current_environment
+from pipsqueak.pip.pep425tags import get_supported
+from pipsqueak.scanner import pth_paths, read_lines
+
+# lib/python3.8, lib/pypy3.9
+_lib_re = re.compile(r'^(?P<implementation>python|pypy)'
+                     r'(?P<major>\d+)\.(?P<minor>\d+)$')
+
+_implementations = {
+    'cpython': 'CPython',
+    'pypy': 'PyPy',
+}
+
+
+def read_config(path):
+    """ Return the key = value settings of the pyvenv.cfg at path, with
+    lowercased keys. """
+    config = {}
+    for line in read_lines(path):
+        key, sep, value = line.partition('=')
+        if sep:
+            config[key.strip().lower()] = value.strip()
+    return config
+
+
+def full_version(version):
+    """ Return the python_full_version marker value of version, as the
+    version or version_info setting of pyvenv.cfg gives it, e.g. 3.8.10 or
+    3.9.0.candidate.1. """
+    parts = version.split('.')
+    full = '.'.join(parts[:3])
+    if len(parts) >= 5 and parts[3] != 'final':
+        full += parts[3][0] + parts[4]
+    return full
+
+
+def _lib_directories(prefix):
+    """ Return the (directory, implementation, (major, minor)) triples of the
+    versioned library directories under prefix/lib and prefix/lib64. """
+    found = []
+    for lib in ('lib', 'lib64'):
+        directory = os.path.join(prefix, lib)
+        for name in sorted(probe.listdir(directory)):
+            match = _lib_re.match(name)
+            if match:
+                version = int(match.group('major')), int(match.group('minor'))
+                implementation = match.group('implementation')
+                if implementation == 'python':
+                    implementation = 'cpython'
+                found.append((os.path.join(directory, name), implementation,
+                              version))
+    return found
+
+
+def _site_directories(prefix, python_version):
+    """ Return the site-packages directories of a python_version interpreter
+    installed in prefix. """
+    directories = []
+    windows = os.path.join(prefix, 'Lib', 'site-packages')
+    if probe.isdir(windows):
+        directories.append(windows)
+    for directory, _, version in _lib_directories(prefix):
+        site = os.path.join(directory, 'site-packages')
+        if version == python_version and probe.isdir(site):
+            directories.append(site)
+    return directories
+
+
+def _expand(site_directories):
+    """ Return site_directories, each followed by the directories its .pth
+    files add to sys.path, as site.addsitedir does. """
+    paths = []
+    seen = set()
+    for site in site_directories:
+        for path in [site] + sorted(
+                os.path.join(site, name) for name in probe.listdir(site)
+                if name.lower().endswith('.pth')):
+            if path == site:
+                directories = [site]
+            else:
+                directories = [directory for directory in
+                               pth_paths(site, read_lines(path))
+                               if probe.exists(directory)]
+            for directory in directories:
+                key = os.path.normcase(os.path.realpath(directory))
+                if key not in seen:
+                    seen.add(key)
+                    paths.append(directory)
+    return paths
+
+
+class VirtualEnvironment(object):
+    """
+    The virtualenv or venv at root. paths are the sys.path entries its
+    distributions are installed on, in order, markers the marker environment
+    of its interpreter, with extra set to '', and tags the wheel tags that
+    interpreter supports.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        cfg = os.path.join(self.root, 'pyvenv.cfg')
+        self.config = read_config(cfg) if probe.isfile(cfg) else {}
+
+        libs = _lib_directories(self.root)
+        version = (self.config.get('version_info') or
+                   self.config.get('version'))
+        if version:
+            python_full_version = full_version(version)
+            self.python_version = tuple(
+                int(part) for part in python_full_version.split('.')[:2])
+            libs = [lib for lib in libs if lib[2] == self.python_version]
+        elif libs:
+            self.python_version = libs[0][2]
+            # all a layout tells is the minor version
+            python_full_version = '%d.%d' % self.python_version
+        elif self.config:
+            raise ConfigurationError(
+                "%s doesn't say which Python it was made with" % cfg)
+        else:
+            raise ConfigurationError("%s is not a virtualenv" % self.root)
+
+        if 'implementation' in self.config:
+            self.implementation = self.config['implementation'].lower()
+        elif libs:
+            self.implementation = libs[0][1]
+        else:
+            self.implementation = 'cpython'
+
+        site_directories = _site_directories(self.root, self.python_version)
+        if not site_directories:
+            raise ConfigurationError(
+                "No site-packages found in %s" % self.root)
+        base = self._base_prefix(libs)
+        if base is not None:
+            site_directories.extend(
+                _site_directories(base, self.python_version))
+        self.paths = _expand(site_directories)
+
+        markers = dict(current_environment(), extra='')
+        markers.update(
+            implementation_name=self.implementation,
+            implementation_version=python_full_version,
+            platform_python_implementation=_implementations.get(
+                self.implementation, self.implementation),
+            python_version='%d.%d' % self.python_version,
+            python_full_version=python_full_version,
+        )
+        self.markers = markers
+
+    def _base_prefix(self, libs):
+        """ Return the prefix of the interpreter the environment was made
+        with when it sees that interpreter's site-packages, else None. """
+        if self.config:
+            if self.config.get('include-system-site-packages',
+                               'false').lower() != 'true':
+                return None
+            home = self.config.get('home')
+            if not home:
+                return None
+            # home is the interpreter's directory: bin under a POSIX prefix,
+            # the prefix itself on Windows
+            if probe.isdir(os.path.join(home, 'Lib')):
+                return home
+            return os.path.dirname(home)
+        for directory, _, _ in libs:
+            if probe.exists(os.path.join(directory,
+                                         'no-global-site-packages.txt')):
+                return None
+            orig_prefix = read_lines(os.path.join(directory,
+                                                  'orig-prefix.txt'))
+            if orig_prefix:
+                return orig_prefix[0]
+        return None
+
+    @property
+    def tags(self):
+        return get_supported(self.python_version,
+                             'pp' if self.implementation == 'pypy' else 'cp')
+
+    def __repr__(self):
+        return '<VirtualEnvironment %s>' % self.root